@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Benchmark multi-anchor distances on 1M points.
+
+Times the chunked ``n × m`` haversine matrix with nearest-anchor assignment
+against one scalar ``haversine_miles`` call per point and anchor (on a
+sample, extrapolated). Run from the repository root after
+``pip install -e .``:
+
+    python benchmarks/bench_anchors.py [rows] [anchors]
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+
+import numpy as np
+
+from restaurants.anchors import anchor_distances
+from restaurants.utils import haversine_miles
+
+SCALAR_SAMPLE = 50_000
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = sys.argv[1:] if argv is None else argv
+    n = int(args[0]) if args else 1_000_000
+    m = int(args[1]) if len(args) > 1 else 5
+    rng = np.random.default_rng(42)
+    lat = rng.uniform(46.5, 48.5, n)
+    lon = rng.uniform(-123.5, -121.5, n)
+    lat[rng.random(n) < 0.01] = np.nan
+    anchors = {
+        f"Base {i}": (float(a), float(b))
+        for i, (a, b) in enumerate(
+            zip(rng.uniform(46.5, 48.5, m), rng.uniform(-123.5, -121.5, m))
+        )
+    }
+
+    start = time.perf_counter()
+    anchor_distances(lat, lon, anchors)
+    vectorized = time.perf_counter() - start
+
+    sample = min(n, SCALAR_SAMPLE)
+    start = time.perf_counter()
+    for i in range(sample):
+        for a_lat, a_lon in anchors.values():
+            haversine_miles(lat[i], lon[i], a_lat, a_lon)
+    scalar = (time.perf_counter() - start) * n / sample
+
+    print(f"{n:,} points x {m} anchors")
+    print(f"vectorized + nearest  {vectorized:7.3f}s")
+    print(f"scalar (extrapolated) {scalar:7.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Benchmark the streaming GeoJSON export against the old writer.
+
+The old writer built every feature with ``iterrows`` and dumped the whole
+collection with ``indent=2``. Reports time, file size and peak traced
+memory for it, the streaming writer with every column and the projected
+map export, plus the precompressed sizes (50k rows by default). Run from
+the repository root after ``pip install -e .``:
+
+    python benchmarks/bench_export_geojson.py [rows]
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from restaurants import export_geojson
+
+
+def make_csv(path: Path, n: int) -> None:
+    rng = np.random.default_rng(42)
+    lat = rng.uniform(46.5, 48.5, n)
+    lat[rng.random(n) < 0.02] = np.nan
+    pd.DataFrame(
+        {
+            "Place ID": [f"place-{i}" for i in range(n)],
+            "Name": [f"Restaurant {i}" for i in range(n)],
+            "Formatted Address": ["123 Main St, Olympia, WA 98501, USA"] * n,
+            "lat": lat,
+            "lon": rng.uniform(-123.5, -121.5, n),
+            "Rating": rng.choice([4.5, 3.9, np.nan], n),
+            "User Ratings Total": rng.integers(0, 3000, n),
+            "Website": rng.choice(["https://example.com", None], n),
+            "Opening Hours": ["{'Mon': '9 AM – 5 PM'}"] * n,
+            "Distance Miles": rng.uniform(0, 40, n).round(2),
+        }
+    ).to_csv(path, index=False)
+
+
+def old_export(csv_path: Path, out_path: Path) -> None:
+    df = pd.read_csv(csv_path)
+    features = []
+    for _, row in df.iterrows():
+        if pd.isna(row.get("lat")) or pd.isna(row.get("lon")):
+            continue
+        features.append(
+            {
+                "type": "Feature",
+                "geometry": {
+                    "type": "Point",
+                    "coordinates": [float(row["lon"]), float(row["lat"])],
+                },
+                "properties": row.drop(labels=["lat", "lon"]).to_dict(),
+            }
+        )
+    geojson = {"type": "FeatureCollection", "features": features}
+    out_path.write_text(json.dumps(geojson, indent=2))
+
+
+def projected(csv_path: Path, out_path: Path) -> None:
+    export_geojson.export(
+        csv_path, out_path, properties=export_geojson.MAP_PROPERTIES
+    )
+
+
+def full(csv_path: Path, out_path: Path) -> None:
+    export_geojson.export(csv_path, out_path, properties=None)
+
+
+def measure(label: str, func, *args) -> None:
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+    # Tracing slows Python down a lot, so memory is measured in a second run
+    tracemalloc.start()
+    func(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    size = args[-1].stat().st_size
+    print(
+        f"{label:<10} {elapsed:7.2f}s  {size / 1e6:8.1f} MB"
+        f"  peak {peak / 1e6:8.1f} MB"
+    )
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = sys.argv[1:] if argv is None else argv
+    n = int(args[0]) if args else 50_000
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        csv_path = root / "prepped.csv"
+        make_csv(csv_path, n)
+        print(f"{n:,} rows")
+        measure("old", old_export, csv_path, root / "old.geojson")
+        measure("streaming", full, csv_path, root / "new.geojson")
+        out = root / "map.geojson"
+        measure("projected", projected, csv_path, out)
+        for suffix in (".gz", ".br"):
+            packed = out.with_name(out.name + suffix)
+            if packed.exists():
+                size = packed.stat().st_size / 1e6
+                print(f"{'  ' + suffix:<10} {size:17.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Benchmark GridIndex neighbour queries against brute force.
+
+Builds the index over 100k points, then answers radius and k-nearest
+queries with it and with a full ``n × 1`` haversine scan per query. Run
+from the repository root after ``pip install -e .``:
+
+    python benchmarks/bench_grid_index.py [points] [queries]
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from restaurants.utils import GridIndex, haversine_miles_matrix
+
+RADIUS_MILES = 1.0
+K = 10
+
+
+def brute_within(lat, lon, q_lat, q_lon, miles):
+    dist = haversine_miles_matrix(lat, lon, [q_lat], [q_lon])[:, 0]
+    idx = np.flatnonzero(dist <= miles)
+    return idx[np.argsort(dist[idx], kind="stable")]
+
+
+def brute_nearest(lat, lon, q_lat, q_lon, k):
+    dist = haversine_miles_matrix(lat, lon, [q_lat], [q_lon])[:, 0]
+    idx = np.argpartition(np.nan_to_num(dist, nan=np.inf), k)[:k]
+    return idx[np.argsort(dist[idx], kind="stable")]
+
+
+def timed(func, queries) -> float:
+    start = time.perf_counter()
+    for q_lat, q_lon in queries:
+        func(q_lat, q_lon)
+    return time.perf_counter() - start
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = sys.argv[1:] if argv is None else argv
+    n = int(args[0]) if args else 100_000
+    q = int(args[1]) if len(args) > 1 else 1_000
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame(
+        {
+            "lat": rng.uniform(46.5, 48.5, n),
+            "lon": rng.uniform(-123.5, -121.5, n),
+        }
+    )
+    lat, lon = df["lat"].to_numpy(), df["lon"].to_numpy()
+    queries = list(
+        zip(rng.uniform(46.5, 48.5, q), rng.uniform(-123.5, -121.5, q))
+    )
+
+    start = time.perf_counter()
+    index = GridIndex.from_frame(df)
+    build = time.perf_counter() - start
+
+    # Same answers both ways before timing anything
+    for q_lat, q_lon in queries[:20]:
+        assert list(index.within(q_lat, q_lon, RADIUS_MILES)[0]) == list(
+            brute_within(lat, lon, q_lat, q_lon, RADIUS_MILES)
+        )
+        assert list(index.nearest(q_lat, q_lon, K)[0]) == list(
+            brute_nearest(lat, lon, q_lat, q_lon, K)
+        )
+
+    rows = [
+        (
+            f"within {RADIUS_MILES:g} mi",
+            timed(lambda a, b: index.within(a, b, RADIUS_MILES), queries),
+            timed(
+                lambda a, b: brute_within(lat, lon, a, b, RADIUS_MILES),
+                queries,
+            ),
+        ),
+        (
+            f"nearest {K}",
+            timed(lambda a, b: index.nearest(a, b, K), queries),
+            timed(lambda a, b: brute_nearest(lat, lon, a, b, K), queries),
+        ),
+    ]
+    print(f"{n:,} points, {q:,} queries, index built in {build:.3f}s")
+    print(f"{'':<14} {'grid':>8} {'brute':>8}")
+    for label, grid, brute in rows:
+        print(f"{label:<14} {grid:7.3f}s {brute:7.3f}s  x{brute / grid:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Benchmark the shared hours parser on 100k rows.
+
+Compares parsing every row from scratch against the memoized engine used by
+the Google fetcher and ``prep_restaurants``. Run from the repository root
+after ``pip install -e .``:
+
+    python benchmarks/bench_hours.py [rows]
+"""
+
+from __future__ import annotations
+
+import random
+import sys
+import time
+
+from restaurants import hours
+
+DAY_NAMES = [
+    "Monday",
+    "Tuesday",
+    "Wednesday",
+    "Thursday",
+    "Friday",
+    "Saturday",
+    "Sunday",
+]
+RANGES = [
+    "11:00 AM – 9:00 PM",
+    "7:00 AM – 2:00 PM",
+    "11 AM – 2 PM, 5 – 9 PM",
+    "6:00 PM – 2:00 AM",
+    "Open 24 hours",
+    "Closed",
+]
+
+
+def make_rows(n: int, schedules: int = 500) -> list[tuple[str, ...]]:
+    rng = random.Random(42)
+    pool = [
+        tuple(f"{d}: {rng.choice(RANGES)}" for d in DAY_NAMES)
+        for _ in range(schedules)
+    ]
+    return [rng.choice(pool) for _ in range(n)]
+
+
+def bench(label: str, func, rows) -> None:
+    start = time.perf_counter()
+    for row in rows:
+        func(row)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {elapsed:7.3f}s  {len(rows) / elapsed:12,.0f} rows/s")
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = sys.argv[1:] if argv is None else argv
+    n = int(args[0]) if args else 100_000
+    rows = make_rows(n)
+    displays = [hours.parse_weekday_text(r).display for r in rows]
+
+    def uncached(row: tuple[str, ...]) -> None:
+        hours._normalize_text.cache_clear()
+        hours.parse_weekday_text.__wrapped__(row)
+
+    bench("weekday_text uncached", uncached, rows)
+    hours.parse_weekday_text.cache_clear()
+    bench("weekday_text memoized", hours.parse_weekday_text, rows)
+    hours._parse_display.cache_clear()
+    bench("prep split memoized", hours.split_display, displays)
+    print(hours.parse_weekday_text.cache_info())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Benchmark lead scoring and top-N selection on 1M rows.
+
+Run from the repository root after ``pip install -e .``:
+
+    python benchmarks/bench_lead_score.py [rows] [top]
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from restaurants import lead_score
+
+NAMES = ["Taco Shop", "Pho House", "Starbucks", "Dairy Queen", "Cafe"]
+
+
+def make_frame(n: int) -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    idx = rng.integers(0, len(NAMES), n)
+    names = np.array(NAMES, dtype=object)[idx] + " " + (
+        rng.integers(0, n, n).astype(str).astype(object)
+    )
+    return pd.DataFrame(
+        {
+            "Name": names,
+            "Rating": rng.uniform(1, 5, n),
+            "User Ratings Total": rng.integers(0, 3000, n),
+            "yelp_rating": rng.uniform(1, 5, n),
+            "yelp_reviews": rng.integers(0, 1000, n),
+            "yelp_status": rng.choice(["open", "closed", None], n),
+            "Distance Miles": rng.uniform(0, 40, n),
+            "Owner Name": rng.choice(["Owner", None], n),
+            "facebook_url": rng.choice(["fb", None], n),
+            "instagram_url": rng.choice(["ig", None], n),
+            "Website": rng.choice(["w", None], n),
+            "Business Status": rng.choice(
+                ["OPERATIONAL", "CLOSED_TEMPORARILY"], n
+            ),
+        }
+    )
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = sys.argv[1:] if argv is None else argv
+    n = int(args[0]) if args else 1_000_000
+    top = int(args[1]) if len(args) > 1 else lead_score.TOP_N
+    df = make_frame(n)
+
+    start = time.perf_counter()
+    feats = lead_score.features(df)
+    feat_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    out = lead_score.top_leads(df, top)
+    total = time.perf_counter() - start
+
+    print(f"{n:,} rows, {feats.shape[1]} features, top {len(out):,}")
+    print(f"features      {feat_time:7.3f}s")
+    print(f"score + top-N {total:7.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Benchmark entity resolution on 500k records.
+
+Generates Google records plus Yelp copies of a fifth of them with jittered
+coordinates, reformatted phones and name variations, then times blocking,
+scoring and clustering. Reports the candidate pairs compared against the
+``n²/2`` an all-pairs comparison would need. Run from the repository root
+after ``pip install -e .``:
+
+    python benchmarks/bench_resolve.py [rows]
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from restaurants import resolve
+
+WORDS = [
+    "Taco", "Pho", "Pizza", "Burger", "Sushi", "Thai", "Deli", "Bistro",
+    "Noodle", "Curry", "Bagel", "Donut", "Teriyaki", "Gyro", "Bakery",
+]
+
+
+def make_frame(n: int) -> tuple[pd.DataFrame, int]:
+    rng = np.random.default_rng(42)
+    dupes = n // 5
+    base = n - dupes
+    first = np.array(WORDS, dtype=object)[rng.integers(0, len(WORDS), base)]
+    names = first + " " + rng.integers(0, 10**6, base).astype(str)
+    phones = rng.integers(2_000_000_000, 9_999_999_999, base).astype(str)
+    google = pd.DataFrame(
+        {
+            "place_id": [f"g{i}" for i in range(base)],
+            "name": names,
+            "lat": rng.uniform(46.5, 48.5, base),
+            "lon": rng.uniform(-123.5, -121.5, base),
+            "local_phone": phones,
+            "source": "google_places_smb",
+        }
+    )
+    pick = rng.choice(base, dupes, replace=False)
+    yelp = pd.DataFrame(
+        {
+            "place_id": [f"y{i}" for i in range(dupes)],
+            "name": google["name"].to_numpy()[pick] + " Restaurant",
+            "lat": google["lat"].to_numpy()[pick]
+            + rng.normal(0, 0.0002, dupes),
+            "lon": google["lon"].to_numpy()[pick]
+            + rng.normal(0, 0.0002, dupes),
+            "local_phone": np.where(
+                rng.random(dupes) < 0.5,
+                "+1 " + phones[pick],
+                None,
+            ),
+            "source": "yelp_fetch",
+        }
+    )
+    return pd.concat([google, yelp], ignore_index=True), dupes
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = sys.argv[1:] if argv is None else argv
+    n = int(args[0]) if args else 500_000
+    df, dupes = make_frame(n)
+
+    start = time.perf_counter()
+    i, j = resolve.candidate_pairs(df)
+    blocking = time.perf_counter() - start
+    start = time.perf_counter()
+    same = resolve.match_pairs(df, i, j)
+    scoring = time.perf_counter() - start
+    start = time.perf_counter()
+    clusters = resolve.cluster_ids(df)
+    total = time.perf_counter() - start
+
+    merged = int((clusters != df["place_id"]).sum())
+    print(f"{n:,} records, {dupes:,} planted duplicates")
+    print(f"candidate pairs {len(i):,} vs {n * (n - 1) // 2:,} all-pairs")
+    print(f"matched pairs   {int(same.sum()):,}, records merged {merged:,}")
+    print(f"blocking        {blocking:7.3f}s")
+    print(f"scoring         {scoring:7.3f}s")
+    print(f"end to end      {total:7.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Check CLI cold-start import time against a budget.
+
+Imports every entry-point module in a fresh interpreter with
+``-X importtime`` and reports its cumulative import time (best of several
+runs) plus any heavy dependency that was imported eagerly. Exits with
+status 1 when a module exceeds the budget. Run from the repository root
+after ``pip install -e .``:
+
+    python benchmarks/bench_startup.py [budget_ms]
+"""
+
+from __future__ import annotations
+
+import subprocess
+import sys
+
+MODULES = (
+    "restaurants.gui",
+    "restaurants.refresh_restaurants",
+    "restaurants.toast_leads",
+    "restaurants.prep_restaurants",
+    "restaurants.lead_score",
+    "restaurants.resolve",
+    "restaurants.wa_registry",
+)
+# Packages that must only load on first use
+HEAVY = ("pandas", "numpy", "requests", "aiohttp", "bs4", "tqdm")
+BUDGET_MS = 300.0
+RUNS = 5
+
+
+def import_profile(module: str) -> tuple[float, list[str]]:
+    """Return the module's cumulative import time in ms and the heavy
+    packages imported along the way."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total = 0.0
+    heavy = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _self, cumulative, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        if name == module:
+            total = int(cumulative) / 1000
+        top = name.split(".")[0]
+        if top in HEAVY:
+            heavy.add(top)
+    return total, sorted(heavy)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = sys.argv[1:] if argv is None else argv
+    budget = float(args[0]) if args else BUDGET_MS
+    failed = False
+    print(f"{'module':<34} {'import':>9}  heavy deps loaded")
+    for module in MODULES:
+        runs = [import_profile(module) for _ in range(RUNS)]
+        best = min(ms for ms, _ in runs)
+        heavy = runs[0][1]
+        over = best > budget or bool(heavy)
+        failed |= over
+        flag = "  OVER BUDGET" if over else ""
+        print(
+            f"{module:<34} {best:7.1f}ms  {', '.join(heavy) or '-'}{flag}"
+        )
+    print(f"budget {budget:.0f}ms per module")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
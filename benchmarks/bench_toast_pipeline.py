@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Benchmark the pipelined Toast lead fetcher against the old loop.
+
+The old loop searched one ZIP at a time, opened a new Details pool per
+page, waited for every Details call and then slept before the next page
+token. Both run against simulated Google latencies: 300 ms per search,
+200-600 ms per Details call, three pages of 20 places per ZIP and the
+2 s page-token delay (12 ZIP codes by default). Run from the repository
+root after ``pip install -e .``:
+
+    python benchmarks/bench_toast_pipeline.py [zips]
+"""
+
+from __future__ import annotations
+
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from restaurants import toast_leads
+
+PAGES = 3
+PER_PAGE = 20
+
+
+def search_page(params: dict, session: object) -> dict:
+    time.sleep(0.3)
+    if "pagetoken" in params:
+        zip_code, page = params["pagetoken"].split(":")
+    else:
+        zip_code, page = params["query"].split()[2], "0"
+    page_no = int(page)
+    ids = [f"{zip_code}-{page_no}-{i}" for i in range(PER_PAGE)]
+    results = [{"name": f"Place {pid}", "place_id": pid} for pid in ids]
+    data: dict = {"results": results}
+    if page_no + 1 < PAGES:
+        data["next_page_token"] = f"{zip_code}:{page_no + 1}"
+    return data
+
+
+def fetch_details(place_id: str, session: object) -> dict:
+    time.sleep(random.uniform(0.2, 0.6))
+    return {"name": place_id}
+
+
+def old_fetch(zip_codes: list[str]) -> int:
+    leads = 0
+    for zip_code in zip_codes:
+        params = {"query": f"restaurants in {zip_code} WA"}
+        while True:
+            data = search_page(params, None)
+            with ThreadPoolExecutor(toast_leads.DETAIL_WORKERS) as pool:
+                futures = [
+                    pool.submit(fetch_details, r["place_id"], None)
+                    for r in data["results"]
+                ]
+                leads += sum(1 for f in as_completed(futures) if f.result())
+            token = data.get("next_page_token")
+            if not token:
+                break
+            time.sleep(toast_leads.PAGE_TOKEN_DELAY)
+            params = {"pagetoken": token}
+    return leads
+
+
+def new_fetch(zip_codes: list[str], root: Path) -> int:
+    store = toast_leads.SeenStore(root / "seen.sqlite", root / "none.json")
+    writer = toast_leads.LeadWriter(str(root / "leads.csv"), store)
+    runs = toast_leads.LeadPipeline(None, store, writer).run(zip_codes)
+    writer.close()
+    store.close()
+    worst = max(runs, key=lambda r: r.elapsed)
+    print(f"  slowest ZIP  {worst.summary()}")
+    return writer.count
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = sys.argv[1:] if argv is None else argv
+    n = int(args[0]) if args else 12
+    zip_codes = [str(98500 + i) for i in range(n)]
+    toast_leads.search_page = search_page
+    toast_leads.fetch_details = fetch_details
+    print(f"{n} ZIP codes, {n * PAGES * PER_PAGE} places")
+
+    start = time.perf_counter()
+    leads = old_fetch(zip_codes)
+    print(f"old        {time.perf_counter() - start:7.1f}s  {leads} leads")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        leads = new_fetch(zip_codes, Path(tmp))
+        print(f"pipelined  {time.perf_counter() - start:7.1f}s  {leads} leads")
+
+
+if __name__ == "__main__":
+    main()
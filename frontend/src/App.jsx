@@ -6,27 +6,86 @@ import ZipFilter from './ZipFilter.jsx';
 
 mapboxgl.accessToken = import.meta.env.VITE_MAPBOX_TOKEN;
 
+const TILE_ROOT = '/static/tiles'
+const ZIP_ROOT = '/static/zips'
+
+function lonToTile(lon, z) {
+  return Math.floor(((lon + 180) / 360) * 2 ** z)
+}
+
+function latToTile(lat, z) {
+  const rad = (Math.max(Math.min(lat, 85.0511), -85.0511) * Math.PI) / 180
+  const y = (1 - Math.log(Math.tan(rad) + 1 / Math.cos(rad)) / Math.PI) / 2
+  return Math.floor(y * 2 ** z)
+}
+
+// Keys of the exported tiles covering the map's current viewport
+function visibleTiles(map, index) {
+  const z = Math.max(
+    index.minzoom,
+    Math.min(index.maxzoom, Math.floor(map.getZoom())),
+  )
+  const b = map.getBounds()
+  const max = 2 ** z - 1
+  const x0 = Math.max(0, lonToTile(b.getWest(), z))
+  const x1 = Math.min(max, lonToTile(b.getEast(), z))
+  const y0 = Math.max(0, latToTile(b.getNorth(), z))
+  const y1 = Math.min(max, latToTile(b.getSouth(), z))
+  const keys = []
+  for (let x = x0; x <= x1; x++) {
+    for (let y = y0; y <= y1; y++) {
+      const key = `${z}/${x}/${y}`
+      if (index.tiles[key]) keys.push(key)
+    }
+  }
+  return keys
+}
+
 function App() {
   const mapContainer = useRef(null);
   const mapRef = useRef(null);
   const [loading, setLoading] = useState(true);
   const [noData, setNoData] = useState(false);
   const [features, setFeatures] = useState([]);
-  const [zipFilter, setZipFilter] = useState('');
+  const [zipFilter, setZipFilter] = useState([]);
+  const [manifest, setManifest] = useState(null);
+  const [zipFeatures, setZipFeatures] = useState(null);
+  const shardCache = useRef(new Map());
 
   useEffect(() => {
+    const cache = new Map()
+
+    async function loadTile(key) {
+      if (!cache.has(key)) {
+        cache.set(
+          key,
+          fetch(`${TILE_ROOT}/${key}.json`)
+            .then(res => res.json())
+            .then(tile => tile.features || [])
+            .catch(err => {
+              console.error(err)
+              cache.delete(key)
+              return []
+            }),
+        )
+      }
+      return cache.get(key)
+    }
+
     async function init() {
       setLoading(true)
       try {
-        const res = await fetch('/static/restaurants.geojson')
-        const geojson = await res.json()
-        const all = geojson.features || []
-        if (all.length === 0) {
+        const res = await fetch(`${TILE_ROOT}/index.json`)
+        const index = await res.json()
+        fetch(`${ZIP_ROOT}/manifest.json`)
+          .then(r => r.json())
+          .then(setManifest)
+          .catch(err => console.error(err))
+        if (!index.count) {
           setNoData(true)
           setLoading(false)
           return
         }
-        setFeatures(all)
 
         const map = new mapboxgl.Map({
           container: mapContainer.current,
@@ -36,13 +95,23 @@ function App() {
         })
         mapRef.current = map
 
+        // Clusters are precomputed per zoom by export_geojson, so the
+        // source only ever holds the tiles in view
+        let request = 0
+        async function refresh() {
+          const current = ++request
+          const tiles = await Promise.all(
+            visibleTiles(map, index).map(loadTile),
+          )
+          if (current !== request) return
+          setFeatures(tiles.flat())
+          setLoading(false)
+        }
+
         map.on('load', () => {
           map.addSource('restaurants', {
             type: 'geojson',
-            data: geojson,
-            cluster: true,
-            clusterMaxZoom: 14,
-            clusterRadius: 50,
+            data: { type: 'FeatureCollection', features: [] },
           })
 
       map.addLayer({
@@ -86,13 +155,8 @@ function App() {
         },
       })
 
-          function handleSource(e) {
-            if (e.sourceId === 'restaurants' && map.isSourceLoaded('restaurants')) {
-              setLoading(false)
-              map.off('sourcedata', handleSource)
-            }
-          }
-          map.on('sourcedata', handleSource)
+          map.on('moveend', refresh)
+          refresh()
         })
       } catch (err) {
         console.error(err)
@@ -106,14 +170,66 @@ function App() {
     return () => mapRef.current && mapRef.current.remove()
   }, [])
 
+  // Selected ZIPs load their own shards; file names embed a content hash, so
+  // a shard is fetched once per version
+  useEffect(() => {
+    if (!manifest || zipFilter.length === 0) {
+      setZipFeatures(null)
+      return
+    }
+    const selected = Object.keys(manifest.zips).filter(z =>
+      zipFilter.some(prefix => z.startsWith(prefix)),
+    )
+    let cancelled = false
+    Promise.all(
+      selected.map(z => {
+        const { file } = manifest.zips[z]
+        const cache = shardCache.current
+        if (!cache.has(file)) {
+          cache.set(
+            file,
+            fetch(`${ZIP_ROOT}/${file}`)
+              .then(res => res.json())
+              .then(shard => shard.features || []),
+          )
+        }
+        return cache.get(file)
+      }),
+    )
+      .then(shards => {
+        if (cancelled) return
+        setZipFeatures(shards.flat())
+        const boxes = selected.map(z => manifest.zips[z].bbox)
+        if (boxes.length && mapRef.current) {
+          mapRef.current.fitBounds(
+            [
+              [
+                Math.min(...boxes.map(b => b[0])),
+                Math.min(...boxes.map(b => b[1])),
+              ],
+              [
+                Math.max(...boxes.map(b => b[2])),
+                Math.max(...boxes.map(b => b[3])),
+              ],
+            ],
+            { padding: 40, maxZoom: 15 },
+          )
+        }
+      })
+      .catch(err => console.error(err))
+    return () => {
+      cancelled = true
+    }
+  }, [zipFilter, manifest])
+
   useEffect(() => {
-    if (!mapRef.current || features.length === 0) return
-    const filtered = zipFilter
-      ? features.filter(f => (f.properties?.zip_code || '').startsWith(zipFilter))
-      : features
-    const data = { type: 'FeatureCollection', features: filtered }
-    mapRef.current.getSource('restaurants').setData(data)
-  }, [zipFilter, features])
+    const source = mapRef.current?.getSource('restaurants')
+    if (!source) return
+    source.setData({
+      type: 'FeatureCollection',
+      features: zipFeatures ?? features,
+    })
+  }, [zipFeatures, features])
 
   if (noData) {
     return <div className="no-data">No data found</div>
@@ -121,7 +237,10 @@ function App() {
 
   return (
     <>
-      <ZipFilter onChange={setZipFilter} />
+      <ZipFilter
+        zips={manifest ? Object.keys(manifest.zips) : []}
+        onChange={setZipFilter}
+      />
       {loading && <div className="spinner">Loading...</div>}
       <div ref={mapContainer} className="map-container" />
     </>
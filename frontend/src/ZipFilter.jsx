@@ -1,22 +1,36 @@
 import { useState } from 'react'
 
-function ZipFilter({ onChange }) {
+// Comma-separated ZIP prefixes, suggested from the shard manifest
+function ZipFilter({ zips = [], onChange }) {
   const [zip, setZip] = useState('')
 
   function handleChange(e) {
     const value = e.target.value
     setZip(value)
-    onChange(value.trim())
+    onChange(
+      value
+        .split(',')
+        .map(z => z.trim())
+        .filter(Boolean),
+    )
   }
 
   return (
-    <input
-      type="text"
-      placeholder="Filter by ZIP"
-      value={zip}
-      onChange={handleChange}
-      style={{ position: 'absolute', top: 10, left: 10, zIndex: 1 }}
-    />
+    <>
+      <input
+        type="text"
+        placeholder="Filter by ZIP (e.g. 98501, 98502)"
+        list="zip-options"
+        value={zip}
+        onChange={handleChange}
+        style={{ position: 'absolute', top: 10, left: 10, zIndex: 1 }}
+      />
+      <datalist id="zip-options">
+        {zips.map(z => (
+          <option key={z} value={z} />
+        ))}
+      </datalist>
+    </>
   )
 }
 
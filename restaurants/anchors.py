@@ -0,0 +1,109 @@
+"""Base locations reps work from, used for distance columns.
+
+Anchors are read from ``anchors.csv`` at the repository root (or the file
+named by ``ANCHORS_FILE``) with one ``name,lat,lon`` entry per line. Without
+a file the defaults below are used. The file is read on first use of
+``ANCHORS``, after ``.env`` has been loaded.
+"""
+
+from __future__ import annotations
+
+import functools
+import logging
+import os
+import pathlib
+from typing import Any
+
+try:
+    from restaurants import config
+    from restaurants.utils import (
+        haversine_miles_matrix,
+        lazy_import,
+        nearest_column,
+    )
+except ImportError:  # pragma: no cover - fallback for running as script
+    import config  # type: ignore
+    from utils import (  # type: ignore
+        haversine_miles_matrix,
+        lazy_import,
+        nearest_column,
+    )
+
+np = lazy_import("numpy")
+
+logger = logging.getLogger(__name__)
+
+ANCHOR_FILE = pathlib.Path(__file__).resolve().parents[1] / "anchors.csv"
+
+DEFAULT_ANCHORS: dict[str, tuple[float, float]] = {
+    "Bellevue Square": (47.6154255, -122.2035954),
+    "Olympia": (47.0379, -122.9007),
+}
+
+
+def load_anchors(
+    path: pathlib.Path | None = None,
+) -> dict[str, tuple[float, float]]:
+    """Return ``name -> (lat, lon)`` from ``path`` or the defaults."""
+    if path is None:
+        env = os.getenv("ANCHORS_FILE")
+        path = pathlib.Path(env) if env else ANCHOR_FILE
+    try:
+        lines = path.read_text(encoding="utf-8").splitlines()
+    except FileNotFoundError:
+        return dict(DEFAULT_ANCHORS)
+
+    anchors: dict[str, tuple[float, float]] = {}
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.lower().startswith("name,"):
+            continue  # header
+        parts = [p.strip() for p in line.rsplit(",", 2)]
+        try:
+            name, lat, lon = parts[0], float(parts[1]), float(parts[2])
+        except (IndexError, ValueError):
+            logger.warning("Invalid anchor ignored: %s", line)
+            continue
+        if not name or not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            logger.warning("Invalid anchor ignored: %s", line)
+            continue
+        anchors[name] = (lat, lon)
+    if not anchors:
+        logger.warning("No valid anchors in %s; using defaults", path)
+        return dict(DEFAULT_ANCHORS)
+    return anchors
+
+
+@functools.cache
+def default_anchors() -> dict[str, tuple[float, float]]:
+    """Return the configured anchors, loading them on the first call."""
+    config.load_env()
+    return load_anchors()
+
+
+def __getattr__(name: str) -> Any:
+    """Resolve ``ANCHORS`` on first access."""
+    if name == "ANCHORS":
+        return default_anchors()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def anchor_distances(
+    lat: np.ndarray,
+    lon: np.ndarray,
+    anchors: dict[str, tuple[float, float]] | None = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return distances to every anchor plus the nearest one per point.
+
+    The result is the ``n × len(anchors)`` distance matrix in miles, the
+    nearest anchor's name (``None`` without coordinates) and its distance.
+    """
+    anchors = default_anchors() if anchors is None else anchors
+    coords = np.array(list(anchors.values()), dtype=float).reshape(-1, 2)
+    dist = haversine_miles_matrix(lat, lon, coords[:, 0], coords[:, 1])
+    idx, nearest = nearest_column(dist)
+    # Index -1 (no coordinates) picks the trailing None
+    labels = np.array([*anchors, None], dtype=object)
+    return dist, labels[idx], nearest
@@ -0,0 +1,346 @@
+"""Read-only HTTP API over ``dela.sqlite``.
+
+Serves places as GeoJSON filtered by bounding box, ZIP code, text and
+radius, plus full details per place, without waiting for an export.
+Queries run on a small pool of read-only connections in worker threads.
+Responses carry an ETag derived from the database's change counter, so
+repeat requests after no refresh are answered with ``304 Not Modified``
+without touching the data, and larger bodies are compressed. The exported
+``backend/static`` files are served under ``/static`` including their
+precompressed ``.gz``/``.br`` copies.
+
+Usage:
+    python -m restaurants.api --port 8080
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import json
+import math
+import pathlib
+import sqlite3
+from typing import Any, AsyncIterator
+
+import numpy as np
+from aiohttp import web
+
+try:
+    from restaurants import loader
+    from restaurants.export_geojson import OUT_DIR
+    from restaurants.utils import haversine_miles_matrix, setup_logging
+except ImportError:  # pragma: no cover - fallback for running as script
+    import loader  # type: ignore
+    from export_geojson import OUT_DIR  # type: ignore
+    from utils import haversine_miles_matrix, setup_logging  # type: ignore
+
+POOL_SIZE = 4
+DEFAULT_LIMIT = 1000
+MAX_LIMIT = 5000
+# Bodies smaller than this aren't worth compressing
+COMPRESS_MIN_BYTES = 1024
+MILES_PER_DEGREE_LAT = 69.0
+# Extra nearest rows fetched for radius queries so the exact haversine
+# order can't lose a place to the flat-earth estimate used in SQL
+RADIUS_SLACK = 1.01
+RADIUS_EXTRA_ROWS = 16
+
+# Columns returned as feature properties; details return every column
+FEATURE_COLUMNS = (
+    "place_id",
+    "name",
+    "rating",
+    "user_ratings_total",
+    "price_level",
+    "category",
+    "website",
+    "zip_code",
+    "business_status",
+)
+
+_ENCODER = json.JSONEncoder(separators=(",", ":"), allow_nan=False)
+
+
+class ReadPool:
+    """Fixed set of read-only SQLite connections shared by request threads.
+
+    A connection is checked out for one query at a time, so at most
+    ``size`` queries run concurrently.
+    """
+
+    def __init__(self, path: pathlib.Path, size: int = POOL_SIZE) -> None:
+        if not path.exists():
+            raise FileNotFoundError(path)
+        self._idle: asyncio.Queue[sqlite3.Connection] = asyncio.Queue()
+        self._all: list[sqlite3.Connection] = []
+        for _ in range(size):
+            conn = sqlite3.connect(
+                f"file:{path}?mode=ro", uri=True, check_same_thread=False
+            )
+            conn.row_factory = sqlite3.Row
+            self._all.append(conn)
+            self._idle.put_nowait(conn)
+
+    @contextlib.asynccontextmanager
+    async def connection(self) -> AsyncIterator[sqlite3.Connection]:
+        conn = await self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put_nowait(conn)
+
+    async def run(self, func: Any, *args: Any) -> Any:
+        """Run ``func(conn, *args)`` in a worker thread."""
+        async with self.connection() as conn:
+            return await asyncio.to_thread(func, conn, *args)
+
+    def close(self) -> None:
+        for conn in self._all:
+            conn.close()
+
+
+POOL_KEY = web.AppKey("pool", ReadPool)
+
+
+def data_version(conn: sqlite3.Connection) -> int:
+    """Return a counter that grows with every change to places.
+
+    ``sqlite_sequence`` keeps the last ``place_changes`` sequence even after
+    prep prunes the feed. A database without the feed reports 0; ``main``
+    adds it with :func:`loader.ensure_db` before serving.
+    """
+    try:
+        row = conn.execute(
+            "SELECT seq FROM sqlite_sequence WHERE name='place_changes'"
+        ).fetchone()
+    except sqlite3.OperationalError:  # no AUTOINCREMENT table yet
+        return 0
+    return row[0] if row else 0
+
+
+def _floats(text: str, count: int, name: str) -> list[float]:
+    try:
+        values = [float(v) for v in text.split(",")]
+    except ValueError:
+        values = []
+    if len(values) != count or not all(map(math.isfinite, values)):
+        raise web.HTTPBadRequest(
+            text=f"{name} needs {count} comma-separated numbers"
+        )
+    return values
+
+
+def _limit(query: Any) -> int:
+    try:
+        limit = int(query.get("limit", DEFAULT_LIMIT))
+    except ValueError:
+        raise web.HTTPBadRequest(text="limit must be an integer")
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def build_query(query: Any) -> tuple[str, list[Any], tuple | None]:
+    """Return SQL, parameters and the ``(lat, lon, miles)`` radius filter."""
+    where = ["lat IS NOT NULL", "lon IS NOT NULL"]
+    params: list[Any] = []
+    radius = None
+    if "bbox" in query:
+        west, south, east, north = _floats(query["bbox"], 4, "bbox")
+        where.append("lat BETWEEN ? AND ? AND lon BETWEEN ? AND ?")
+        params += [south, north, west, east]
+    if "zip" in query:
+        zips = [z.strip() for z in query["zip"].split(",") if z.strip()]
+        if zips:
+            where.append(f"zip_code IN ({', '.join('?' * len(zips))})")
+            params += zips
+    if query.get("q"):
+        text = query["q"].replace("\\", "\\\\")
+        text = text.replace("%", "\\%").replace("_", "\\_")
+        where.append(
+            "(name LIKE ? ESCAPE '\\' OR category LIKE ? ESCAPE '\\'"
+            " OR formatted_address LIKE ? ESCAPE '\\')"
+        )
+        params += [f"%{text}%"] * 3
+    order = "place_id"
+    limit = _limit(query)
+    if "near" in query:
+        lat, lon = _floats(query["near"], 2, "near")
+        miles = _floats(query.get("radius", "1"), 1, "radius")[0]
+        # The bounding box uses the lat/lon index. SQL then keeps the
+        # nearest rows by a flat-earth distance in degrees of latitude;
+        # exact haversine distances are computed on those afterwards.
+        dlat = miles / MILES_PER_DEGREE_LAT
+        cos = max(math.cos(math.radians(lat)), 1e-6)
+        dlon = dlat / cos
+        where.append("lat BETWEEN ? AND ? AND lon BETWEEN ? AND ?")
+        params += [lat - dlat, lat + dlat, lon - dlon, lon + dlon]
+        flat = "((lat - ?) * (lat - ?) + (lon - ?) * (lon - ?) * ?)"
+        flat_params = [lat, lat, lon, lon, cos * cos]
+        where.append(f"{flat} <= ?")
+        params += [*flat_params, (dlat * RADIUS_SLACK) ** 2]
+        order = flat
+        params += flat_params
+        limit += RADIUS_EXTRA_ROWS
+        radius = (lat, lon, miles)
+    cols = ", ".join(("lat", "lon", *FEATURE_COLUMNS))
+    sql = (
+        f"SELECT {cols} FROM places WHERE {' AND '.join(where)}"
+        f" ORDER BY {order} LIMIT {limit}"
+    )
+    return sql, params, radius
+
+
+def query_places(
+    conn: sqlite3.Connection,
+    sql: str,
+    params: list[Any],
+    radius: tuple | None,
+    limit: int,
+) -> dict:
+    """Run a places query and return a FeatureCollection."""
+    rows = conn.execute(sql, params).fetchall()
+    if radius is not None and rows:
+        lat, lon, miles = radius
+        dist = haversine_miles_matrix(
+            np.array([r["lat"] for r in rows], dtype=float),
+            np.array([r["lon"] for r in rows], dtype=float),
+            [lat],
+            [lon],
+        )[:, 0]
+        order = np.argsort(dist, kind="stable")
+        order = order[dist[order] <= miles][:limit]
+        rows = [rows[i] for i in order]
+        extra = [{"distance_miles": round(float(dist[i]), 3)} for i in order]
+    else:
+        extra = [{}] * len(rows)
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "id": row["place_id"],
+                "geometry": {
+                    "type": "Point",
+                    "coordinates": [row["lon"], row["lat"]],
+                },
+                "properties": {
+                    **{c: row[c] for c in FEATURE_COLUMNS},
+                    **more,
+                },
+            }
+            for row, more in zip(rows, extra)
+        ],
+    }
+
+
+def place_details(conn: sqlite3.Connection, place_id: str) -> dict | None:
+    row = conn.execute(
+        "SELECT * FROM places WHERE place_id=?", (place_id,)
+    ).fetchone()
+    return dict(row) if row is not None else None
+
+
+def _etag(version: int, request: web.Request) -> str:
+    digest = hashlib.sha1(f"{version}:{request.path_qs}".encode()).hexdigest()
+    return f'W/"{digest[:20]}"'
+
+
+def _not_modified(request: web.Request, etag: str) -> bool:
+    header = request.headers.get("If-None-Match", "")
+    return etag in {t.strip() for t in header.split(",")} or header == "*"
+
+
+def _json(data: Any, etag: str) -> web.Response:
+    body = _ENCODER.encode(data).encode("utf-8")
+    resp = web.Response(
+        body=body,
+        content_type="application/json",
+        headers={"ETag": etag, "Cache-Control": "no-cache"},
+    )
+    if len(body) >= COMPRESS_MIN_BYTES:
+        resp.enable_compression()
+    return resp
+
+
+async def places(request: web.Request) -> web.StreamResponse:
+    pool = request.app[POOL_KEY]
+    sql, params, radius = build_query(request.query)
+    async with pool.connection() as conn:
+        etag = _etag(await asyncio.to_thread(data_version, conn), request)
+        if _not_modified(request, etag):
+            return web.Response(status=304, headers={"ETag": etag})
+        data = await asyncio.to_thread(
+            query_places, conn, sql, params, radius, _limit(request.query)
+        )
+    return _json(data, etag)
+
+
+async def place(request: web.Request) -> web.StreamResponse:
+    pool = request.app[POOL_KEY]
+    async with pool.connection() as conn:
+        etag = _etag(await asyncio.to_thread(data_version, conn), request)
+        if _not_modified(request, etag):
+            return web.Response(status=304, headers={"ETag": etag})
+        data = await asyncio.to_thread(
+            place_details, conn, request.match_info["place_id"]
+        )
+    if data is None:
+        raise web.HTTPNotFound(text="Unknown place")
+    return _json(data, etag)
+
+
+def create_app(
+    db_path: pathlib.Path | None = None,
+    static_dir: pathlib.Path | None = OUT_DIR,
+    pool_size: int = POOL_SIZE,
+) -> web.Application:
+    """Return the API application reading ``db_path``."""
+    app = web.Application()
+    path = db_path or loader.DB_PATH
+
+    async def pool_ctx(app: web.Application) -> AsyncIterator[None]:
+        app[POOL_KEY] = ReadPool(path, pool_size)
+        yield
+        app[POOL_KEY].close()
+
+    app.cleanup_ctx.append(pool_ctx)
+    app.router.add_get("/api/places", places)
+    app.router.add_get("/api/places/{place_id}", place)
+    if static_dir is not None and static_dir.is_dir():
+        app.router.add_static("/static", static_dir)
+    return app
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve dela.sqlite over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument(
+        "--db",
+        default=str(loader.DB_PATH),
+        help="SQLite database to serve",
+    )
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        default=POOL_SIZE,
+        help="Read-only connections (concurrent queries)",
+    )
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    db_path = pathlib.Path(args.db)
+    # Create the schema, its indexes and the change feed behind the ETags
+    # before opening read-only
+    loader.ensure_db(db_path).close()
+    web.run_app(
+        create_app(db_path, pool_size=args.pool_size),
+        host=args.host,
+        port=args.port,
+    )
+
+
+if __name__ == "__main__":  # pragma: no cover - manual execution
+    main()
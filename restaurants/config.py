@@ -6,57 +6,53 @@ for Olympia, WA, including ZIP codes and geographic coordinates.
 
 from __future__ import annotations
 
+import functools
 import logging
 import os
 import pathlib
-from typing import IO, List
+from typing import TYPE_CHECKING, Any, List
 
 from restaurants.utils import is_valid_zip
 
-# Set up basic logging to warn about configuration issues
-logging.basicConfig(level=logging.WARNING)
 logger = logging.getLogger(__name__)
 
-# Load environment variables from .env file if python-dotenv is available
-try:
-    from dotenv import load_dotenv
-except ImportError:
-    from os import PathLike
-
-    def load_dotenv(
-        dotenv_path: str | PathLike[str] | None = None,
-        stream: IO[str] | None = None,
-        verbose: bool = False,
-        override: bool = False,
-        interpolate: bool = True,
-        encoding: str | None = "utf-8",
-    ) -> bool:
-        logger.warning("python-dotenv not installed, .env file not loaded")
-        return False
-
-
-load_dotenv()
-
-# API keys from environment variables
-GOOGLE_API_KEY: str | None = os.getenv("GOOGLE_API_KEY")
-YELP_API_KEY: str | None = os.getenv("YELP_API_KEY")
-DOORDASH_API_KEY: str | None = os.getenv("DOORDASH_API_KEY")
-UBER_EATS_API_KEY: str | None = os.getenv("UBER_EATS_API_KEY")
+# API keys are read from the environment (after ``.env``) on first access
+# through ``__getattr__`` below, so importing this module has no side effects.
+_ENV_KEYS = (
+    "GOOGLE_API_KEY",
+    "YELP_API_KEY",
+    "DOORDASH_API_KEY",
+    "UBER_EATS_API_KEY",
+)
+_REQUIRED = ("GOOGLE_API_KEY", "YELP_API_KEY")
+
+if TYPE_CHECKING:
+    GOOGLE_API_KEY: str | None
+    YELP_API_KEY: str | None
+    DOORDASH_API_KEY: str | None
+    UBER_EATS_API_KEY: str | None
+    TARGET_OLYMPIA_ZIPS: List[str]
 
 # Default ZIP code for Olympia, WA
 DEFAULT_ZIP: str = "98501"
 
-# Check for required environment variables
-_required = {
-    "GOOGLE_API_KEY": GOOGLE_API_KEY,
-    "YELP_API_KEY": YELP_API_KEY,
-}
-_missing = [name for name, val in _required.items() if not val]
-if _missing:
-    logger.warning(
-        f"Missing required env vars: {', '.join(_missing)}. "
-        "Add them to your .env file or export them before running."
-    )
+
+@functools.cache
+def load_env() -> None:
+    """Load ``.env`` once and warn about missing required keys."""
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        logger.warning("python-dotenv not installed, .env file not loaded")
+    else:
+        load_dotenv()
+    missing = [name for name in _REQUIRED if not os.getenv(name)]
+    if missing:
+        logger.warning(
+            f"Missing required env vars: {', '.join(missing)}. "
+            "Add them to your .env file or export them before running."
+        )
+
 
 # ---------------------------------------------------------------------------
 # ZIP code loading
@@ -83,8 +79,19 @@ def load_zip_codes(path: pathlib.Path = ZIP_FILE) -> list[str]:
         return []
 
 
-# List of ZIP codes for the Olympia, WA area loaded at import time
-TARGET_OLYMPIA_ZIPS: List[str] = load_zip_codes()
+def __getattr__(name: str) -> Any:
+    """Resolve API keys and ``TARGET_OLYMPIA_ZIPS`` on first access."""
+    if name in _ENV_KEYS:
+        load_env()
+        value: Any = os.getenv(name)
+    elif name == "TARGET_OLYMPIA_ZIPS":
+        # ZIP codes for the Olympia, WA area
+        value = load_zip_codes()
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
 
 # Geographic coordinates for Olympia, WA
 OLYMPIA_LAT: float = 47.0379
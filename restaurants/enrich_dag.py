@@ -0,0 +1,147 @@
+"""Run enrichment steps as a dependency graph on one event loop.
+
+Each :class:`EnrichmentNode` declares the columns it reads and writes. A node
+starts as soon as every node producing one of its inputs has finished, so
+independent enrichments for the same rows run concurrently. All nodes share
+one pooled ``aiohttp`` session and per-node timings are logged and returned.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import logging
+import time
+from typing import Any, Callable
+
+from restaurants import http_client
+from restaurants.utils import lazy_import
+
+aiohttp = lazy_import("aiohttp")
+pd = lazy_import("pandas")
+
+
+class EnrichmentNode:
+    """One enrichment step with declared columns and a concurrency budget.
+
+    Row-wise nodes call ``func(row_dict)`` once per row and return a dict of
+    output values; at most ``concurrency`` rows are in flight and synchronous
+    functions run in worker threads. Frame-wise nodes call
+    ``func(frame, session, concurrency)`` once with the input columns and
+    return a DataFrame holding the outputs.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[..., Any],
+        inputs: tuple[str, ...] = (),
+        outputs: tuple[str, ...] = (),
+        concurrency: int = 1,
+        row_wise: bool = False,
+    ) -> None:
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.concurrency = max(1, concurrency)
+        self.row_wise = row_wise
+
+    async def _call(self, *args: Any) -> Any:
+        if inspect.iscoroutinefunction(self.func):
+            return await self.func(*args)
+        result = await asyncio.to_thread(self.func, *args)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    async def execute(
+        self, frame: pd.DataFrame, session: aiohttp.ClientSession
+    ) -> pd.DataFrame:
+        if not self.row_wise:
+            return await self._call(frame, session, self.concurrency)
+
+        sem = asyncio.Semaphore(self.concurrency)
+
+        async def one(row: dict[str, Any]) -> dict[str, Any]:
+            async with sem:
+                return await self._call(row) or {}
+
+        rows = await asyncio.gather(
+            *(one(r) for r in frame.to_dict("records"))
+        )
+        return pd.DataFrame(
+            [{c: r.get(c) for c in self.outputs} for r in rows],
+            index=frame.index,
+            columns=list(self.outputs),
+        )
+
+
+def _order(nodes: list[EnrichmentNode]) -> dict[str, set[str]]:
+    """Return each node's dependencies, raising on duplicates or cycles."""
+    producers: dict[str, str] = {}
+    for node in nodes:
+        for col in node.outputs:
+            if col in producers:
+                raise ValueError(
+                    f"Column {col!r} produced by both {producers[col]!r} "
+                    f"and {node.name!r}"
+                )
+            producers[col] = node.name
+    deps = {
+        node.name: {
+            producers[c]
+            for c in node.inputs
+            if c in producers and producers[c] != node.name
+        }
+        for node in nodes
+    }
+    pending = dict(deps)
+    while pending:
+        ready = [n for n, d in pending.items() if not d & pending.keys()]
+        if not ready:
+            raise ValueError(f"Enrichment cycle between {sorted(pending)}")
+        for name in ready:
+            del pending[name]
+    return deps
+
+
+async def run_nodes(
+    df: pd.DataFrame, nodes: list[EnrichmentNode]
+) -> tuple[pd.DataFrame, dict[str, float]]:
+    """Run ``nodes`` over ``df`` and return it with per-node timings.
+
+    Inputs that no node produces and that ``df`` lacks are read as ``None``.
+    """
+    deps = _order(nodes)
+    timings: dict[str, float] = {}
+    tasks: dict[str, asyncio.Task] = {}
+    events = {node.name: asyncio.Event() for node in nodes}
+
+    async def run(node: EnrichmentNode, session: aiohttp.ClientSession):
+        for dep in deps[node.name]:
+            await events[dep].wait()
+        frame = pd.DataFrame(index=df.index)
+        for col in node.inputs:
+            frame[col] = df[col] if col in df.columns else None
+        start = time.perf_counter()
+        out = await node.execute(frame, session)
+        for col in node.outputs:
+            df[col] = out[col] if col in out.columns else None
+        timings[node.name] = time.perf_counter() - start
+        logging.info(
+            "Enrichment %s finished in %.2fs", node.name, timings[node.name]
+        )
+        events[node.name].set()
+
+    limit = sum(node.concurrency for node in nodes)
+    async with http_client.async_session(limit=limit) as session:
+        for node in nodes:
+            tasks[node.name] = asyncio.create_task(run(node, session))
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            raise
+    return df, timings
@@ -1,49 +1,589 @@
 #!/usr/bin/env python3
-"""Convert restaurants_prepped.csv to a GeoJSON FeatureCollection."""
+"""Convert restaurants_prepped.csv to a GeoJSON FeatureCollection.
+
+The CSV is read in chunks and features are written one at a time from the
+chunk's columns with compact separators, so memory stays flat and the file
+carries no indentation. Missing values are written as ``null``.
+
+A pyramid of ``z/x/y`` GeoJSON tiles is written next to it. Up to
+``CLUSTER_MAX_ZOOM`` points sharing a grid cell are merged into one cluster
+at their centroid; above it tiles hold the points themselves. ``index.json``
+lists every tile with its feature count, so the map only requests tiles that
+cover its viewport and exist.
+
+Features are also sharded per ZIP code into content-addressed files with a
+``manifest.json`` of counts, bounding boxes and hashes. Shards whose content
+is unchanged keep their file, so clients can cache them by hash.
+
+Map features only carry the ``MAP_PROPERTIES`` popups need plus a derived
+``zip_code``; the rest is looked up by ``Place ID``. Every JSON file gets
+precompressed ``.gz`` (and ``.br`` when ``brotli`` is installed) siblings,
+and with ``pyogrio`` a spatially indexed FlatGeobuf copy is written too.
+"""
 
 from __future__ import annotations
 
+import argparse
+import gzip
+import hashlib
 import json
-from pathlib import Path
 import logging
+import os
+import shutil
+from pathlib import Path
+from typing import IO, Iterator
 
+import numpy as np
 import pandas as pd
 
+try:
+    import brotli
+except ImportError:  # optional: .br files are skipped without it
+    brotli = None
+
+try:
+    from pyogrio.raw import write as ogr_write
+except ImportError:  # optional: the FlatGeobuf copy is skipped without it
+    ogr_write = None
+
+CSV_PATH = Path("restaurants_prepped.csv")
+OUT_DIR = Path("backend/static")
+OUT_FILE = "restaurants.geojson"
+FGB_FILE = "restaurants.fgb"
+TILES_DIR = "tiles"
+ZIPS_DIR = "zips"
+MANIFEST_FILE = "manifest.json"
+EXPORT_CHUNKSIZE = 10_000
+# Quality 11 is roughly ten times slower for a few percent smaller files
+BROTLI_QUALITY = 9
+COMPRESS_BLOCK = 1 << 20
+
+# Properties kept on map features; ``None`` keeps every prepped column
+MAP_PROPERTIES = [
+    "Place ID",
+    "Name",
+    "Rating",
+    "User Ratings Total",
+    "Price",
+    "Category",
+    "Website",
+    "Distance Miles",
+    "Nearest Anchor",
+]
+# Columns read only to derive ``zip_code``
+ZIP_SOURCES = ("Zip Code", "Formatted Address")
+
+MIN_ZOOM = 0
+MAX_ZOOM = 15
+CLUSTER_MAX_ZOOM = 14
+# Grid cells per tile side used for clustering (256 px / 8 = 32 px cells)
+CLUSTER_CELLS = 8
+MAX_LAT = 85.05112878
+
+# Longitudes, latitudes, property names and one value list per property
+Chunk = tuple[np.ndarray, np.ndarray, list[str], list[list]]
+
+_ENCODER = json.JSONEncoder(
+    separators=(",", ":"), ensure_ascii=False, allow_nan=False
+)
+
+
+def _values(series: pd.Series) -> list:
+    """Return ``series`` as plain Python values with NaN as ``None``."""
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def _zip_codes(df: pd.DataFrame) -> pd.Series:
+    """Return the ZIP of each row from ``Zip Code`` or the address."""
+    zips = pd.Series(None, index=df.index, dtype=object)
+    if "Zip Code" in df.columns:
+        zips = df["Zip Code"].astype("string").str.extract(
+            r"^(\d{5})", expand=False
+        )
+    if "Formatted Address" in df.columns:
+        # The last five-digit group; street numbers come before the ZIP
+        found = df["Formatted Address"].astype("string").str.findall(
+            r"\b\d{5}\b"
+        )
+        zips = zips.fillna(found.str[-1])
+    return zips.astype(object).where(zips.notna(), None)
+
+
+def iter_chunks(
+    csv_path: Path,
+    chunksize: int = EXPORT_CHUNKSIZE,
+    properties: list[str] | None = None,
+) -> Iterator[Chunk]:
+    """Yield ``(lon, lat, names, columns)`` for rows with coordinates.
+
+    Only ``properties`` (all columns when ``None``) and ``zip_code`` are
+    returned, and columns that aren't needed are never parsed.
+    """
+    wanted = (
+        None
+        if properties is None
+        else {"lat", "lon", *properties, *ZIP_SOURCES}
+    )
+    for chunk in pd.read_csv(
+        csv_path,
+        chunksize=chunksize,
+        usecols=None if wanted is None else lambda c: c in wanted,
+    ):
+        lat = pd.to_numeric(chunk["lat"], errors="coerce").to_numpy(float)
+        lon = pd.to_numeric(chunk["lon"], errors="coerce").to_numpy(float)
+        keep = np.isfinite(lat) & np.isfinite(lon)
+        if not keep.any():
+            continue
+        chunk = chunk[keep]
+        chunk = chunk.assign(zip_code=_zip_codes(chunk))
+        names = [
+            c
+            for c in (chunk.columns if properties is None else properties)
+            if c in chunk.columns and c not in ("lat", "lon", "zip_code")
+        ] + ["zip_code"]
+        yield lon[keep], lat[keep], names, [_values(chunk[c]) for c in names]
+
+
+def _sibling(path: Path, suffix: str) -> Path:
+    return path.with_name(path.name + suffix)
+
+
+def _encodings() -> list[str]:
+    return [".gz", ".br"] if brotli is not None else [".gz"]
+
+
+def write_compressed(path: Path) -> None:
+    """Write ``.gz`` and, with ``brotli``, ``.br`` copies of ``path``.
+
+    The file is compressed in blocks; gzip output carries no timestamp so
+    unchanged content compresses to identical bytes.
+    """
+    for suffix in _encodings():
+        out = _sibling(path, suffix)
+        tmp = _sibling(out, ".tmp")
+        with path.open("rb") as src, tmp.open("wb") as dst:
+            if suffix == ".gz":
+                with gzip.GzipFile(
+                    fileobj=dst, mode="wb", compresslevel=9, mtime=0
+                ) as gz:
+                    shutil.copyfileobj(src, gz, COMPRESS_BLOCK)
+            else:
+                comp = brotli.Compressor(quality=BROTLI_QUALITY)
+                while block := src.read(COMPRESS_BLOCK):
+                    dst.write(comp.process(block))
+                dst.write(comp.finish())
+        os.replace(tmp, out)
+
+
+def _write_json(path: Path, text: str) -> None:
+    """Write ``text`` and its compressed copies atomically."""
+    tmp = _sibling(path, ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+    write_compressed(path)
+
+
+def _feature(lon: float, lat: float, props: dict) -> str:
+    return (
+        '{"type":"Feature","geometry":{"type":"Point","coordinates":['
+        f"{lon!r},{lat!r}]}},"
+        f'"properties":{_ENCODER.encode(props)}}}'
+    )
+
+
+def write_features(
+    f: IO[str],
+    chunks: Iterator[Chunk],
+) -> int:
+    """Write a FeatureCollection from ``chunks`` to ``f``; return the count."""
+    f.write('{"type":"FeatureCollection","features":[')
+    count = 0
+    for lon, lat, names, columns in chunks:
+        for x, y, row in zip(lon.tolist(), lat.tolist(), zip(*columns)):
+            if count:
+                f.write(",")
+            f.write(_feature(x, y, dict(zip(names, row))))
+            count += 1
+    f.write("]}\n")
+    return count
+
+
+def export(
+    csv_path: Path = CSV_PATH,
+    out_path: Path = OUT_DIR / OUT_FILE,
+    chunksize: int = EXPORT_CHUNKSIZE,
+    properties: list[str] | None = None,
+) -> int:
+    """Stream ``csv_path`` into ``out_path`` atomically; return the count."""
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = _sibling(out_path, ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        count = write_features(
+            f, iter_chunks(csv_path, chunksize, properties)
+        )
+    os.replace(tmp, out_path)
+    write_compressed(out_path)
+    return count
+
+
+def write_flatgeobuf(chunks: Iterator[Chunk], path: Path) -> int | None:
+    """Write the points to a spatially indexed FlatGeobuf file.
+
+    Returns the feature count, or ``None`` when ``pyogrio`` is unavailable.
+    """
+    if ogr_write is None:
+        return None
+    lons, lats, frames = [], [], []
+    for lon, lat, names, columns in chunks:
+        lons.append(lon)
+        lats.append(lat)
+        frames.append(pd.DataFrame(dict(zip(names, columns))))
+    if not frames:
+        return 0
+    lon, lat = np.concatenate(lons), np.concatenate(lats)
+    df = pd.concat(frames, ignore_index=True).infer_objects()
+    # Little-endian WKB points: byte order, type 1, x, y
+    points = np.zeros(
+        len(lon),
+        dtype=[("order", "u1"), ("type", "<u4"), ("x", "<f8"), ("y", "<f8")],
+    )
+    points["order"], points["type"] = 1, 1
+    points["x"], points["y"] = lon, lat
+    raw = points.tobytes()
+    size = points.dtype.itemsize
+    geometry = np.array(
+        [raw[i:i + size] for i in range(0, len(raw), size)], dtype=object
+    )
+    fields = []
+    for col in df.columns:
+        values = df[col]
+        if values.dtype.kind in "biuf":
+            fields.append(values.to_numpy())
+        else:
+            fields.append(
+                values.astype(object).where(values.notna(), None).to_numpy()
+            )
+    tmp = path.with_name(f"{path.stem}.tmp{path.suffix}")
+    tmp.unlink(missing_ok=True)
+    ogr_write(
+        str(tmp),
+        geometry,
+        fields,
+        list(df.columns),
+        driver="FlatGeobuf",
+        geometry_type="Point",
+        crs="EPSG:4326",
+    )
+    os.replace(tmp, path)
+    return len(df)
+
+
+def lonlat_to_world(
+    lon: np.ndarray, lat: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Project to Web Mercator world coordinates in ``[0, 1)``."""
+    lat = np.radians(np.clip(lat, -MAX_LAT, MAX_LAT))
+    x = (np.asarray(lon, dtype=float) + 180.0) / 360.0
+    y = (1 - np.log(np.tan(lat) + 1 / np.cos(lat)) / np.pi) / 2
+    return np.clip(x, 0, np.nextafter(1, 0)), np.clip(y, 0, np.nextafter(1, 0))
+
+
+def world_to_lonlat(
+    x: np.ndarray, y: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Inverse of :func:`lonlat_to_world`."""
+    lon = np.asarray(x, dtype=float) * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * np.asarray(y)))))
+    return lon, lat
+
+
+def cluster_level(
+    x: np.ndarray, y: np.ndarray, zoom: int, cells: int = CLUSTER_CELLS
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Merge points sharing a grid cell at ``zoom``.
+
+    Returns centroid ``x``/``y``, point counts and, for single points, the
+    index of the point itself (``-1`` for clusters).
+    """
+    n = (1 << zoom) * cells
+    ix = np.minimum((x * n).astype(np.int64), n - 1)
+    iy = np.minimum((y * n).astype(np.int64), n - 1)
+    _, first, inverse, counts = np.unique(
+        ix * n + iy, return_index=True, return_inverse=True, return_counts=True
+    )
+    cx = np.bincount(inverse, weights=x) / counts
+    cy = np.bincount(inverse, weights=y) / counts
+    return cx, cy, counts, np.where(counts == 1, first, -1)
+
+
+def _abbreviate(count: int) -> str:
+    if count >= 1_000_000:
+        return f"{count / 1_000_000:.1f}M"
+    if count >= 10_000:
+        return f"{count // 1000}k"
+    if count >= 1000:
+        return f"{count / 1000:.1f}k"
+    return str(count)
+
+
+def _cluster_feature(lon: float, lat: float, count: int) -> str:
+    props = {
+        "cluster": True,
+        "point_count": count,
+        "point_count_abbreviated": _abbreviate(count),
+    }
+    return _feature(round(float(lon), 6), round(float(lat), 6), props)
+
+
+def _collection(features: list[str]) -> str:
+    return '{"type":"FeatureCollection","features":[' + ",".join(
+        features
+    ) + "]}"
+
+
+def write_tiles(
+    chunks: Iterator[Chunk],
+    out_dir: Path,
+    min_zoom: int = MIN_ZOOM,
+    max_zoom: int = MAX_ZOOM,
+    cluster_max_zoom: int = CLUSTER_MAX_ZOOM,
+) -> dict:
+    """Write the tile pyramid under ``out_dir`` and return its index.
+
+    The tiles are built in a sibling directory and swapped in at the end, so
+    tiles from earlier exports never linger.
+    """
+    lons, lats, columns = [], [], None
+    names: list[str] = []
+    for lon, lat, names, cols in chunks:
+        lons.append(lon)
+        lats.append(lat)
+        if columns is None:
+            columns = [list(c) for c in cols]
+        else:
+            for acc, col in zip(columns, cols):
+                acc.extend(col)
+    lon = np.concatenate(lons) if lons else np.empty(0)
+    lat = np.concatenate(lats) if lats else np.empty(0)
+    columns = columns or []
+    x, y = lonlat_to_world(lon, lat)
+
+    tmp = out_dir.with_name(out_dir.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tiles: dict[str, int] = {}
+    for z in range(min_zoom, max_zoom + 1):
+        if z <= cluster_max_zoom:
+            cx, cy, counts, members = cluster_level(x, y, z)
+        else:
+            cx, cy = x, y
+            counts = np.ones(len(x), dtype=np.int64)
+            members = np.arange(len(x))
+        scale = 1 << z
+        tx = np.minimum((cx * scale).astype(np.int64), scale - 1)
+        ty = np.minimum((cy * scale).astype(np.int64), scale - 1)
+        order = np.lexsort((ty, tx))
+        key = (tx * scale + ty)[order]
+        bounds = np.flatnonzero(np.diff(key)) + 1
+        c_lon, c_lat = world_to_lonlat(cx, cy)
+        for group in np.split(order, bounds) if len(order) else []:
+            features = []
+            for i in group.tolist():
+                m = int(members[i])
+                if m >= 0:
+                    props = {n: col[m] for n, col in zip(names, columns)}
+                    features.append(
+                        _feature(float(lon[m]), float(lat[m]), props)
+                    )
+                else:
+                    features.append(
+                        _cluster_feature(c_lon[i], c_lat[i], int(counts[i]))
+                    )
+            gx, gy = int(tx[group[0]]), int(ty[group[0]])
+            path = tmp / str(z) / str(gx) / f"{gy}.json"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            _write_json(path, _collection(features))
+            tiles[f"{z}/{gx}/{gy}"] = len(features)
+
+    index = {
+        "minzoom": min_zoom,
+        "maxzoom": max_zoom,
+        "clusterMaxZoom": cluster_max_zoom,
+        "count": int(len(lon)),
+        "bounds": (
+            [
+                float(lon.min()),
+                float(lat.min()),
+                float(lon.max()),
+                float(lat.max()),
+            ]
+            if len(lon)
+            else None
+        ),
+        "tiles": tiles,
+    }
+    tmp.mkdir(parents=True, exist_ok=True)
+    _write_json(tmp / "index.json", _ENCODER.encode(index))
+    old = out_dir.with_name(out_dir.name + ".old")
+    shutil.rmtree(old, ignore_errors=True)
+    if out_dir.exists():
+        os.replace(out_dir, old)
+    os.replace(tmp, out_dir)
+    shutil.rmtree(old, ignore_errors=True)
+    return index
+
+
+def _shard_name(zip_code: str, digest: str) -> str:
+    return f"{zip_code}.{digest}.geojson"
+
+
+def write_zip_shards(
+    chunks: Iterator[Chunk], out_dir: Path
+) -> tuple[dict, int]:
+    """Write one GeoJSON file per ZIP under ``out_dir``.
+
+    Returns the manifest and the number of shard files actually written.
+
+    Shard files are named after their content hash, so unchanged shards are
+    left untouched and files of ZIPs that changed or vanished are removed.
+    """
+    features: dict[str, list[str]] = {}
+    bounds: dict[str, list[float]] = {}
+    skipped = 0
+    for lon, lat, names, columns in chunks:
+        zips = columns[names.index("zip_code")]
+        for i, (x, y, row) in enumerate(
+            zip(lon.tolist(), lat.tolist(), zip(*columns))
+        ):
+            zip_code = zips[i]
+            if not zip_code:
+                skipped += 1
+                continue
+            features.setdefault(zip_code, []).append(
+                _feature(x, y, dict(zip(names, row)))
+            )
+            box = bounds.setdefault(zip_code, [x, y, x, y])
+            box[0], box[1] = min(box[0], x), min(box[1], y)
+            box[2], box[3] = max(box[2], x), max(box[3], y)
+    if skipped:
+        logging.info("Skipped %s features without a ZIP code", skipped)
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    shards: dict[str, dict] = {}
+    written = 0
+    for zip_code in sorted(features):
+        body = _collection(features[zip_code]).encode("utf-8")
+        digest = hashlib.sha256(body).hexdigest()[:16]
+        name = _shard_name(zip_code, digest)
+        path = out_dir / name
+        files = [path] + [_sibling(path, s) for s in _encodings()]
+        if not all(f.exists() for f in files):
+            tmp = _sibling(path, ".tmp")
+            tmp.write_bytes(body)
+            os.replace(tmp, path)
+            write_compressed(path)
+            written += 1
+        shards[zip_code] = {
+            "count": len(features[zip_code]),
+            "bbox": bounds[zip_code],
+            "hash": digest,
+            "file": name,
+        }
+
+    manifest = {
+        "count": sum(s["count"] for s in shards.values()),
+        "zips": shards,
+    }
+    _write_json(out_dir / MANIFEST_FILE, _ENCODER.encode(manifest))
+
+    keep = {s["file"] for s in shards.values()}
+    for path in out_dir.iterdir():
+        base = path.name.removesuffix(".gz").removesuffix(".br")
+        if base.endswith(".geojson") and base not in keep:
+            path.unlink()
+    return manifest, written
+
 
 def main(argv: list[str] | None = None) -> None:
     """Read the CSV and write ``backend/static/restaurants.geojson``."""
+    parser = argparse.ArgumentParser(description="Export map GeoJSON")
+    parser.add_argument(
+        "--no-tiles",
+        action="store_true",
+        help="Skip the z/x/y tile pyramid",
+    )
+    parser.add_argument(
+        "--no-zips",
+        action="store_true",
+        help="Skip the per-ZIP shards",
+    )
+    parser.add_argument(
+        "--no-fgb",
+        action="store_true",
+        help="Skip the FlatGeobuf copy",
+    )
+    parser.add_argument(
+        "--max-zoom",
+        type=int,
+        default=MAX_ZOOM,
+        help="Deepest tile zoom; clusters stop one level above",
+    )
+    props = parser.add_mutually_exclusive_group()
+    props.add_argument(
+        "--properties",
+        help="Comma-separated columns to keep on map features",
+    )
+    props.add_argument(
+        "--all-properties",
+        action="store_true",
+        help="Keep every prepped column on map features",
+    )
+    args = parser.parse_args(argv)
+
     logging.basicConfig(level=logging.INFO, format="%(message)s")
 
-    csv_path = Path("restaurants_prepped.csv")
-    if not csv_path.exists():
-        raise SystemExit(f"Missing {csv_path}")
+    if not CSV_PATH.exists():
+        raise SystemExit(f"Missing {CSV_PATH}")
 
-    df = pd.read_csv(csv_path)
-    features: list[dict] = []
+    if args.all_properties:
+        properties = None
+    elif args.properties:
+        properties = [p.strip() for p in args.properties.split(",")]
+    else:
+        properties = MAP_PROPERTIES
 
-    for _, row in df.iterrows():
-        lat = row.get("lat")
-        lon = row.get("lon")
-        if pd.isna(lat) or pd.isna(lon):
-            continue
-        props = row.drop(labels=["lat", "lon"]).to_dict()
-        feature = {
-            "type": "Feature",
-            "geometry": {
-                "type": "Point",
-                "coordinates": [float(lon), float(lat)],
-            },
-            "properties": props,
-        }
-        features.append(feature)
+    def chunks() -> Iterator[Chunk]:
+        return iter_chunks(CSV_PATH, properties=properties)
 
-    geojson = {"type": "FeatureCollection", "features": features}
+    out_path = OUT_DIR / OUT_FILE
+    count = export(CSV_PATH, out_path, properties=properties)
+    logging.info("Wrote %s with %s features", out_path, count)
 
-    out_dir = Path("backend/static")
-    out_dir.mkdir(parents=True, exist_ok=True)
-    out_path = out_dir / "restaurants.geojson"
-    out_path.write_text(json.dumps(geojson, indent=2))
-    logging.info("Wrote %s with %s features", out_path, len(features))
+    if not args.no_fgb:
+        fgb = write_flatgeobuf(chunks(), OUT_DIR / FGB_FILE)
+        if fgb is None:
+            logging.info("pyogrio not installed; skipping FlatGeobuf")
+        else:
+            logging.info("Wrote %s with %s features", OUT_DIR / FGB_FILE, fgb)
+
+    if not args.no_tiles:
+        index = write_tiles(
+            chunks(),
+            OUT_DIR / TILES_DIR,
+            max_zoom=args.max_zoom,
+            cluster_max_zoom=min(CLUSTER_MAX_ZOOM, args.max_zoom - 1),
+        )
+        logging.info(
+            "Wrote %s tiles to %s", len(index["tiles"]), OUT_DIR / TILES_DIR
+        )
+
+    if not args.no_zips:
+        manifest, written = write_zip_shards(chunks(), OUT_DIR / ZIPS_DIR)
+        logging.info(
+            "Wrote %s of %s ZIP shards to %s",
+            written,
+            len(manifest["zips"]),
+            OUT_DIR / ZIPS_DIR,
+        )
 
 
 if __name__ == "__main__":  # pragma: no cover - manual execution
@@ -4,21 +4,28 @@ import json
 import logging
 from datetime import datetime, timezone
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING
 
-import requests
-from tqdm.auto import tqdm
-
-
-from restaurants.utils import normalize_hours, haversine_miles
-from restaurants.config import GOOGLE_API_KEY, OLYMPIA_LAT, OLYMPIA_LON
+from restaurants.anchors import anchor_distances
+from restaurants.hours import parse_weekday_text
+from restaurants import config
 from restaurants.chain_blocklist import CHAIN_BLOCKLIST
-from restaurants.network_utils import check_network
+from restaurants.http_client import session as http_session
+from restaurants.network_utils import network_available
+from restaurants.utils import lazy_import
 
 from .base import BaseFetcher
 
+np = lazy_import("numpy")
+
+if TYPE_CHECKING:
+    import requests
+
 MAX_PAGES = 15
 GOOGLE_TEXT_URL = "https://maps.googleapis.com/maps/api/place/textsearch/json"
 GOOGLE_DETAILS_URL = "https://maps.googleapis.com/maps/api/place/details/json"
+# Threads fetching place details; also the session's pool size
+DETAIL_WORKERS = 8
 
 
 class GooglePlacesFetcher(BaseFetcher):
@@ -28,33 +35,32 @@ class GooglePlacesFetcher(BaseFetcher):
     def _fetch_details(
         session: requests.Session, params: dict, place_name: str
     ) -> dict:
-        """Helper to fetch place details with retries."""
-        for attempt in range(3):
-            try:
-                resp = session.get(
-                    GOOGLE_DETAILS_URL,
-                    params=params,
-                    timeout=15,
-                )
-                resp.raise_for_status()
-                return resp.json().get("result", {})
-            except Exception as exc:  # pragma: no cover - network errors
-                if attempt == 2:
-                    logging.error("Details failed for %s: %s", place_name, exc)
-                    raise SystemExit(1)
-                time.sleep(1)
-        return {}
+        """Helper to fetch place details; the session retries failures."""
+        try:
+            resp = session.get(
+                GOOGLE_DETAILS_URL,
+                params=params,
+                timeout=15,
+            )
+            resp.raise_for_status()
+            return resp.json().get("result", {})
+        except Exception as exc:  # pragma: no cover - network errors
+            logging.error("Details failed for %s: %s", place_name, exc)
+            raise SystemExit(1)
 
     def fetch(self, zip_codes: list[str], **opts) -> list[dict]:
-        if not check_network():
+        import requests
+        from tqdm.auto import tqdm  # slow to import; only needed here
+
+        if not network_available():
             logging.error(
                 "Network unavailable; cannot fetch Google Places data."
             )
             raise SystemExit(1)
 
         results: list[dict] = []
-        with requests.Session() as session, ThreadPoolExecutor(
-            max_workers=8
+        with http_session(workers=DETAIL_WORKERS) as session, (
+            ThreadPoolExecutor(max_workers=DETAIL_WORKERS)
         ) as executor:
             for zip_code in tqdm(zip_codes, desc="ZIP codes"):
                 logging.info(
@@ -62,7 +68,7 @@ class GooglePlacesFetcher(BaseFetcher):
                     zip_code,
                 )
                 params = {
-                    "key": GOOGLE_API_KEY,
+                    "key": config.GOOGLE_API_KEY,
                     "query": f"restaurants in {zip_code} WA",
                 }
                 start_len = len(results)
@@ -125,7 +131,7 @@ class GooglePlacesFetcher(BaseFetcher):
                         }
 
                         det_params = {
-                            "key": GOOGLE_API_KEY,
+                            "key": config.GOOGLE_API_KEY,
                             "place_id": basic_row["Place ID"],
                             "fields": (
                                 "formatted_phone_number,"
@@ -170,20 +176,7 @@ class GooglePlacesFetcher(BaseFetcher):
                         photos = details.get("photos", [])
                         addr_comps = details.get("address_components", [])
 
-                        def _parse_hours(items: list[str]) -> dict:
-                            out: dict[str, str] = {}
-                            for seg in items:
-                                if ":" not in seg:
-                                    continue
-                                day, times = seg.split(":", 1)
-                                out[day.strip()] = times.strip()
-                            return out
-
-                        hours_dict = (
-                            normalize_hours(_parse_hours(opening_hours_raw))
-                            if opening_hours_raw
-                            else {}
-                        )
+                        hours = parse_weekday_text(tuple(opening_hours_raw))
 
                         def _ac(key: str):
                             for comp in addr_comps:
@@ -203,13 +196,7 @@ class GooglePlacesFetcher(BaseFetcher):
                                 "international_phone_number"
                             ),
                             "Website": details.get("website"),
-                            "Opening Hours": (
-                                "; ".join(
-                                    f"{d}: {t}" for d, t in hours_dict.items()
-                                )
-                                if hours_dict
-                                else None
-                            ),
+                            "Opening Hours": hours.display,
                             "Price Level": details.get("price_level"),
                             "Types": ",".join(details.get("types", [])),
                             "Category": (details.get("types") or [None])[0],
@@ -226,16 +213,6 @@ class GooglePlacesFetcher(BaseFetcher):
                             "Zip Code": _ac("postal_code") or zip_code,
                         }
 
-                        dist = haversine_miles(
-                            OLYMPIA_LAT,
-                            OLYMPIA_LON,
-                            basic_row["lat"],
-                            basic_row["lon"],
-                        )
-                        enriched["Distance Miles"] = (
-                            round(dist, 2) if dist is not None else None
-                        )
-
                         results.append(
                             {
                                 **basic_row,
@@ -251,11 +228,26 @@ class GooglePlacesFetcher(BaseFetcher):
                     if not next_token or page >= MAX_PAGES:
                         break
                     time.sleep(2)
-                    params = {"key": GOOGLE_API_KEY, "pagetoken": next_token}
+                    params = {
+                        "key": config.GOOGLE_API_KEY,
+                        "pagetoken": next_token,
+                    }
                     page += 1
 
                 added = len(results) - start_len
                 logging.info("%s collected %d places", zip_code, added)
 
+        add_distances(results)
         logging.info("Collected %s SMB rows with enrichment.", len(results))
         return results
+
+
+def add_distances(rows: list[dict]) -> None:
+    """Set ``Distance Miles`` to the nearest anchor for all rows at once."""
+    if not rows:
+        return
+    lat = np.array([r.get("lat") for r in rows], dtype=float)
+    lon = np.array([r.get("lon") for r in rows], dtype=float)
+    _, _, nearest = anchor_distances(lat, lon)
+    for row, dist in zip(rows, nearest.round(2).tolist()):
+        row["Distance Miles"] = None if np.isnan(dist) else dist
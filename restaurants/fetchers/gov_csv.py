@@ -1,7 +1,9 @@
 import logging
-import pandas as pd
+from restaurants.utils import lazy_import
 from .base import BaseFetcher
 
+pd = lazy_import("pandas")
+
 
 class GovCsvFetcher(BaseFetcher):
     """Placeholder fetcher for government CSV imports."""
@@ -2,10 +2,12 @@ from __future__ import annotations
 
 import os
 import logging
-import pandas as pd
 
+from restaurants.utils import lazy_import
 from .base import BaseFetcher
 
+pd = lazy_import("pandas")
+
 
 class GpvFetcher(BaseFetcher):
     """Fetch GPV projection data from a CSV file."""
@@ -1,15 +1,17 @@
 import logging
-import pandas as pd
 
-from restaurants.network_utils import check_network
+from restaurants.network_utils import network_available
+from restaurants.utils import lazy_import
 from .base import BaseFetcher
 
+pd = lazy_import("pandas")
+
 
 class OsmFetcher(BaseFetcher):
     """Placeholder fetcher for OpenStreetMap."""
 
     def fetch(self, zip_codes: list[str], **opts) -> list[dict]:
-        if not check_network():
+        if not network_available():
             logging.error("Network unavailable; cannot fetch OSM data.")
             raise SystemExit(1)
         # … (same as before) – omitted here for brevity
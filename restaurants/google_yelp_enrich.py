@@ -1,7 +1,8 @@
 """Google & Yelp enrichment utility.
 
 This module searches for a restaurant using the Google Places Text
-Search API then enriches the result with Yelp details and reviews.
+Search API then enriches the result with Yelp details. Reviews are only
+fetched on request and are kept in the ``yelp_reviews`` table.
 """
 
 from __future__ import annotations
@@ -9,16 +10,22 @@ from __future__ import annotations
 import argparse
 import json
 import logging
-from typing import Any, Dict, Iterable
+import math
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any, Dict, Iterable
 import sqlite3
-from . import loader
+from . import config, loader
 
-import requests
+from .http_client import session as http_session
+from .network_utils import CircuitOpenError, network_available
+from .utils import haversine_miles_matrix, lazy_import
+from .wa_registry import normalize_business_name
 
-from rapidfuzz import fuzz
+np = lazy_import("numpy")
+rapidfuzz = lazy_import("rapidfuzz")
 
-from .config import GOOGLE_API_KEY, YELP_API_KEY
-from .network_utils import check_network
+if TYPE_CHECKING:
+    import requests
 
 GOOGLE_SEARCH_URL = (
     "https://maps.googleapis.com/maps/api/place/textsearch/json"
@@ -34,6 +41,35 @@ YELP_PHONE_SEARCH_URL = "https://api.yelp.com/v3/businesses/search/phone"
 # Minimum fuzzy match score required to accept a Yelp business match
 YELP_MATCH_THRESHOLD = 60
 
+# Stored reviews younger than this are reused instead of refetched
+YELP_REVIEWS_TTL_DAYS = 30
+
+# Area sweep settings. Yelp caps ``limit`` at 50 and ``offset + limit`` at
+# 240 per search, so each tile/category pair is at most five pages.
+YELP_SWEEP_CATEGORIES = ("restaurants", "food")
+YELP_PAGE_LIMIT = 50
+YELP_MAX_RESULTS = 240
+YELP_SWEEP_TILE_DEG = 0.04
+YELP_SWEEP_RADIUS_M = 3000
+# Tiles with more results than Yelp pages through are split into quadrants
+# down to this search radius
+YELP_SWEEP_MIN_RADIUS_M = 250
+# Swept candidates farther than this from a place are never matched to it
+YELP_SWEEP_MAX_MILES = 0.5
+
+_YELP_UPDATE_SQL = """
+    UPDATE places SET
+        yelp_rating=?,
+        yelp_reviews=?,
+        yelp_price_tier=?,
+        yelp_status=?,
+        yelp_cuisines=?,
+        yelp_primary_cuisine=?,
+        yelp_category_titles=?,
+        yelp_id=?
+    WHERE rowid=?
+"""
+
 
 def search_google_place(
     name: str, location: str, session: requests.Session
@@ -42,7 +78,7 @@ def search_google_place(
     params = {
         "query": f"{name} {location}",
         "type": "restaurant",
-        "key": GOOGLE_API_KEY,
+        "key": config.GOOGLE_API_KEY,
     }
     resp = session.get(GOOGLE_SEARCH_URL, params=params, timeout=10)
     resp.raise_for_status()
@@ -56,7 +92,7 @@ def get_google_details(
     """Return phone details for a Google place."""
     params = {
         "place_id": place_id,
-        "key": GOOGLE_API_KEY,
+        "key": config.GOOGLE_API_KEY,
         "fields": "formatted_phone_number,international_phone_number",
     }
     resp = session.get(GOOGLE_DETAILS_URL, params=params, timeout=10)
@@ -71,7 +107,7 @@ def _pick_best_by_name(
     best: dict[str, Any] | None = None
     best_score = -1.0
     for biz in businesses:
-        score = fuzz.token_set_ratio(name, biz.get("name", ""))
+        score = rapidfuzz.fuzz.token_set_ratio(name, biz.get("name", ""))
         if score > best_score:
             best = biz
             best_score = score
@@ -142,18 +178,63 @@ def get_yelp_reviews(
     return resp.json()
 
 
-def enrich_restaurant(name: str, location: str) -> dict[str, Any]:
-    """Return combined Google and Yelp data for ``name`` in ``location``."""
-    if not check_network():
+def get_stored_yelp_reviews(
+    conn: sqlite3.Connection,
+    business_id: str,
+    session: requests.Session,
+    max_age_days: int = YELP_REVIEWS_TTL_DAYS,
+) -> dict[str, Any]:
+    """Return reviews for ``business_id`` from ``yelp_reviews``.
+
+    Reviews are fetched from Yelp and stored when missing or older than
+    ``max_age_days``. Stale reviews are returned while Yelp's circuit is
+    open.
+    """
+    row = conn.execute(
+        "SELECT reviews, fetched_at FROM yelp_reviews WHERE business_id=?",
+        (business_id,),
+    ).fetchone()
+    now = datetime.now(timezone.utc)
+    if row and row[1]:
+        age = now - datetime.fromisoformat(row[1])
+        if age < timedelta(days=max_age_days):
+            return json.loads(row[0])
+    try:
+        data = get_yelp_reviews(business_id, session)
+    except CircuitOpenError:
+        if not row:
+            raise
+        logging.warning("Using stale Yelp reviews for %s", business_id)
+        return json.loads(row[0])
+    conn.execute(
+        "INSERT OR REPLACE INTO yelp_reviews"
+        " (business_id, reviews, fetched_at) VALUES (?, ?, ?)",
+        (business_id, json.dumps(data), now.isoformat()),
+    )
+    conn.commit()
+    return data
+
+
+def enrich_restaurant(
+    name: str,
+    location: str,
+    with_reviews: bool = False,
+    reviews_conn: sqlite3.Connection | None = None,
+) -> dict[str, Any]:
+    """Return combined Google and Yelp data for ``name`` in ``location``.
+
+    Yelp reviews are only requested when ``with_reviews`` is set. Passing
+    ``reviews_conn`` reads and stores them through the ``yelp_reviews`` table.
+    """
+    if not network_available():
         raise SystemExit("Network unavailable; Yelp enrichment required")
 
-    if not GOOGLE_API_KEY or not YELP_API_KEY:
+    if not config.GOOGLE_API_KEY or not config.YELP_API_KEY:
         raise SystemExit("Missing GOOGLE_API_KEY or YELP_API_KEY")
 
-    headers = {"Authorization": f"Bearer {YELP_API_KEY}"}
+    headers = {"Authorization": f"Bearer {config.YELP_API_KEY}"}
 
-    with requests.Session() as session:
-        session.headers.update(headers)
+    with http_session(headers=headers) as session:
         g_place = search_google_place(name, location, session)
         if not g_place:
             return {}
@@ -175,7 +256,12 @@ def enrich_restaurant(name: str, location: str) -> dict[str, Any]:
         biz_id = yelp_biz.get("id")
         if biz_id:
             yelp_details = get_yelp_details(biz_id, session)
-            yelp_reviews = get_yelp_reviews(biz_id, session)
+            if with_reviews and reviews_conn is not None:
+                yelp_reviews = get_stored_yelp_reviews(
+                    reviews_conn, biz_id, session
+                )
+            elif with_reviews:
+                yelp_reviews = get_yelp_reviews(biz_id, session)
 
         cuisines = [
             c.get("alias")
@@ -205,35 +291,37 @@ def enrich_restaurant(name: str, location: str) -> dict[str, Any]:
         }
 
 
-def yelp_enrich_all() -> None:
-    """Enrich all rows in ``dela.sqlite`` with Yelp info."""
-    conn = sqlite3.connect(loader.DB_PATH)
+def yelp_enrich_all(with_reviews: bool = False) -> None:
+    """Enrich all rows in ``dela.sqlite`` with Yelp info.
+
+    ``with_reviews`` also fills the ``yelp_reviews`` table for each match.
+    Stops early, keeping the rows done so far, once a host's circuit opens.
+    """
+    conn = loader.ensure_db()
     cur = conn.cursor()
     rows = cur.execute(
         "SELECT rowid, name, city, state FROM places"
     ).fetchall()
     for rowid, name, city, state in rows:
         loc = " ".join(p for p in (city, state) if p)
-        data = enrich_restaurant(name, loc)
+        try:
+            data = enrich_restaurant(
+                name, loc, with_reviews=with_reviews, reviews_conn=conn
+            )
+        except CircuitOpenError as exc:
+            # Every remaining row would fail the same way; keep what we have
+            logging.warning("Stopping Yelp enrichment: %s", exc)
+            break
         if not data or not data.get("yelp"):
             continue
+        business = data["yelp"].get("business") or {}
         details = data["yelp"].get("details") or {}
         summary = data["yelp"].get("summary") or {}
         cats = details.get("categories") or []
         aliases = [c.get("alias") for c in cats if c.get("alias")]
         titles = [c.get("title") for c in cats if c.get("title")]
         cur.execute(
-            """
-            UPDATE places SET
-                yelp_rating=?,
-                yelp_reviews=?,
-                yelp_price_tier=?,
-                yelp_status=?,
-                yelp_cuisines=?,
-                yelp_primary_cuisine=?,
-                yelp_category_titles=?
-            WHERE rowid=?
-            """,
+            _YELP_UPDATE_SQL,
             (
                 summary.get("rating"),
                 summary.get("review_count"),
@@ -242,6 +330,7 @@ def yelp_enrich_all() -> None:
                 ",".join(aliases) if aliases else None,
                 aliases[0] if aliases else None,
                 ",".join(titles) if titles else None,
+                details.get("id") or business.get("id"),
                 rowid,
             ),
         )
@@ -249,6 +338,332 @@ def yelp_enrich_all() -> None:
     conn.close()
 
 
+def sweep_tiles(
+    lat_min: float,
+    lat_max: float,
+    lon_min: float,
+    lon_max: float,
+    step: float = YELP_SWEEP_TILE_DEG,
+) -> list[tuple[float, float]]:
+    """Return tile centres covering the bounding box."""
+    n_lat = max(1, math.ceil((lat_max - lat_min) / step))
+    n_lon = max(1, math.ceil((lon_max - lon_min) / step))
+    return [
+        (lat_min + (i + 0.5) * step, lon_min + (j + 0.5) * step)
+        for i in range(n_lat)
+        for j in range(n_lon)
+    ]
+
+
+def sweep_yelp_tile(
+    lat: float,
+    lon: float,
+    category: str,
+    session: requests.Session,
+    radius: int = YELP_SWEEP_RADIUS_M,
+) -> tuple[list[dict[str, Any]], int]:
+    """Page through Yelp's search results for one tile and category.
+
+    Returns the businesses fetched and the total Yelp reports, which is
+    larger when the tile holds more than ``YELP_MAX_RESULTS``.
+    """
+    found: list[dict[str, Any]] = []
+    total = 0
+    offset = 0
+    while offset < YELP_MAX_RESULTS:
+        params: dict[str, str | int] = {
+            "latitude": str(lat),
+            "longitude": str(lon),
+            "radius": radius,
+            "categories": category,
+            "limit": min(YELP_PAGE_LIMIT, YELP_MAX_RESULTS - offset),
+            "offset": offset,
+        }
+        resp = session.get(YELP_SEARCH_URL, params=params, timeout=10)
+        resp.raise_for_status()
+        data = resp.json()
+        page = data.get("businesses") or []
+        found.extend(page)
+        offset += len(page)
+        total = data.get("total") or 0
+        if len(page) < params["limit"] or offset >= total:
+            break
+    return found, max(total, len(found))
+
+
+def _sweep_cell(
+    conn: sqlite3.Connection,
+    lat: float,
+    lon: float,
+    step: float,
+    radius: int,
+    category: str,
+    session: requests.Session,
+) -> int:
+    """Sweep one tile into ``yelp_candidates``, splitting dense tiles.
+
+    A failed search is logged and skipped so the rest of the area still
+    gets swept. Returns the number of searches performed.
+    """
+    import requests
+
+    try:
+        found, total = sweep_yelp_tile(lat, lon, category, session, radius)
+    except (requests.RequestException, ValueError) as exc:
+        logging.warning(
+            "Yelp sweep of %.4f,%.4f (%s) failed: %s", lat, lon, category, exc
+        )
+        return 1
+    store_yelp_candidates(conn, found)
+    if total <= len(found):
+        return 1
+    if radius // 2 < YELP_SWEEP_MIN_RADIUS_M:
+        logging.warning(
+            "Yelp tile %.4f,%.4f (%s) has %s results; kept %s",
+            lat,
+            lon,
+            category,
+            total,
+            len(found),
+        )
+        return 1
+    quarter = step / 4
+    return 1 + sum(
+        _sweep_cell(
+            conn,
+            lat + dlat,
+            lon + dlon,
+            step / 2,
+            radius // 2,
+            category,
+            session,
+        )
+        for dlat in (-quarter, quarter)
+        for dlon in (-quarter, quarter)
+    )
+
+
+def _phone_key(phone: str | None) -> str:
+    """Return the last ten digits of ``phone`` for blocking."""
+    digits = "".join(c for c in phone or "" if c.isdigit())
+    return digits[-10:]
+
+
+def store_yelp_candidates(
+    conn: sqlite3.Connection, businesses: Iterable[dict[str, Any]]
+) -> None:
+    """Upsert swept Yelp businesses into the ``yelp_candidates`` table."""
+    now = datetime.now(timezone.utc).isoformat()
+    rows = []
+    for biz in businesses:
+        coords = biz.get("coordinates") or {}
+        location = biz.get("location") or {}
+        cats = biz.get("categories") or []
+        aliases = [c.get("alias") for c in cats if c.get("alias")]
+        titles = [c.get("title") for c in cats if c.get("title")]
+        rows.append(
+            (
+                biz.get("id"),
+                biz.get("name"),
+                coords.get("latitude"),
+                coords.get("longitude"),
+                _phone_key(biz.get("phone")) or None,
+                biz.get("rating"),
+                biz.get("review_count"),
+                biz.get("price"),
+                1 if biz.get("is_closed") else 0,
+                ",".join(aliases) if aliases else None,
+                ",".join(titles) if titles else None,
+                now,
+                location.get("city"),
+            )
+        )
+    conn.executemany(
+        "INSERT OR REPLACE INTO yelp_candidates (business_id, name, lat, lon,"
+        " phone, rating, review_count, price, is_closed, cuisines,"
+        " category_titles, fetched_at, city) VALUES"
+        " (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [r for r in rows if r[0]],
+    )
+    conn.commit()
+
+
+def sweep_yelp_area(
+    conn: sqlite3.Connection,
+    session: requests.Session,
+    categories: Iterable[str] = YELP_SWEEP_CATEGORIES,
+) -> int:
+    """Sweep the bounding box of ``places`` into ``yelp_candidates``.
+
+    Returns the number of tile/category searches performed, including those
+    of quadrants searched again because a tile had too many results.
+    """
+    bbox = conn.execute(
+        "SELECT MIN(lat), MAX(lat), MIN(lon), MAX(lon) FROM places"
+        " WHERE lat IS NOT NULL AND lon IS NOT NULL"
+    ).fetchone()
+    if not bbox or bbox[0] is None:
+        return 0
+    searches = 0
+    for lat, lon in sweep_tiles(*bbox):
+        for category in categories:
+            searches += _sweep_cell(
+                conn,
+                lat,
+                lon,
+                YELP_SWEEP_TILE_DEG,
+                YELP_SWEEP_RADIUS_M,
+                category,
+                session,
+            )
+    logging.info("Yelp sweep ran %s tile searches", searches)
+    return searches
+
+
+def _name_city_key(row: tuple) -> tuple[str, str] | None:
+    """Return the normalized ``(name, city)`` of a place or candidate row."""
+    name = normalize_business_name(row[1] or "")
+    city = " ".join((row[5] or "").split()).casefold()
+    return (name, city) if name and city else None
+
+
+def match_yelp_candidates(
+    places: list[tuple],
+    candidates: list[tuple],
+    chunk_size: int = 1000,
+) -> dict[int, str]:
+    """Match places to swept Yelp candidates in one batch.
+
+    ``places`` rows are ``(rowid, name, lat, lon, phone, city)`` and
+    ``candidates`` rows are ``(business_id, name, lat, lon, phone, city)``.
+    Names are scored with :func:`rapidfuzz.process.cdist`, pairs farther
+    apart than ``YELP_SWEEP_MAX_MILES`` are blocked and a shared phone number
+    always wins. Pairs whose distance is unknown need the shared phone or
+    the same normalized name in the same city. Returns a mapping of place
+    rowid to Yelp business ID.
+    """
+    if not places or not candidates:
+        return {}
+
+    def _coords(rows: list[tuple]) -> tuple[np.ndarray, np.ndarray]:
+        lat = np.array(
+            [np.nan if r[2] is None else r[2] for r in rows], dtype=float
+        )
+        lon = np.array(
+            [np.nan if r[3] is None else r[3] for r in rows], dtype=float
+        )
+        return lat, lon
+
+    cand_ids = [c[0] for c in candidates]
+    cand_names = [c[1] or "" for c in candidates]
+    cand_lat, cand_lon = _coords(candidates)
+    by_phone: dict[str, int] = {}
+    by_name_city: dict[tuple[str, str], list[int]] = {}
+    for idx, cand in enumerate(candidates):
+        key = _phone_key(cand[4])
+        if key:
+            by_phone.setdefault(key, idx)
+        name_city = _name_city_key(cand)
+        if name_city:
+            by_name_city.setdefault(name_city, []).append(idx)
+
+    matches: dict[int, str] = {}
+    for start in range(0, len(places), chunk_size):
+        chunk = places[start:start + chunk_size]
+        scores = rapidfuzz.process.cdist(
+            [p[1] or "" for p in chunk],
+            cand_names,
+            scorer=rapidfuzz.fuzz.token_set_ratio,
+            dtype=np.uint8,
+            workers=-1,
+        )
+        lat, lon = _coords(chunk)
+        dist = haversine_miles_matrix(lat, lon, cand_lat, cand_lon)
+        unknown = np.isnan(dist)
+        scores[unknown | (dist > YELP_SWEEP_MAX_MILES)] = 0
+        for i, place in enumerate(chunk):
+            if unknown[i].any():
+                for idx in by_name_city.get(_name_city_key(place), ()):
+                    if unknown[i, idx]:
+                        scores[i, idx] = 100
+            idx = by_phone.get(_phone_key(place[4]))
+            if idx is not None:
+                scores[i, idx] = 100
+        best = scores.argmax(axis=1)
+        best_scores = scores[np.arange(len(chunk)), best]
+        for place, idx, score in zip(chunk, best, best_scores):
+            if score >= YELP_MATCH_THRESHOLD:
+                matches[place[0]] = cand_ids[idx]
+    return matches
+
+
+def apply_yelp_candidates(conn: sqlite3.Connection) -> dict[int, str]:
+    """Match ``places`` against ``yelp_candidates`` and update Yelp columns.
+
+    Returns the mapping of place rowid to matched Yelp business ID.
+    """
+    cur = conn.cursor()
+    places = cur.execute(
+        "SELECT rowid, name, lat, lon, local_phone, city FROM places"
+    ).fetchall()
+    candidates = cur.execute(
+        "SELECT business_id, name, lat, lon, phone, city FROM yelp_candidates"
+    ).fetchall()
+    matches = match_yelp_candidates(places, candidates)
+    info = {
+        row[0]: row[1:]
+        for row in cur.execute(
+            "SELECT business_id, rating, review_count, price, is_closed,"
+            " cuisines, category_titles FROM yelp_candidates"
+        )
+    }
+    updates = []
+    for rowid, biz_id in matches.items():
+        rating, count, price, closed, cuisines, titles = info[biz_id]
+        updates.append(
+            (
+                rating,
+                count,
+                price,
+                "closed" if closed else "open",
+                cuisines,
+                cuisines.split(",")[0] if cuisines else None,
+                titles,
+                biz_id,
+                rowid,
+            )
+        )
+    cur.executemany(_YELP_UPDATE_SQL, updates)
+    conn.commit()
+    logging.info(
+        "Yelp sweep matched %s of %s places", len(matches), len(places)
+    )
+    return matches
+
+
+def yelp_sweep_enrich_all(with_reviews: bool = False) -> None:
+    """Enrich all rows in ``dela.sqlite`` from one Yelp area sweep.
+
+    Instead of one search per place, the target area is swept tile by tile
+    into ``yelp_candidates`` and every place is matched locally.
+    ``with_reviews`` also fills the ``yelp_reviews`` table for each match.
+    """
+    if not network_available():
+        raise SystemExit("Network unavailable; Yelp enrichment required")
+    if not config.YELP_API_KEY:
+        raise SystemExit("Missing YELP_API_KEY")
+
+    conn = loader.ensure_db()
+    headers = {"Authorization": f"Bearer {config.YELP_API_KEY}"}
+    with http_session(headers=headers) as session:
+        sweep_yelp_area(conn, session)
+        matches = apply_yelp_candidates(conn)
+        if with_reviews:
+            for biz_id in set(matches.values()):
+                get_stored_yelp_reviews(conn, biz_id, session)
+    conn.close()
+
+
 def main(argv: list[str] | None = None) -> None:
     parser = argparse.ArgumentParser(
         description="Enrich a restaurant via Google and Yelp"
@@ -261,7 +676,11 @@ def main(argv: list[str] | None = None) -> None:
     args = parser.parse_args(argv)
 
     logging.basicConfig(level=logging.INFO)
-    data = enrich_restaurant(args.name, args.location)
+    conn = loader.ensure_db()
+    data = enrich_restaurant(
+        args.name, args.location, with_reviews=True, reviews_conn=conn
+    )
+    conn.close()
     print(json.dumps(data, indent=2))
 
 
@@ -0,0 +1,258 @@
+"""Shared opening-hours parsing and "open at" queries.
+
+Google ``weekday_text`` is turned into the display string stored in CSVs
+(``Mon: 11 AM – 2 PM, 5 – 9 PM; Fri: 6 PM – 2 AM``) and into minute
+intervals per weekday kept in the indexed ``opening_hours`` table of
+``dela.sqlite``.
+Overnight ranges are split at midnight so every stored interval lies within
+one day. Many places share a schedule, so parsing is memoized on the raw
+text and all patterns are compiled once.
+"""
+
+from __future__ import annotations
+
+import functools
+import re
+import sqlite3
+from typing import Iterable, NamedTuple
+
+DAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+MINUTES_PER_DAY = 24 * 60
+HOURS_CACHE_SIZE = 8192
+
+THIN_SPACE_CHARS = (
+    "\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a"
+)
+_THIN_SPACE_RE = re.compile(f"[{THIN_SPACE_CHARS}]")
+_AMPM_RE = re.compile(r"\b(AM|PM)\b", re.I)
+
+_RANGE_SEP_RE = re.compile(r"\s*(?:–|—|-|\bto\b)\s*", re.I)
+_TIME_RE = re.compile(r"^(\d{1,2})(?::(\d{2}))?\s*([AP])?\.?M?\.?$", re.I)
+_SPACE_RE = re.compile(r"\s+")
+
+
+class ParsedHours(NamedTuple):
+    """Display string, per-day text and intervals for one schedule."""
+
+    display: str | None
+    days: tuple[tuple[str, str], ...]
+    intervals: tuple[tuple[int, int, int], ...]
+
+
+@functools.lru_cache(maxsize=HOURS_CACHE_SIZE)
+def _normalize_text(raw: str) -> str:
+    s = _THIN_SPACE_RE.sub("", raw)
+    if "-" not in s:
+        return s
+    start, end = [t.strip() for t in s.split("-", 1)]
+    ampm = _AMPM_RE.search(end)
+    if ampm and not _AMPM_RE.search(start):
+        start = f"{start} {ampm.group(1).upper()}"
+    return f"{start} – {end.upper()}"
+
+
+def normalize_hours(hours_dict: dict) -> dict:
+    """Return a clean hours dict using en-dash and explicit AM/PM."""
+    return {
+        day[:3]: _normalize_text(raw)
+        for day, raw in hours_dict.items()
+        if raw
+    }
+
+
+def day_index(day: int | str) -> int:
+    """Return 0 (Monday) to 6 (Sunday) for an index or day name."""
+    if isinstance(day, int):
+        if not 0 <= day < 7:
+            raise ValueError(f"Invalid weekday index: {day}")
+        return day
+    key = day.strip()[:3].title()
+    if key not in DAYS:
+        raise ValueError(f"Invalid weekday: {day}")
+    return DAYS.index(key)
+
+
+def _clock(text: str) -> tuple[int, str | None] | None:
+    m = _TIME_RE.match(text.strip())
+    if not m:
+        return None
+    hour, minute = int(m.group(1)), int(m.group(2) or 0)
+    if hour > 24 or minute > 59:
+        return None
+    return hour * 60 + minute, (m.group(3) or "").upper() or None
+
+
+def _apply(clock: int, meridiem: str | None) -> int:
+    hour, minute = divmod(clock, 60)
+    if meridiem == "A" and hour == 12:
+        hour = 0
+    elif meridiem == "P" and hour < 12:
+        hour += 12
+    return hour * 60 + minute
+
+
+def parse_range(text: str) -> tuple[int, int] | None:
+    """Return ``(open, close)`` minutes for one ``start – end`` range.
+
+    ``close`` may be less than or equal to ``open`` for overnight ranges.
+    A start without AM/PM borrows the end's unless that would put it after
+    the end; with neither marked, ``9-5`` reads as 9 AM to 5 PM.
+    """
+    parts = _RANGE_SEP_RE.split(text.strip(), maxsplit=1)
+    if len(parts) != 2:
+        return None
+    start, end = _clock(parts[0]), _clock(parts[1])
+    if start is None or end is None:
+        return None
+    (s_clock, s_mer), (e_clock, e_mer) = start, end
+    if e_mer is None:
+        close = e_clock
+        opening = _apply(s_clock, s_mer) if s_mer else s_clock
+        if opening - 12 * 60 < close <= opening:
+            close += 12 * 60
+    else:
+        close = _apply(e_clock, e_mer)
+        if s_mer:
+            opening = _apply(s_clock, s_mer)
+        else:
+            opening = _apply(s_clock, e_mer)
+            if opening > close and close != 0:
+                opening = _apply(s_clock, "A" if e_mer == "P" else "P")
+    if close == 0:
+        close = MINUTES_PER_DAY
+    return opening % MINUTES_PER_DAY, close
+
+
+def parse_day(text: str) -> list[tuple[int, int]]:
+    """Return the ``(open, close)`` ranges for one day's hours text."""
+    s = _SPACE_RE.sub(" ", text).strip()
+    low = s.lower()
+    if not s or low.startswith("closed"):
+        return []
+    if "24 hours" in low:
+        return [(0, MINUTES_PER_DAY)]
+    out = []
+    for seg in s.split(","):
+        rng = parse_range(seg)
+        if rng:
+            out.append(rng)
+    return out
+
+
+def intervals_from_dict(hours: dict[str, str]) -> list[tuple[int, int, int]]:
+    """Return ``(day, open, close)`` intervals for a day → text mapping.
+
+    Overnight ranges are split into the evening of ``day`` and the early
+    hours of the following day.
+    """
+    out: list[tuple[int, int, int]] = []
+    for day, text in hours.items():
+        try:
+            idx = day_index(day)
+        except ValueError:
+            continue
+        for opening, close in parse_day(text or ""):
+            if close > opening:
+                out.append((idx, opening, close))
+            else:
+                out.append((idx, opening, MINUTES_PER_DAY))
+                out.append(((idx + 1) % 7, 0, close))
+    return sorted(set(out))
+
+
+def _split_segments(items: Iterable[str]) -> dict[str, str]:
+    out: dict[str, str] = {}
+    for seg in items:
+        if ":" not in seg:
+            continue
+        day, times = seg.split(":", 1)
+        out[day.strip()] = times.strip()
+    return out
+
+
+@functools.lru_cache(maxsize=HOURS_CACHE_SIZE)
+def parse_weekday_text(items: tuple[str, ...]) -> ParsedHours:
+    """Parse Google ``weekday_text`` into display and interval forms.
+
+    The result is memoized on the raw tuple, so pass a tuple rather than the
+    list returned by the API.
+    """
+    days = normalize_hours(_split_segments(items))
+    display = "; ".join(f"{d}: {t}" for d, t in days.items()) or None
+    return ParsedHours(
+        display, tuple(days.items()), tuple(intervals_from_dict(days))
+    )
+
+
+@functools.lru_cache(maxsize=HOURS_CACHE_SIZE)
+def _parse_display(text: str) -> ParsedHours:
+    days = _split_segments(text.split(";"))
+    return ParsedHours(
+        text, tuple(days.items()), tuple(intervals_from_dict(days))
+    )
+
+
+def split_display(text: str | None) -> dict[str, str]:
+    """Return the day → hours mapping of a ``Day: hours; ...`` string."""
+    if not text or not isinstance(text, str):
+        return {}
+    return dict(_parse_display(text).days)
+
+
+def parse_hours(text: str | None) -> list[tuple[int, int, int]]:
+    """Return ``(day, open, close)`` intervals for a display string."""
+    if not text or not isinstance(text, str):
+        return []
+    return list(_parse_display(text).intervals)
+
+
+def replace_hours(
+    conn: sqlite3.Connection, items: Iterable[tuple[str, str | None]]
+) -> None:
+    """Replace the stored intervals for each ``(place_id, hours_text)``."""
+    ids: list[tuple[str]] = []
+    rows: list[tuple[str, int, int, int]] = []
+    for place_id, text in items:
+        if not place_id:
+            continue
+        ids.append((place_id,))
+        rows.extend((place_id, *iv) for iv in parse_hours(text))
+    conn.executemany("DELETE FROM opening_hours WHERE place_id=?", ids)
+    conn.executemany(
+        "INSERT INTO opening_hours (place_id, day, open_min, close_min)"
+        " VALUES (?, ?, ?, ?)",
+        rows,
+    )
+
+
+def open_at(
+    conn: sqlite3.Connection, day: int | str, minute: int
+) -> list[str]:
+    """Return place IDs open on ``day`` at ``minute`` after midnight."""
+    return [
+        r[0]
+        for r in conn.execute(
+            "SELECT DISTINCT place_id FROM opening_hours"
+            " WHERE day=? AND open_min<=? AND close_min>? ORDER BY place_id",
+            (day_index(day), minute, minute),
+        )
+    ]
+
+
+def open_during(
+    conn: sqlite3.Connection, day: int | str, start: int, end: int
+) -> list[str]:
+    """Return place IDs open for the whole ``[start, end)`` window on ``day``.
+
+    The window must lie within one day.
+    """
+    if not 0 <= start < end <= MINUTES_PER_DAY:
+        raise ValueError("Window must satisfy 0 <= start < end <= 1440")
+    return [
+        r[0]
+        for r in conn.execute(
+            "SELECT DISTINCT place_id FROM opening_hours"
+            " WHERE day=? AND open_min<=? AND close_min>=? ORDER BY place_id",
+            (day_index(day), start, end),
+        )
+    ]
@@ -0,0 +1,198 @@
+"""Shared HTTP clients for the fetchers and enrichers.
+
+``session`` returns a ``requests.Session`` and ``async_session`` an
+``aiohttp.ClientSession``. Both keep connections alive in a pool sized to
+the caller's worker count and ask for compressed responses. They also count
+calls, body bytes and compressed responses per host in ``STATS``.
+
+Sync sessions retry connection errors, timeouts, 429 and 5xx responses with
+exponential backoff and jitter. They also go through the per-host circuit
+breakers in :mod:`restaurants.network_utils`. Async callers retry with
+``backoff_delay``.
+"""
+
+from __future__ import annotations
+
+import inspect
+import logging
+import random
+import threading
+from typing import TYPE_CHECKING, Any
+from urllib.parse import urlsplit
+
+try:
+    from restaurants.network_utils import breaker_adapter
+    from restaurants.utils import lazy_import
+except ImportError:  # pragma: no cover - fallback for running as script
+    from network_utils import breaker_adapter  # type: ignore
+    from utils import lazy_import  # type: ignore
+
+aiohttp = lazy_import("aiohttp")
+
+if TYPE_CHECKING:
+    import requests
+
+# Connections kept per host; match it to the threads sharing a session
+POOL_SIZE = 10
+RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+KEEPALIVE_SECONDS = 30
+DNS_CACHE_SECONDS = 300
+COMPRESSED_ENCODINGS = frozenset({"gzip", "deflate", "br", "zstd"})
+
+
+class HostStats:
+    """Thread-safe per-host counters of calls, bytes and compressed bodies.
+
+    Bytes are counted as received. Gzip bodies count their compressed size,
+    so a host with few compressed responses is wasting bandwidth.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._hosts: dict[str, dict[str, int]] = {}
+
+    def record(self, host: str, nbytes: int, compressed: bool) -> None:
+        with self._lock:
+            counts = self._hosts.setdefault(
+                host, {"calls": 0, "bytes": 0, "compressed": 0}
+            )
+            counts["calls"] += 1
+            counts["bytes"] += nbytes
+            counts["compressed"] += compressed
+
+    def snapshot(self) -> dict[str, dict[str, int]]:
+        with self._lock:
+            return {host: dict(c) for host, c in self._hosts.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._hosts.clear()
+
+    def log(self) -> None:
+        for host, counts in sorted(self.snapshot().items()):
+            logging.info(
+                "%s: %s calls, %.1f KB, %s compressed",
+                host,
+                counts["calls"],
+                counts["bytes"] / 1024,
+                counts["compressed"],
+            )
+
+
+STATS = HostStats()
+
+
+def _compressed(headers: Any) -> bool:
+    encoding = headers.get("Content-Encoding", "").strip().lower()
+    return encoding in COMPRESSED_ENCODINGS
+
+
+def _count_response(resp: Any, *args: Any, **kwargs: Any) -> None:
+    """``requests`` response hook feeding ``STATS``."""
+    if kwargs.get("stream"):
+        # The body isn't read yet; trust the announced length
+        nbytes = int(resp.headers.get("Content-Length") or 0)
+    else:
+        content = resp.content
+        wire = getattr(resp.raw, "tell", None)
+        nbytes = wire() if callable(wire) else len(content or b"")
+    STATS.record(urlsplit(resp.url).netloc, nbytes, _compressed(resp.headers))
+
+
+def retry_policy(retries: int = RETRIES) -> Any:
+    """Return the ``urllib3`` retry policy used by sync sessions.
+
+    Only idempotent methods are retried. After the last attempt the error
+    response is returned, so ``raise_for_status`` still reports it. The
+    backoff cap and jitter need urllib3 2; older releases use their own
+    defaults.
+    """
+    from urllib3.util.retry import Retry
+
+    supported = inspect.signature(Retry).parameters
+    backoff = {
+        key: value
+        for key, value in (
+            ("backoff_max", BACKOFF_MAX),
+            ("backoff_jitter", BACKOFF_BASE),
+        )
+        if key in supported
+    }
+    return Retry(
+        total=retries,
+        status_forcelist=RETRY_STATUSES,
+        backoff_factor=BACKOFF_BASE,
+        raise_on_status=False,
+        **backoff,
+    )
+
+
+def session(
+    workers: int = POOL_SIZE,
+    retries: int = RETRIES,
+    trust_env: bool = True,
+    headers: dict[str, str] | None = None,
+) -> requests.Session:
+    """Return a pooled ``requests.Session`` shared by ``workers`` threads.
+
+    ``trust_env=False`` ignores proxy variables and ``.netrc``.
+    """
+    import requests
+
+    sess = requests.Session()
+    sess.trust_env = trust_env
+    adapter = breaker_adapter(
+        pool_maxsize=max(1, workers), max_retries=retry_policy(retries)
+    )
+    sess.mount("https://", adapter)
+    sess.mount("http://", adapter)
+    sess.hooks["response"].append(_count_response)
+    if headers:
+        sess.headers.update(headers)
+    return sess
+
+
+async def _count_async(
+    session: Any, context: Any, params: Any
+) -> None:
+    resp = params.response
+    nbytes = int(resp.headers.get("Content-Length") or 0)
+    STATS.record(params.url.host or "", nbytes, _compressed(resp.headers))
+
+
+def async_session(
+    limit: int = POOL_SIZE,
+    limit_per_host: int = 0,
+    timeout: float | None = None,
+    headers: dict[str, str] | None = None,
+) -> aiohttp.ClientSession:
+    """Return an ``aiohttp.ClientSession`` with ``limit`` pooled connections.
+
+    Must be called with an event loop running. Bytes are counted from
+    ``Content-Length`` because the body is read after the request ends.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=max(1, limit),
+        limit_per_host=limit_per_host,
+        keepalive_timeout=KEEPALIVE_SECONDS,
+        ttl_dns_cache=DNS_CACHE_SECONDS,
+    )
+    trace = aiohttp.TraceConfig()
+    trace.on_request_end.append(_count_async)
+    kwargs: dict[str, Any] = {}
+    if timeout is not None:
+        kwargs["timeout"] = aiohttp.ClientTimeout(total=timeout)
+    return aiohttp.ClientSession(
+        connector=connector,
+        trace_configs=[trace],
+        headers=headers,
+        **kwargs,
+    )
+
+
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE) -> float:
+    """Return a full-jitter delay before retry number ``attempt + 1``."""
+    return random.uniform(0, min(BACKOFF_MAX, base * 2**attempt))
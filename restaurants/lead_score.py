@@ -0,0 +1,229 @@
+"""Rank prepped places as sales leads.
+
+Every place gets a weighted score built from normalized features: ratings
+and review volume from Google and Yelp, distance to the nearest anchor,
+whether an owner, social profile and website are known, business status
+and how chain-like the name is. All features are computed column-wise and
+combined with one matrix product; string features are evaluated once per
+distinct name.
+
+Usage:
+    python -m restaurants.lead_score --top 500 [--weights weights.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import pathlib
+import re
+
+try:
+    from restaurants import loader
+    from restaurants.chain_blocklist import CHAIN_BLOCKLIST
+    from restaurants.prep_restaurants import PREPPED_TABLE
+    from restaurants.utils import lazy_import, setup_logging
+except ImportError:  # pragma: no cover - fallback for running as script
+    import loader  # type: ignore
+    from chain_blocklist import CHAIN_BLOCKLIST  # type: ignore
+    from prep_restaurants import PREPPED_TABLE  # type: ignore
+    from utils import lazy_import, setup_logging  # type: ignore
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# Feature weights; negative weights penalize. Override with ``--weights``.
+DEFAULT_WEIGHTS: dict[str, float] = {
+    "rating": 2.0,
+    "reviews": 2.0,
+    "yelp_rating": 1.0,
+    "yelp_reviews": 1.0,
+    "yelp_open": 0.5,
+    "proximity": 3.0,
+    "has_owner": 2.0,
+    "has_social": 1.0,
+    "has_website": 1.0,
+    "operational": 2.0,
+    "chain": -5.0,
+}
+
+# Review counts at or above this saturate the review features
+REVIEW_CAP = 1000
+# Places farther than this from every anchor get no proximity credit
+MAX_MILES = 25.0
+# A name shared by this many places counts as a certain chain
+CHAIN_NAME_COUNT = 5
+
+TOP_N = 500
+TOP_LEADS_CSV = "restaurants_top_leads.csv"
+SCORE_COLUMN = "Lead Score"
+
+_CHAIN_RE = re.compile("|".join(re.escape(c) for c in CHAIN_BLOCKLIST))
+
+
+def load_weights(path: pathlib.Path) -> dict[str, float]:
+    """Return the defaults updated with the JSON object at ``path``."""
+    overrides = json.loads(path.read_text(encoding="utf-8"))
+    unknown = set(overrides) - set(DEFAULT_WEIGHTS)
+    if unknown:
+        raise ValueError(f"Unknown score features: {sorted(unknown)}")
+    return {**DEFAULT_WEIGHTS, **{k: float(v) for k, v in overrides.items()}}
+
+
+def _column(df: pd.DataFrame, name: str) -> pd.Series:
+    if name in df.columns:
+        return df[name]
+    return pd.Series(np.nan, index=df.index, dtype=object)
+
+
+def _numeric(df: pd.DataFrame, name: str) -> np.ndarray:
+    return pd.to_numeric(_column(df, name), errors="coerce").to_numpy(
+        dtype=float
+    )
+
+
+def _present(df: pd.DataFrame, *names: str) -> np.ndarray:
+    """Return 1.0 where any of ``names`` holds a non-empty value."""
+    out = np.zeros(len(df))
+    for name in names:
+        s = _column(df, name)
+        filled = s.notna() & s.ne("")
+        out = np.maximum(out, filled.to_numpy(dtype=float))
+    return out
+
+
+def _log_scaled(counts: np.ndarray) -> np.ndarray:
+    counts = np.clip(np.nan_to_num(counts), 0, REVIEW_CAP)
+    return np.log1p(counts) / np.log1p(REVIEW_CAP)
+
+
+def chain_likelihood(names: pd.Series) -> np.ndarray:
+    """Return 0–1 per name from the blocklist and repeated names.
+
+    String work runs once per distinct name rather than once per row.
+    """
+    codes, uniques = pd.factorize(names, use_na_sentinel=False)
+    keys = pd.Series(uniques, dtype=object).fillna("").astype(str)
+    keys = keys.str.lower().str.strip()
+    key_codes, distinct = pd.factorize(keys)
+    codes = key_codes[codes]
+    keys = pd.Series(distinct, dtype=object)
+    listed = keys.str.contains(_CHAIN_RE).to_numpy(dtype=float)
+    repeats = np.bincount(codes, minlength=len(keys)).astype(float)
+    repeated = np.clip((repeats - 1) / (CHAIN_NAME_COUNT - 1), 0, 1)
+    repeated[keys.eq("").to_numpy()] = 0.0
+    return np.maximum(listed, repeated)[codes]
+
+
+def features(df: pd.DataFrame) -> pd.DataFrame:
+    """Return every score feature scaled to 0–1, one column per weight."""
+    status = _column(df, "Business Status")
+    yelp_status = _column(df, "yelp_status")
+    distance = _numeric(df, "Distance Miles")
+    return pd.DataFrame(
+        {
+            "rating": np.nan_to_num(_numeric(df, "Rating") / 5),
+            "reviews": _log_scaled(_numeric(df, "User Ratings Total")),
+            "yelp_rating": np.nan_to_num(_numeric(df, "yelp_rating") / 5),
+            "yelp_reviews": _log_scaled(_numeric(df, "yelp_reviews")),
+            "yelp_open": yelp_status.eq("open").to_numpy(float),
+            "proximity": np.nan_to_num(
+                1 - np.clip(distance / MAX_MILES, 0, 1)
+            ),
+            "has_owner": _present(df, "Owner Name"),
+            "has_social": _present(df, "facebook_url", "instagram_url"),
+            "has_website": _present(df, "Website"),
+            "operational": status.eq("OPERATIONAL").to_numpy(float),
+            "chain": chain_likelihood(_column(df, "Name")),
+        },
+        index=df.index,
+    )
+
+
+def score_leads(
+    df: pd.DataFrame, weights: dict[str, float] | None = None
+) -> pd.Series:
+    """Return a 0–100 lead score for every row of ``df``."""
+    weights = DEFAULT_WEIGHTS if weights is None else weights
+    feats = features(df)
+    names = [k for k in feats.columns if weights.get(k)]
+    w = np.array([weights[k] for k in names], dtype=float)
+    raw = feats[names].to_numpy() @ w
+    # Scale so a place with every positive feature and no penalty scores 100
+    best = w[w > 0].sum() or 1.0
+    score = np.clip(raw / best, 0, 1) * 100
+    return pd.Series(score.round(1), index=df.index, name=SCORE_COLUMN)
+
+
+def top_leads(
+    df: pd.DataFrame,
+    n: int = TOP_N,
+    weights: dict[str, float] | None = None,
+) -> pd.DataFrame:
+    """Return the ``n`` best-scoring rows, highest first."""
+    score = score_leads(df, weights).to_numpy()
+    n = min(n, len(score))
+    if n <= 0:
+        return df.iloc[:0].assign(**{SCORE_COLUMN: pd.Series(dtype=float)})
+    # Partition first so only the top ``n`` are fully sorted
+    top = np.argpartition(-score, n - 1)[:n]
+    top = top[np.argsort(-score[top], kind="stable")]
+    out = df.iloc[top].copy()
+    out[SCORE_COLUMN] = score[top]
+    return out
+
+
+def write_top_leads(
+    df: pd.DataFrame,
+    n: int = TOP_N,
+    weights: dict[str, float] | None = None,
+    path: str = TOP_LEADS_CSV,
+) -> int:
+    """Write the top ``n`` leads to ``path`` atomically; return the count."""
+    out = top_leads(df, n, weights)
+    tmp = f"{path}.tmp"
+    out.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+    return len(out)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Score the prepped table and write the best leads to CSV."""
+    parser = argparse.ArgumentParser(description="Rank prepped leads")
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=TOP_N,
+        help="Number of leads to write",
+    )
+    parser.add_argument(
+        "--weights",
+        help="JSON file overriding feature weights",
+    )
+    parser.add_argument(
+        "--output",
+        default=TOP_LEADS_CSV,
+        help="Destination CSV",
+    )
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    weights = (
+        load_weights(pathlib.Path(args.weights)) if args.weights else None
+    )
+    conn = loader.ensure_db()
+    try:
+        df = pd.read_sql_query(f"SELECT * FROM {PREPPED_TABLE}", conn)
+    except pd.errors.DatabaseError:
+        logging.error("No prepped table; run prep_restaurants.py first")
+        raise SystemExit(1)
+    finally:
+        conn.close()
+    count = write_top_leads(df, args.top, weights, args.output)
+    logging.info("Wrote %s top leads to %s", count, args.output)
+
+
+if __name__ == "__main__":  # pragma: no cover - manual execution
+    main()
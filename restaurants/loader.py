@@ -15,8 +15,10 @@ import json
 from datetime import datetime, timezone
 
 try:
+    from restaurants.hours import replace_hours
     from restaurants.utils import setup_logging
 except ImportError:  # pragma: no cover - fallback for running as script
+    from hours import replace_hours  # type: ignore
     from utils import setup_logging  # type: ignore
 
 DB_PATH = pathlib.Path(__file__).with_name("dela.sqlite")
@@ -56,7 +58,63 @@ CREATE TABLE IF NOT EXISTS places (
   facebook_url TEXT,
   instagram_url TEXT,
   gpv_projection REAL,
-  owner_name TEXT
+  owner_name TEXT,
+  yelp_id TEXT,
+  opening_hours TEXT,
+  cluster_id TEXT
+);
+
+CREATE TABLE IF NOT EXISTS opening_hours (
+  place_id TEXT,
+  day INTEGER,
+  open_min INTEGER,
+  close_min INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_opening_hours_day
+  ON opening_hours (day, open_min, close_min);
+CREATE INDEX IF NOT EXISTS idx_opening_hours_place
+  ON opening_hours (place_id);
+
+CREATE TABLE IF NOT EXISTS place_changes (
+  seq INTEGER PRIMARY KEY AUTOINCREMENT,
+  place_id TEXT
+);
+CREATE TRIGGER IF NOT EXISTS places_insert_change AFTER INSERT ON places
+BEGIN
+  INSERT INTO place_changes (place_id) VALUES (NEW.place_id);
+END;
+CREATE TRIGGER IF NOT EXISTS places_delete_change AFTER DELETE ON places
+BEGIN
+  INSERT INTO place_changes (place_id) VALUES (OLD.place_id);
+END;
+
+CREATE TABLE IF NOT EXISTS prep_state (
+  key TEXT PRIMARY KEY,
+  value TEXT
+);
+
+CREATE TABLE IF NOT EXISTS yelp_candidates (
+  business_id TEXT PRIMARY KEY,
+  name TEXT,
+  lat REAL,
+  lon REAL,
+  phone TEXT,
+  rating REAL,
+  review_count INTEGER,
+  price TEXT,
+  is_closed INTEGER,
+  cuisines TEXT,
+  category_titles TEXT,
+  fetched_at TIMESTAMP,
+  city TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_yelp_candidates_phone
+  ON yelp_candidates (phone);
+
+CREATE TABLE IF NOT EXISTS yelp_reviews (
+  business_id TEXT PRIMARY KEY,
+  reviews TEXT,
+  fetched_at TIMESTAMP
 );
 """
 )
@@ -86,6 +144,7 @@ RENAMES = {
     "instagram_url": "instagram_url",
     "GPV Projection": "gpv_projection",
     "Owner Name": "owner_name",
+    "Opening Hours": "opening_hours",
 }
 
 # --------------------------------------------------------------------------- #
@@ -93,9 +152,39 @@ RENAMES = {
 # --------------------------------------------------------------------------- #
 
 
-def ensure_db() -> sqlite3.Connection:
-    """Create dela.sqlite and the places table if they don’t exist yet."""
-    conn = sqlite3.connect(DB_PATH)
+def _update_trigger_sql(columns: list[str]) -> str:
+    # Prep reads every column and the API's ETag follows the feed, so any
+    # real change counts. Updates that rewrite the same values, as the Yelp
+    # and resolve passes do for most rows, stay out of the feed.
+    changed = "\n    OR ".join(f"OLD.{c} IS NOT NEW.{c}" for c in columns)
+    return (
+        "CREATE TRIGGER places_update_change AFTER UPDATE ON places\n"
+        f"WHEN {changed}\n"
+        "BEGIN\n"
+        "  INSERT INTO place_changes (place_id) VALUES (NEW.place_id);\n"
+        "END"
+    )
+
+
+def _ensure_update_trigger(cur: sqlite3.Cursor) -> None:
+    """(Re)create the update trigger over the current ``places`` columns."""
+    cur.execute("PRAGMA table_info(places)")
+    sql = _update_trigger_sql([row[1] for row in cur.fetchall()])
+    cur.execute(
+        "SELECT sql FROM sqlite_master"
+        " WHERE type='trigger' AND name='places_update_change'"
+    )
+    row = cur.fetchone()
+    if row and row[0] == sql:
+        return
+    cur.execute("DROP TRIGGER IF EXISTS places_update_change")
+    cur.execute(sql)
+
+
+def ensure_db(path: pathlib.Path | None = None) -> sqlite3.Connection:
+    """Create dela.sqlite (or ``path``) and its tables if they don’t exist
+    yet."""
+    conn = sqlite3.connect(path or DB_PATH)
     conn.executescript(SCHEMA)
     cur = conn.cursor()
     cur.execute("PRAGMA table_info(places)")
@@ -118,6 +207,27 @@ def ensure_db() -> sqlite3.Connection:
         cur.execute("ALTER TABLE places ADD COLUMN gpv_projection REAL")
     if "owner_name" not in cols:
         cur.execute("ALTER TABLE places ADD COLUMN owner_name TEXT")
+    if "yelp_id" not in cols:
+        cur.execute("ALTER TABLE places ADD COLUMN yelp_id TEXT")
+    if "opening_hours" not in cols:
+        cur.execute("ALTER TABLE places ADD COLUMN opening_hours TEXT")
+    if "cluster_id" not in cols:
+        cur.execute("ALTER TABLE places ADD COLUMN cluster_id TEXT")
+    # After the migrations so new columns are watched too
+    _ensure_update_trigger(cur)
+    cur.execute("PRAGMA table_info(yelp_candidates)")
+    if "city" not in {row[1] for row in cur.fetchall()}:
+        cur.execute("ALTER TABLE yelp_candidates ADD COLUMN city TEXT")
+    # Indexes for the API's bbox and ZIP queries
+    if {"lat", "lon"} <= cols:
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_places_lat_lon"
+            " ON places (lat, lon)"
+        )
+    if "zip_code" in cols:
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_places_zip ON places (zip_code)"
+        )
     conn.commit()
     return conn
 
@@ -131,9 +241,13 @@ def load(csv_file: pathlib.Path) -> None:
     qs = ", ".join(["?"] * len(RENAMES))
     insert_sql = f"INSERT OR IGNORE INTO places ({cols}) VALUES ({qs})"
 
+    hours: list[tuple[str, str | None]] = []
     with csv_file.open(newline="", encoding="utf-8") as f:
         for row in csv.DictReader(f):
             cur.execute(insert_sql, [row.get(k) for k in RENAMES])
+            hours.append((row.get("Place ID"), row.get("Opening Hours")))
+    # Hours change more often than the rest of a place, so always refresh
+    replace_hours(conn, hours)
 
     conn.commit()
     total = cur.execute("SELECT COUNT(*) FROM places").fetchone()[0]
@@ -1,8 +1,34 @@
-"""Utility functions for network-related checks."""
+"""Utility functions for network-related checks.
 
+``check_network`` probes connectivity with one real request. Callers use
+``network_available`` instead, which reuses the last probe for
+``CONNECTIVITY_TTL`` seconds and also learns from the requests made through
+sessions passed to ``guard_session``. Those sessions keep a circuit breaker
+per host. After ``BREAKER_FAILURES`` consecutive failures a host is skipped
+for ``BREAKER_RESET`` seconds and requests to it raise ``CircuitOpenError``
+immediately rather than each waiting out a timeout.
+"""
+
+from __future__ import annotations
+
+import functools
 import logging
+import math
 import os
-import requests
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable
+from urllib.parse import urlsplit
+
+if TYPE_CHECKING:
+    import requests
+
+# Seconds a connectivity probe result is reused
+CONNECTIVITY_TTL = 30.0
+# Consecutive failures that open a host's breaker
+BREAKER_FAILURES = 5
+# Seconds an open breaker waits before letting one trial request through
+BREAKER_RESET = 30.0
 
 
 def check_network(
@@ -35,6 +61,8 @@ def check_network(
                 timeout_env,
             )
 
+    import requests
+
     try:
         if method.upper() == "HEAD":
             # ``allow_redirects`` avoids downloading large responses and
@@ -49,3 +77,199 @@ def check_network(
         return False
     except requests.RequestException:
         return False
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised instead of sending a request to a host whose breaker is open."""
+
+    def __init__(self, host: str, retry_in: float) -> None:
+        super().__init__(f"Circuit open for {host}; retry in {retry_in:.0f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one host.
+
+    Closed: requests pass and failures are counted. Open: requests are
+    refused until ``reset`` seconds have passed. Then one trial request is
+    let through (half-open); success closes the breaker and failure opens
+    it again.
+    """
+
+    def __init__(
+        self,
+        failures: int = BREAKER_FAILURES,
+        reset: float = BREAKER_RESET,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failures = failures
+        self.reset = reset
+        self._clock = clock
+        self._count = 0
+        self._opened_at: float | None = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._trial or self.retry_in() == 0:
+                return "half-open"
+            return "open"
+
+    def retry_in(self) -> float:
+        """Seconds until the next trial request is allowed."""
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self._opened_at + self.reset - self._clock())
+
+    def allow(self) -> bool:
+        """Return whether a request may be sent now."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial or self.retry_in() > 0:
+                return False
+            self._trial = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._count = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._count += 1
+            if self._trial or self._count >= self.failures:
+                if self._opened_at is None:
+                    logging.warning(
+                        "Opening circuit after %s failures", self._count
+                    )
+                self._opened_at = self._clock()
+                self._trial = False
+
+
+class Connectivity:
+    """Cached reachability plus one circuit breaker per host."""
+
+    def __init__(
+        self,
+        ttl: float = CONNECTIVITY_TTL,
+        probe: Callable[[], bool] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl = ttl
+        self._probe = probe
+        self._clock = clock
+        self._online = False
+        self._checked_at = -math.inf
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def online(self) -> bool:
+        """Return reachability, probing only when the cached state expired.
+
+        Concurrent callers wait for the same probe.
+        """
+        with self._lock:
+            if self._clock() - self._checked_at >= self.ttl:
+                probe = self._probe or check_network
+                self._online = bool(probe())
+                self._checked_at = self._clock()
+            return self._online
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(clock=self._clock)
+            return self._breakers[host]
+
+    def before_request(self, url: str) -> None:
+        """Raise ``CircuitOpenError`` if ``url``'s host is being skipped."""
+        host = urlsplit(url).netloc
+        breaker = self.breaker(host)
+        if not breaker.allow():
+            raise CircuitOpenError(host, breaker.retry_in())
+
+    def record(self, url: str, ok: bool, network_error: bool = False) -> None:
+        """Learn from the outcome of a real request to ``url``.
+
+        A response proves connectivity. A connection error or timeout
+        expires the cached state so the next check probes again.
+        """
+        breaker = self.breaker(urlsplit(url).netloc)
+        if ok:
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+        with self._lock:
+            if not network_error:
+                self._online = True
+                self._checked_at = self._clock()
+            else:
+                self._checked_at = -math.inf
+
+    def reset(self) -> None:
+        """Forget the cached state and every breaker."""
+        with self._lock:
+            self._checked_at = -math.inf
+            self._breakers.clear()
+
+
+CONNECTIVITY = Connectivity()
+
+
+def network_available() -> bool:
+    """Return whether the network is reachable, probing at most once per
+    ``CONNECTIVITY_TTL`` seconds."""
+    return CONNECTIVITY.online()
+
+
+@functools.cache
+def _breaker_adapter() -> type:
+    # Defined on first use so importing this module doesn't load requests
+    import requests
+
+    class BreakerAdapter(requests.adapters.HTTPAdapter):
+        """Transport adapter that consults and feeds a ``Connectivity``."""
+
+        def __init__(self, connectivity: Connectivity, **kwargs: Any):
+            super().__init__(**kwargs)
+            self.connectivity = connectivity
+
+        def send(self, request: Any, **kwargs: Any) -> Any:
+            self.connectivity.before_request(request.url)
+            try:
+                resp = super().send(request, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self.connectivity.record(request.url, False, True)
+                raise
+            self.connectivity.record(request.url, resp.status_code < 500)
+            return resp
+
+    return BreakerAdapter
+
+
+def breaker_adapter(
+    connectivity: Connectivity | None = None, **kwargs: Any
+) -> Any:
+    """Return a transport adapter that consults and feeds ``connectivity``.
+
+    ``kwargs`` are passed to ``requests.adapters.HTTPAdapter``.
+    """
+    return _breaker_adapter()(connectivity or CONNECTIVITY, **kwargs)
+
+
+def guard_session(
+    session: requests.Session, connectivity: Connectivity | None = None
+) -> requests.Session:
+    """Route ``session``'s HTTP(S) requests through the host breakers."""
+    adapter = breaker_adapter(connectivity)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
@@ -1,21 +1,55 @@
+"""Owner lookups against Washington's business registry and city rolls.
+
+Names are looked up in batches of up to ``BATCH_SIZE`` per SoQL query and
+the results are split back per name. A response that fills its row limit
+may have dropped names, so those are looked up again in smaller batches
+instead of being cached as misses. Requests share one semaphore-bounded
+client that retries rate limits and server errors with jittered backoff.
+Responses are cached in a single SQLite file keyed by normalized business
+name.
+"""
+
 from __future__ import annotations
 
 import asyncio
-import aiohttp
+import contextlib
 import os
 import json
 import pathlib
+import re
+import sqlite3
+import time
+from typing import Any, AsyncIterator, Callable
 from urllib.parse import quote_plus
 
-import pandas as pd
+from restaurants import config, http_client
+from restaurants.utils import lazy_import
+from restaurants.wa_registry import RegistryIndex
+
+aiohttp = lazy_import("aiohttp")
+pd = lazy_import("pandas")
 
 WA_DATASET = "4wur-kfnr"
 BASE = f"https://data.wa.gov/resource/{WA_DATASET}.json"
-APP_TOKEN = os.getenv("WA_APP_TOKEN")
-CITY_APP_TOKEN = os.getenv("CITY_APP_TOKEN")
+# Environment variables holding optional Socrata app tokens
+APP_TOKEN_ENV = "WA_APP_TOKEN"
+CITY_APP_TOKEN_ENV = "CITY_APP_TOKEN"
 
 CACHE_DIR = pathlib.Path(__file__).resolve().parents[1] / "raw_responses"
-CACHE_DIR.mkdir(exist_ok=True)
+CACHE_FILE = "owner_cache.sqlite"
+CACHE_TTL_DAYS = 30
+
+# Socrata throttles bursts, so keep the number of open requests small
+MAX_CONCURRENCY = 8
+MAX_RETRIES = 4
+BACKOFF_BASE = 0.5
+REQUEST_TIMEOUT = 20
+
+# Names sent per SoQL ``IN (...)`` query and rows requested for each name.
+# A chain with many registrations can still fill a batch's limit; the names
+# it pushed out are queried again (see ``_lookup``)
+BATCH_SIZE = 50
+ROWS_PER_NAME = 3
 
 CITY_DATASETS = {
     "OLYMPIA": "f5gn-bcv7",
@@ -24,36 +58,265 @@ CITY_DATASETS = {
 }
 
 
-def _cache_file(prefix: str, name: str) -> pathlib.Path:
-    key = quote_plus(name)
-    return CACHE_DIR / f"{prefix}_{key}.json"
+def _normalize_name(name: str) -> str:
+    """Return ``name`` casefolded with collapsed whitespace."""
+    return re.sub(r"\s+", " ", name).strip().casefold()
+
+
+class ResponseCache:
+    """SQLite-backed store of Socrata responses with a TTL.
+
+    Fresh entries are loaded into memory once when the cache is opened so
+    lookups never touch the disk. New responses are buffered and written in
+    batches.
+    """
+
+    FLUSH_EVERY = 500
+
+    def __init__(
+        self, path: pathlib.Path, ttl_days: float = CACHE_TTL_DAYS
+    ) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " prefix TEXT, key TEXT, data TEXT, fetched_at REAL,"
+            " PRIMARY KEY (prefix, key))"
+        )
+        cutoff = time.time() - ttl_days * 86400
+        self._mem: dict[tuple[str, str], Any] = {
+            (prefix, key): json.loads(data)
+            for prefix, key, data in self.conn.execute(
+                "SELECT prefix, key, data FROM responses"
+                " WHERE fetched_at >= ?",
+                (cutoff,),
+            )
+        }
+        self._pending: list[tuple[str, str, str, float]] = []
+
+    def get(self, prefix: str, name: str) -> Any | None:
+        return self._mem.get((prefix, _normalize_name(name)))
+
+    def put(self, prefix: str, name: str, data: Any) -> None:
+        key = _normalize_name(name)
+        self._mem[(prefix, key)] = data
+        self._pending.append((prefix, key, json.dumps(data), time.time()))
+        if len(self._pending) >= self.FLUSH_EVERY:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+            self._pending,
+        )
+        self.conn.commit()
+        self._pending.clear()
+
+    def close(self) -> None:
+        self.flush()
+        self.conn.close()
+
+    def __enter__(self) -> "ResponseCache":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
 
+class OwnerClient:
+    """Bounded-concurrency Socrata client with retry, jitter and caching."""
 
-def _build_url(name: str) -> str:
-    safe = name.replace("'", "''")
-    where = quote_plus(f"business_name ILIKE '{safe}'")
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        cache: ResponseCache,
+        limit: int = MAX_CONCURRENCY,
+    ) -> None:
+        self.session = session
+        self.cache = cache
+        self._sem = asyncio.Semaphore(limit)
+
+    async def get_json(
+        self, url: str, headers: dict[str, str], strict: bool = True
+    ) -> list[dict[str, Any]] | None:
+        """Return the JSON list at ``url``.
+
+        Rate limits, server errors and timeouts are retried with full-jitter
+        exponential backoff. Other error statuses, and failures that outlast
+        the retries, raise when ``strict`` is set and return ``None``
+        otherwise so the caller can tell them from an empty answer.
+        """
+        timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        for attempt in range(MAX_RETRIES + 1):
+            last = attempt == MAX_RETRIES
+            try:
+                async with self._sem:
+                    async with self.session.get(
+                        url, headers=headers, timeout=timeout
+                    ) as resp:
+                        retryable = resp.status == 429 or resp.status >= 500
+                        if resp.status == 200:
+                            return await resp.json()
+                        if not retryable or last:
+                            if strict:
+                                resp.raise_for_status()
+                            return None
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if last:
+                    if strict:
+                        raise
+                    return None
+            delay = http_client.backoff_delay(attempt, BACKOFF_BASE)
+            await asyncio.sleep(delay)
+        return None
+
+
+def _cache_path() -> pathlib.Path:
+    return CACHE_DIR / CACHE_FILE
+
+
+@contextlib.asynccontextmanager
+async def _session(
+    session: aiohttp.ClientSession | None,
+) -> AsyncIterator[aiohttp.ClientSession]:
+    """Yield ``session`` or a private one that is closed afterwards."""
+    if session is not None:
+        yield session
+        return
+    async with http_client.async_session(limit=MAX_CONCURRENCY) as own:
+        yield own
+
+
+def _token_headers(env: str) -> dict[str, str]:
+    """Return the app-token header from ``env``, read after ``.env``."""
+    config.load_env()
+    token = os.getenv(env)
+    return {"X-App-Token": token} if token else {}
+
+
+def _soql_literal(value: str) -> str:
+    """Return ``value`` as a quoted SoQL string literal."""
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _where_names(names: list[str]) -> str:
+    """Return a URL-encoded ``$where`` matching any of ``names``.
+
+    Names are compared upper-cased with collapsed whitespace, so the match is
+    case-insensitive like the old per-name ``ILIKE`` but free of wildcards.
+    """
+    keys = ", ".join(_soql_literal(_normalize_name(n).upper()) for n in names)
+    return quote_plus(f"upper(business_name) IN ({keys})")
+
+
+def _limit(names: list[str]) -> int:
+    return len(names) * ROWS_PER_NAME
+
+
+def _build_url(names: list[str]) -> str:
     cols = (
         "business_name,unified_business_identifier,"
         "governing_people_1_full_name,governing_people_2_full_name,"
         "governing_people_3_full_name,governing_people_4_full_name,"
         "governing_people_5_full_name"
     )
-    return f"{BASE}?$limit=1&$select={cols}&$where={where}"
-
-
-async def _hit(
-    session: aiohttp.ClientSession, name: str
-) -> tuple[str | None, str | None]:
-    cache = _cache_file("state", name)
-    if cache.exists():
-        data = json.loads(cache.read_text())
-    else:
-        url = _build_url(name)
-        headers = {"X-App-Token": APP_TOKEN} if APP_TOKEN else {}
-        async with session.get(url, headers=headers, timeout=20) as resp:
-            resp.raise_for_status()
-            data = await resp.json()
-        cache.write_text(json.dumps(data))
+    return (
+        f"{BASE}?$limit={_limit(names)}&$order=business_name"
+        f"&$select={cols}&$where={_where_names(names)}"
+    )
+
+
+def _city_url(city: str, names: list[str]) -> str:
+    ds = CITY_DATASETS[city.upper()]
+    return (
+        f"https://data.{city.lower()}wa.gov/resource/{ds}.json"
+        f"?$limit={_limit(names)}&$order=business_name"
+        f"&$where={_where_names(names)}"
+    )
+
+
+def _demux(
+    names: list[str], data: list[dict[str, Any]]
+) -> dict[str, list[dict[str, Any]]]:
+    """Split a batched response back into the first record per name."""
+    by_key: dict[str, dict[str, Any]] = {}
+    for rec in data:
+        by_key.setdefault(_normalize_name(rec.get("business_name") or ""), rec)
+    out: dict[str, list[dict[str, Any]]] = {}
+    for name in names:
+        rec = by_key.get(_normalize_name(name))
+        out[name] = [rec] if rec else []
+    return out
+
+
+def _uncached(cache: ResponseCache, prefix: str, names: Any) -> list[str]:
+    """Return distinct non-empty ``names`` missing from ``cache``."""
+    seen: dict[str, str] = {}
+    for name in names:
+        if not name or not isinstance(name, str):
+            continue
+        key = _normalize_name(name)
+        if key and key not in seen and cache.get(prefix, name) is None:
+            seen[key] = name
+    return list(seen.values())
+
+
+def _batches(names: list[str], size: int) -> list[list[str]]:
+    return [names[i:i + size] for i in range(0, len(names), size)]
+
+
+async def _lookup(
+    client: OwnerClient,
+    prefix: str,
+    batch: list[str],
+    url_for: Callable[[list[str]], str],
+    headers: dict[str, str],
+    strict: bool = True,
+) -> None:
+    """Look up ``batch`` with one query and cache each name's answer.
+
+    When the response fills its ``$limit`` the names it doesn't mention may
+    have been cut off rather than missing. Only the names it found are
+    cached; the rest are queried again in halves. Failed requests cache
+    nothing, so the names are retried on the next run.
+    """
+    data = await client.get_json(url_for(batch), headers, strict=strict)
+    if data is None:
+        return
+    truncated = len(data) >= _limit(batch)
+    retry = []
+    for name, recs in _demux(batch, data).items():
+        if recs or not truncated:
+            client.cache.put(prefix, name, recs)
+        else:
+            retry.append(name)
+    # A truncated response always resolves at least one name, so ``retry``
+    # is smaller than ``batch`` and this terminates
+    if retry and len(retry) < len(batch):
+        size = max(1, (len(retry) + 1) // 2)
+        await asyncio.gather(
+            *(
+                _lookup(client, prefix, b, url_for, headers, strict)
+                for b in _batches(retry, size)
+            )
+        )
+
+
+async def _fetch_state(client: OwnerClient, names: list[str]) -> None:
+    """Look up ``names`` in batches and store each answer in the cache."""
+    headers = _token_headers(APP_TOKEN_ENV)
+    missing = _uncached(client.cache, "state", names)
+    await asyncio.gather(
+        *(
+            _lookup(client, "state", b, _build_url, headers)
+            for b in _batches(missing, BATCH_SIZE)
+        )
+    )
+
+
+def _state_owner(data: list[dict[str, Any]]) -> tuple[str | None, str | None]:
     if data:
         rec = data[0]
         owners = [
@@ -68,16 +331,6 @@ async def _hit(
     return None, None
 
 
-def _city_url(city: str, name: str) -> str:
-    ds = CITY_DATASETS[city.upper()]
-    safe = name.replace("'", "''")
-    where = quote_plus(f"business_name ILIKE '{safe}'")
-    return (
-        f"https://data.{city.lower()}wa.gov/resource/{ds}.json?$limit=1"
-        f"&$where={where}"
-    )
-
-
 def _extract_owner(rec: dict[str, str]) -> str | None:
     for k, v in rec.items():
         lk = k.lower()
@@ -86,45 +339,82 @@ def _extract_owner(rec: dict[str, str]) -> str | None:
     return None
 
 
-async def _hit_city(
-    session: aiohttp.ClientSession, city: str, name: str
-) -> str | None:
-    cache = _cache_file(city.lower(), name)
-    if cache.exists():
-        data = json.loads(cache.read_text())
-    else:
-        url = _city_url(city, name)
-        headers = {"X-App-Token": CITY_APP_TOKEN} if CITY_APP_TOKEN else {}
-        async with session.get(url, headers=headers, timeout=20) as resp:
-            if resp.status == 200:
-                data = await resp.json()
-            else:
-                data = []
-        cache.write_text(json.dumps(data))
-    if data:
-        owner = _extract_owner(data[0])
-        return owner
-    return None
+async def _fetch_city(
+    client: OwnerClient, city: str, names: list[str]
+) -> None:
+    """Look up ``names`` in ``city`` in batches and cache each answer."""
+    headers = _token_headers(CITY_APP_TOKEN_ENV)
+    prefix = city.lower()
 
+    def url_for(batch: list[str]) -> str:
+        return _city_url(city, batch)
 
-async def enrich_state(df: pd.DataFrame) -> pd.DataFrame:
-    async with aiohttp.ClientSession() as session:
-        tasks = [_hit(session, n) for n in df["Name"]]
-        results = await asyncio.gather(*tasks)
+    missing = _uncached(client.cache, prefix, names)
+    await asyncio.gather(
+        *(
+            _lookup(client, prefix, b, url_for, headers, strict=False)
+            for b in _batches(missing, BATCH_SIZE)
+        )
+    )
+
+
+async def enrich_state(
+    df: pd.DataFrame,
+    session: aiohttp.ClientSession | None = None,
+    limit: int = MAX_CONCURRENCY,
+) -> pd.DataFrame:
+    names = [str(n) if pd.notna(n) else "" for n in df["Name"]]
+    with ResponseCache(_cache_path()) as cache:
+        async with _session(session) as sess:
+            await _fetch_state(OwnerClient(sess, cache, limit), names)
+        results = [_state_owner(cache.get("state", n) or []) for n in names]
+    df["ubi"], df["owner_name_state"] = zip(*results)
+    return df
+
+
+def enrich_state_local(
+    df: pd.DataFrame, db_path: pathlib.Path | None = None
+) -> pd.DataFrame:
+    """Resolve state owners from the offline registry mirror.
+
+    Builds the same ``ubi``/``owner_name_state`` columns as
+    :func:`enrich_state` without any network access.
+    """
+    with RegistryIndex(db_path) as index:
+        results = [
+            index.lookup(str(n)) if pd.notna(n) else (None, None)
+            for n in df["Name"]
+        ]
     df["ubi"], df["owner_name_state"] = zip(*results)
     return df
 
 
-async def enrich_cities(df: pd.DataFrame) -> pd.DataFrame:
-    async with aiohttp.ClientSession() as session:
-        tasks = []
-        for _, row in df.iterrows():
-            city = str(row.get("City", ""))
-            name = str(row.get("Name", ""))
-            if city.upper() in CITY_DATASETS and name:
-                tasks.append(_hit_city(session, city, name))
-            else:
-                tasks.append(asyncio.sleep(0, None))
-        owner_names = await asyncio.gather(*tasks)
+async def enrich_cities(
+    df: pd.DataFrame,
+    session: aiohttp.ClientSession | None = None,
+    limit: int = MAX_CONCURRENCY,
+) -> pd.DataFrame:
+    pairs = [
+        (str(row.get("City", "")), str(row.get("Name", "")))
+        for _, row in df.iterrows()
+    ]
+    by_city: dict[str, list[str]] = {}
+    for city, name in pairs:
+        if city.upper() in CITY_DATASETS and name:
+            by_city.setdefault(city.upper(), []).append(name)
+    with ResponseCache(_cache_path()) as cache:
+        async with _session(session) as sess:
+            client = OwnerClient(sess, cache, limit)
+            await asyncio.gather(
+                *(_fetch_city(client, c, n) for c, n in by_city.items())
+            )
+        owner_names = []
+        for city, name in pairs:
+            data = (
+                cache.get(city.lower(), name)
+                if city.upper() in CITY_DATASETS and name
+                else None
+            )
+            owner_names.append(_extract_owner(data[0]) if data else None)
     df["owner_name_city"] = owner_names
     return df
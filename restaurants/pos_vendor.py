@@ -0,0 +1,302 @@
+"""Detect the POS or online-ordering vendor behind a restaurant website.
+
+Each website is fetched, plus up to ``MAX_ORDER_LINKS`` linked ordering
+pages when the home page alone doesn't give the vendor away. Pages are read
+up to ``MAX_BYTES``. The final URLs, page markup and link targets are
+matched against the host fingerprints in ``SIGNATURES``. Append to that list
+to recognise more vendors; earlier entries win when a page matches several.
+
+Requests run concurrently with at most ``PER_HOST`` per host. Answers,
+including "nothing found", are cached per domain for ``CACHE_TTL_DAYS`` so
+weekly reruns only fetch new sites.
+
+Usage:
+    python -m restaurants.pos_vendor olympia_toast_smb_<timestamp>.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import logging
+import os
+import pathlib
+import re
+import sqlite3
+import time
+from collections import Counter
+from typing import Iterable
+from urllib.parse import urljoin, urlsplit
+
+try:
+    from restaurants import http_client
+    from restaurants.utils import lazy_import, setup_logging
+except ImportError:  # pragma: no cover - fallback for running as script
+    import http_client  # type: ignore
+    from utils import lazy_import, setup_logging  # type: ignore
+
+aiohttp = lazy_import("aiohttp")
+
+# (vendor, host fingerprints) checked in order
+SIGNATURES: list[tuple[str, tuple[str, ...]]] = [
+    ("Toast", ("toasttab.com", "toast-static.com")),
+    ("Square", ("squareup.com", "square.site", "squarecdn.com")),
+    ("Clover", ("clover.com", "cloverstatic.com")),
+    ("ChowNow", ("chownow.com",)),
+    ("Olo", ("olo.com", "olocdn.net")),
+    ("SpotOn", ("spoton.com", "spotonapi.com")),
+    ("Lightspeed", ("lightspeedhq.com", "lsk.lightspeed.app")),
+    ("Revel", ("revelup.com", "revelsystems.com")),
+    ("TouchBistro", ("touchbistro.com", "tbdine.com")),
+    ("Owner.com", ("owner.com",)),
+    ("Menufy", ("menufy.com",)),
+    ("Slice", ("slicelife.com",)),
+    ("BentoBox", ("getbento.com",)),
+    ("Popmenu", ("popmenu.com",)),
+    ("Square Online", ("editmysite.com", "weebly.com")),
+    ("DoorDash Storefront", ("order.online",)),
+]
+
+CACHE_DIR = pathlib.Path(__file__).resolve().parents[1] / "raw_responses"
+CACHE_FILE = "pos_vendor_cache.sqlite"
+CACHE_TTL_DAYS = 30
+
+CONCURRENCY = 16
+PER_HOST = 2
+REQUEST_TIMEOUT = 15
+# Enough for the <head> scripts and the navigation links of a home page
+MAX_BYTES = 256 * 1024
+MAX_ORDER_LINKS = 3
+ORDER_HINTS = ("order", "pickup", "delivery", "takeout", "menu")
+USER_AGENT = "Mozilla/5.0 (compatible; restaurants-leads/1.0)"
+
+
+def _host_pattern(hosts: Iterable[str]) -> str:
+    # Don't let "olo.com" match inside "polo.com"; ``re`` caches the
+    # compiled pattern
+    alts = "|".join(re.escape(h) for h in hosts)
+    return rf"(?<![a-z0-9-])(?:{alts})(?![a-z0-9-])"
+
+
+def match_vendor(text: str) -> str | None:
+    """Return the first vendor whose fingerprint appears in ``text``."""
+    text = text.lower()
+    for vendor, hosts in SIGNATURES:
+        if re.search(_host_pattern(hosts), text):
+            return vendor
+    return None
+
+
+def domain(url: str) -> str:
+    """Return the host of ``url`` without ``www.``; bare hosts are allowed."""
+    if "//" not in url:
+        url = "//" + url
+    host = (urlsplit(url.strip()).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def order_links(html: str, base: str) -> list[str]:
+    """Return up to ``MAX_ORDER_LINKS`` absolute links that look like
+    ordering or menu pages."""
+    # Not bound lazily: the social links workers import bs4 from threads
+    import bs4
+
+    soup = bs4.BeautifulSoup(html, "html.parser")
+    links: list[str] = []
+    for a in soup.find_all("a", href=True):
+        text = f"{a['href']} {a.get_text(' ', strip=True)}".lower()
+        if not any(hint in text for hint in ORDER_HINTS):
+            continue
+        url = urljoin(base, a["href"])
+        if url.startswith(("http://", "https://")) and url not in links:
+            links.append(url)
+            if len(links) == MAX_ORDER_LINKS:
+                break
+    return links
+
+
+class VendorCache:
+    """SQLite cache of detected vendors keyed by domain with a TTL.
+
+    ``""`` records a site that was checked and matched nothing. Fresh
+    entries are loaded into memory when the cache is opened.
+    """
+
+    def __init__(
+        self, path: pathlib.Path, ttl_days: float = CACHE_TTL_DAYS
+    ) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS vendors ("
+            " domain TEXT PRIMARY KEY, vendor TEXT, checked_at REAL)"
+        )
+        cutoff = time.time() - ttl_days * 86400
+        self._mem: dict[str, str] = dict(
+            self.conn.execute(
+                "SELECT domain, vendor FROM vendors WHERE checked_at >= ?",
+                (cutoff,),
+            )
+        )
+        self._pending: list[tuple[str, str, float]] = []
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._mem
+
+    def get(self, key: str) -> str | None:
+        return self._mem.get(key) or None
+
+    def put(self, key: str, vendor: str | None) -> None:
+        self._mem[key] = vendor or ""
+        self._pending.append((key, vendor or "", time.time()))
+
+    def close(self) -> None:
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO vendors VALUES (?, ?, ?)", self._pending
+        )
+        self.conn.commit()
+        self.conn.close()
+
+    def __enter__(self) -> "VendorCache":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+async def fetch_page(
+    session: aiohttp.ClientSession, url: str
+) -> tuple[str, str]:
+    """Return the final URL and up to ``MAX_BYTES`` of HTML at ``url``.
+
+    Error statuses raise ``aiohttp.ClientResponseError`` so a site that is
+    down isn't cached as having no vendor.
+    """
+    async with session.get(url) as resp:
+        resp.raise_for_status()
+        final = str(resp.url)
+        kind = resp.headers.get("Content-Type", "text/html")
+        if "html" not in kind:
+            return final, ""
+        body = bytearray()
+        async for chunk in resp.content.iter_chunked(16 * 1024):
+            body += chunk
+            if len(body) >= MAX_BYTES:
+                break
+        body = body[:MAX_BYTES]
+        try:
+            return final, body.decode(resp.charset or "utf-8", "replace")
+        except LookupError:  # charsets Python doesn't know, e.g. utf8mb4
+            return final, body.decode("utf-8", "replace")
+
+
+async def detect(session: aiohttp.ClientSession, url: str) -> str | None:
+    """Return the vendor used by the site at ``url``, if recognised."""
+    if "//" not in url:
+        url = "http://" + url
+    final, html = await fetch_page(session, url)
+    vendor = match_vendor(f"{final}\n{html}")
+    if vendor or not html:
+        return vendor
+    # Links to vendor hosts already matched above; look inside the others
+    links = order_links(html, final)
+    pages = await asyncio.gather(
+        *(fetch_page(session, link) for link in links),
+        return_exceptions=True,
+    )
+    for page in pages:
+        if not isinstance(page, BaseException):
+            vendor = match_vendor("\n".join(page))
+            if vendor:
+                return vendor
+    return None
+
+
+async def detect_vendors(
+    websites: list[str | None],
+    cache: VendorCache,
+    session: aiohttp.ClientSession | None = None,
+    limit: int = CONCURRENCY,
+) -> list[str | None]:
+    """Return the vendor for each of ``websites``, in order.
+
+    Each domain is checked once. Sites that can't be reached or answer
+    with an error status are left uncached so the next run tries again.
+    """
+    first: dict[str, str] = {}
+    for site in websites:
+        key = domain(site) if site else ""
+        if key and key not in cache and key not in first:
+            first[key] = site  # type: ignore[assignment]
+    if first:
+        sem = asyncio.Semaphore(limit)
+        own = session is None
+        if own:
+            session = http_client.async_session(
+                limit=limit,
+                limit_per_host=PER_HOST,
+                timeout=REQUEST_TIMEOUT,
+                headers={"User-Agent": USER_AGENT},
+            )
+
+        async def run(key: str, site: str) -> None:
+            async with sem:
+                try:
+                    cache.put(key, await detect(session, site))
+                except Exception as exc:
+                    # One broken site mustn't abort the whole batch
+                    logging.debug("POS check failed for %s: %s", site, exc)
+
+        try:
+            await asyncio.gather(*(run(k, s) for k, s in first.items()))
+        finally:
+            if own:
+                await session.close()
+    return [cache.get(domain(site)) if site else None for site in websites]
+
+
+def qualify_csv(
+    path: str | os.PathLike, cache_path: pathlib.Path | None = None
+) -> Counter:
+    """Fill the ``pos_vendor`` column of the leads CSV at ``path``.
+
+    Returns the number of leads per vendor. The file is replaced
+    atomically.
+    """
+    path = pathlib.Path(path)
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        fields = list(reader.fieldnames or [])
+        rows = list(reader)
+    if "pos_vendor" not in fields:
+        fields.append("pos_vendor")
+    websites = [row.get("Website") or None for row in rows]
+    with VendorCache(cache_path or CACHE_DIR / CACHE_FILE) as cache:
+        vendors = asyncio.run(detect_vendors(websites, cache))
+    for row, vendor in zip(rows, vendors):
+        row["pos_vendor"] = vendor or ""
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp, path)
+    return Counter(v for v in vendors if v)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Add a pos_vendor column to a leads CSV"
+    )
+    parser.add_argument("csv", help="Leads CSV with a Website column")
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    counts = qualify_csv(args.csv)
+    for vendor, count in counts.most_common():
+        print(f"{vendor}: {count}")
+
+
+if __name__ == "__main__":  # pragma: no cover - manual execution
+    main()
@@ -1,62 +1,79 @@
 #!/usr/bin/env python3
-"""Clean Google SMB CSV and generate tidy outputs."""
+"""Clean places from dela.sqlite and generate tidy outputs.
+
+Only places added, changed or deleted since the last run are prepped. The
+loader records inserts, deletes and updates that change a value of
+``places`` in the ``place_changes`` feed; prep processes the entries past
+its stored watermark and merges the results into the persisted ``prepped``
+table. Pass ``--full`` to rebuild everything.
+"""
 
 from __future__ import annotations
 
-import glob
+import argparse
+import csv
 import logging
 import os
-import pandas as pd
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 
 try:
-    from restaurants.utils import (
-        haversine_miles,
-        haversine_miles_series,
-        setup_logging,
-    )
+    from restaurants import loader
+    from restaurants.anchors import anchor_distances, default_anchors
+    from restaurants.hours import split_display
+    from restaurants.utils import lazy_import, setup_logging
 except ImportError:  # pragma: no cover - fallback for running as script
-    from utils import (
-        haversine_miles,
-        haversine_miles_series,
-        setup_logging,
-    )  # type: ignore
+    import loader  # type: ignore
+    from anchors import anchor_distances, default_anchors  # type: ignore
+    from hours import split_display  # type: ignore
+    from utils import lazy_import, setup_logging  # type: ignore
 
+pd = lazy_import("pandas")
+xlsxwriter = lazy_import("xlsxwriter")
 
-BX_LAT, BX_LON = 47.6154255, -122.2035954  # Bellevue Square Mall
+PREPPED_TABLE = "prepped"
+WATERMARK_KEY = "prep_watermark"
+EXPORT_CHUNKSIZE = 5000
+
+# ``places`` columns are read back under the CSV headers prep always used
+CSV_COLUMNS = {db: csv for csv, db in loader.RENAMES.items()}
+# Flags SQLite stores as 0/1; the exports keep writing True/False
+FLAG_COLUMNS = ("Has Phone", "Has Website")
 
 
 def split_hours(text: str) -> dict:
     """Parse semicolon-separated hours into a dictionary."""
     if pd.isna(text) or not text:
         return {}
-
-    out: dict[str, str] = {}
-    for segment in text.split(";"):
-        if ":" not in segment:
-            continue
-        day, hours = segment.split(":", 1)
-        out[day.strip()] = hours.strip()
-    return out
+    return split_display(text)
 
 
-def _bx_distance(row: pd.Series) -> float | None:
-    dist = haversine_miles(row["lat"], row["lon"], BX_LAT, BX_LON)
-    return round(dist, 2) if dist is not None else None
+def add_anchor_columns(
+    df: pd.DataFrame,
+    anchors: dict[str, tuple[float, float]] | None = None,
+) -> pd.DataFrame:
+    """Add ``Distance <anchor>`` per anchor plus the nearest anchor.
 
+    ``Distance Miles`` holds the distance to the nearest anchor.
+    """
+    anchors = default_anchors() if anchors is None else anchors
+    dist, nearest_name, nearest = anchor_distances(
+        df["lat"].to_numpy(dtype=float),
+        df["lon"].to_numpy(dtype=float),
+        anchors,
+    )
+    for j, name in enumerate(anchors):
+        df[f"Distance {name}"] = dist[:, j].round(2)
+    df["Nearest Anchor"] = nearest_name
+    df["Distance Miles"] = nearest.round(2)
+    return df
 
-def main(argv: list[str] | None = None) -> None:
-    """Entry point for cleaning the latest Google export."""
 
-    setup_logging()
-
-    # ------------------------------------------------------------------
-    # 0.  Load the most-recent Google export
-    # ------------------------------------------------------------------
-    matches = sorted(glob.glob("olympia_smb_google_restaurants_*.csv"))
-    if not matches:
-        raise SystemExit("No olympia_smb_google_restaurants_*.csv files found")
-    newest = matches[-1]
-    df = pd.read_csv(newest)
+def prep_frame(
+    df: pd.DataFrame,
+    anchors: dict[str, tuple[float, float]] | None = None,
+) -> pd.DataFrame:
+    """Return the cleaned version of ``df`` (CSV column names)."""
 
     # ------------------------------------------------------------------
     # 1.  UTF-8 cleanup (narrow no-break space)
@@ -70,7 +87,7 @@ def main(argv: list[str] | None = None) -> None:
     # ------------------------------------------------------------------
     # 2.  Split opening hours into a dict per row
     # ------------------------------------------------------------------
-    df["Opening Hours"] = df["Opening Hours"].apply(split_hours)
+    df["Opening Hours"] = df["Opening Hours"].map(split_hours)
 
     # ------------------------------------------------------------------
     # 3.  Numeric price level -> $, $$, $$$ …
@@ -79,11 +96,9 @@ def main(argv: list[str] | None = None) -> None:
     df["Price"] = df["Price Level"].map(price_map).fillna("")
 
     # ------------------------------------------------------------------
-    # 4.  Haversine distance to Bellevue Square Mall
+    # 4.  Haversine distance to every anchor and the nearest one
     # ------------------------------------------------------------------
-    df["Distance Miles"] = haversine_miles_series(
-        df["lat"], df["lon"], BX_LAT, BX_LON
-    ).round(2)
+    df = add_anchor_columns(df, anchors)
 
     # ------------------------------------------------------------------
     # 5.  Quick lead-quality flags
@@ -104,34 +119,245 @@ def main(argv: list[str] | None = None) -> None:
         "City",
         "State",
         "Zip Code",
+        "cluster_id",
         # Add "facebook_url" and "instagram_url" here if you don't want them
         # in the cleaned output.
     ]
-    df = df.drop(columns=[c for c in drop_cols if c in df.columns])
+    return df.drop(columns=[c for c in drop_cols if c in df.columns])
 
-    # ------------------------------------------------------------------
-    # 7.  Save tidy outputs
-    # ------------------------------------------------------------------
+
+def _watermark(conn: sqlite3.Connection) -> int:
+    row = conn.execute(
+        "SELECT value FROM prep_state WHERE key=?", (WATERMARK_KEY,)
+    ).fetchone()
+    return int(row[0]) if row else 0
+
+
+def _table_columns(conn: sqlite3.Connection) -> list[str]:
+    return [
+        r[1] for r in conn.execute(f"PRAGMA table_info({PREPPED_TABLE})")
+    ]
+
+
+def _read_places(
+    conn: sqlite3.Connection, since: int | None, upto: int
+) -> pd.DataFrame:
+    """Return places changed in ``(since, upto]`` or all when ``None``."""
+    if since is None:
+        df = pd.read_sql_query("SELECT * FROM places", conn)
+    else:
+        df = pd.read_sql_query(
+            "SELECT * FROM places WHERE place_id IN ("
+            " SELECT place_id FROM place_changes WHERE seq > ? AND seq <= ?)",
+            conn,
+            params=(since, upto),
+        )
+    return df.rename(columns=CSV_COLUMNS)
+
+
+def _canonical(df: pd.DataFrame) -> pd.DataFrame:
+    """Drop records that ``resolve`` merged into another place."""
+    if "cluster_id" not in df.columns:
+        return df
+    keep = df["cluster_id"].isna() | df["cluster_id"].eq(df["Place ID"])
+    return df[keep]
+
+
+def update_prepped(
+    conn: sqlite3.Connection, full: bool = False
+) -> tuple[int, bool]:
+    """Prep changed places into the ``prepped`` table.
+
+    Returns the number of rows prepped or removed and whether the table was
+    rebuilt.
+    """
+    upto = conn.execute(
+        "SELECT COALESCE(MAX(seq), 0) FROM place_changes"
+    ).fetchone()[0]
+    existing = _table_columns(conn)
+    full = full or not existing
+    since = _watermark(conn)
+    df = _read_places(conn, None if full else since, upto)
+    prepped = prep_frame(_canonical(df))
+    # Dicts can't be stored in SQLite; keep the repr the CSV always had
+    prepped["Opening Hours"] = prepped["Opening Hours"].map(str)
+
+    if not full and list(prepped.columns) != existing:
+        logging.info("Prepped columns changed; rebuilding the full table")
+        prepped = prep_frame(_canonical(_read_places(conn, None, upto)))
+        prepped["Opening Hours"] = prepped["Opening Hours"].map(str)
+        full = True
+
+    removed = 0
+    if full:
+        prepped.to_sql(PREPPED_TABLE, conn, if_exists="replace", index=False)
+        conn.execute(
+            f'CREATE INDEX IF NOT EXISTS idx_{PREPPED_TABLE}_place'
+            f' ON {PREPPED_TABLE} ("Place ID")'
+        )
+    else:
+        where = (
+            f'FROM {PREPPED_TABLE} WHERE "Place ID" IN ('
+            " SELECT place_id FROM place_changes WHERE seq > ? AND seq <= ?)"
+        )
+        rows = conn.execute(f'SELECT "Place ID" {where}', (since, upto))
+        stale = {r[0] for r in rows}
+        # Deleted places and records merged into another place drop out of
+        # the table here
+        removed = len(stale - set(prepped["Place ID"]))
+        conn.execute(f"DELETE {where}", (since, upto))
+        prepped.to_sql(PREPPED_TABLE, conn, if_exists="append", index=False)
+
+    conn.execute(
+        "INSERT OR REPLACE INTO prep_state (key, value) VALUES (?, ?)",
+        (WATERMARK_KEY, upto),
+    )
+    # Prep is the only consumer of the change feed
+    conn.execute("DELETE FROM place_changes WHERE seq <= ?", (upto,))
+    conn.commit()
+    return len(prepped) + removed, full
+
+
+class _CsvSink:
+    """Append row batches to a CSV file."""
+
+    def __init__(self, path: str, columns: list[str]) -> None:
+        self._f = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._f)
+        self._writer.writerow(columns)
+
+    def write(self, rows: list[tuple]) -> None:
+        self._writer.writerows(rows)
+
+    def close(self) -> None:
+        self._f.close()
+
+
+class _XlsxSink:
+    """Append row batches to a constant-memory XLSX workbook."""
+
+    def __init__(self, path: str, columns: list[str]) -> None:
+        self._wb = xlsxwriter.Workbook(
+            path, {"constant_memory": True, "nan_inf_to_errors": True}
+        )
+        self._ws = self._wb.add_worksheet()
+        header = self._wb.add_format({"bold": True, "border": 1})
+        self._ws.write_row(0, 0, columns, header)
+        self._row = 1
+
+    def write(self, rows: list[tuple]) -> None:
+        for row in rows:
+            self._ws.write_row(self._row, 0, row)
+            self._row += 1
+
+    def close(self) -> None:
+        self._wb.close()
+
+
+def _export_columns(conn: sqlite3.Connection) -> list[str]:
+    """Return the prepped columns written to the CSV/XLSX, in table order.
+
+    ``places`` columns without a CSV header (Yelp fields, timestamps, ...)
+    stay in the table for lead scoring but were never part of the exports.
+    """
+    places = {r[1] for r in conn.execute("PRAGMA table_info(places)")}
+    db_only = places - set(CSV_COLUMNS)
+    return [c for c in _table_columns(conn) if c not in db_only]
+
+
+def _restore_flags(rows: list[tuple], flags: list[int]) -> list[tuple]:
+    out = []
+    for row in rows:
+        values = list(row)
+        for i in flags:
+            if values[i] is not None:
+                values[i] = bool(values[i])
+        out.append(tuple(values))
+    return out
+
+
+def write_outputs(
+    conn: sqlite3.Connection, chunksize: int = EXPORT_CHUNKSIZE
+) -> int:
+    """Rewrite the CSV/XLSX exports from the ``prepped`` table.
+
+    Rows are streamed from SQLite in chunks and handed to both writers at
+    once, so memory stays flat regardless of table size. The next chunk is
+    fetched while the previous one is still being written.
+    """
     out_csv = "restaurants_prepped.csv"
     out_xlsx = "restaurants_prepped.xlsx"
     tmp_csv = "restaurants_prepped.tmp.csv"
     tmp_xlsx = "restaurants_prepped.tmp.xlsx"
 
-    df.to_csv(tmp_csv, index=False)
-    df.to_excel(tmp_xlsx, index=False, engine="xlsxwriter")
+    columns = _export_columns(conn)
+    select = ", ".join(f'"{c}"' for c in columns)
+    # Place ID order keeps the files stable between runs
+    cur = conn.execute(
+        f'SELECT {select} FROM {PREPPED_TABLE} ORDER BY "Place ID"'
+    )
+    flags = [i for i, c in enumerate(columns) if c in FLAG_COLUMNS]
+    sinks = [_CsvSink(tmp_csv, columns), _XlsxSink(tmp_xlsx, columns)]
+    total = 0
+    try:
+        with ThreadPoolExecutor(max_workers=len(sinks)) as pool:
+            pending: list = []
+            while True:
+                rows = cur.fetchmany(chunksize)
+                for fut in pending:
+                    fut.result()
+                if not rows:
+                    break
+                rows = _restore_flags(rows, flags)
+                pending = [pool.submit(s.write, rows) for s in sinks]
+                total += len(rows)
+    finally:
+        for sink in sinks:
+            sink.close()
 
     # Atomically replace the old files so a crash can't leave them half-written
     os.replace(tmp_csv, out_csv)
     os.replace(tmp_xlsx, out_xlsx)
+    return total
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Entry point for prepping places changed since the last run."""
+    parser = argparse.ArgumentParser(description="Prep restaurant data")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Reprocess every place and rebuild the prepped table",
+    )
+    parser.add_argument(
+        "--no-export",
+        action="store_true",
+        help="Only update the prepped table; skip the CSV/XLSX files",
+    )
+    parser.add_argument(
+        "--force-export",
+        action="store_true",
+        help="Rewrite the CSV/XLSX files even when nothing changed",
+    )
+    args = parser.parse_args(argv)
 
+    setup_logging()
+
+    conn = loader.ensure_db()
+    changed, rebuilt = update_prepped(conn, full=args.full)
     logging.info(
-        "Cleaned %s → %s & %s  (%s rows)",
-        newest,
-        out_csv,
-        out_xlsx,
-        len(df),
+        "Prepped %s %s rows", changed, "total" if rebuilt else "changed"
     )
 
+    if not args.no_export and (changed or args.force_export):
+        total = write_outputs(conn)
+        logging.info(
+            "Wrote restaurants_prepped.csv & restaurants_prepped.xlsx"
+            "  (%s rows)",
+            total,
+        )
+    conn.close()
+
 
 if __name__ == "__main__":  # pragma: no cover - manual execution
     main()
@@ -9,19 +9,105 @@ import pathlib
 import sqlite3
 from datetime import datetime
 
-import pandas as pd
-
-from restaurants.utils import setup_logging
-from restaurants import loader
-from restaurants.config import GOOGLE_API_KEY, load_zip_codes
+from restaurants.utils import lazy_import, setup_logging
+from restaurants import http_client, loader
+from restaurants import config
+from restaurants.config import load_zip_codes
 from restaurants.settings import FETCHERS
-from restaurants import google_yelp_enrich, owner_enrich_wa
+from restaurants import google_yelp_enrich, owner_enrich_wa, resolve
+from restaurants.enrich_dag import EnrichmentNode, run_nodes
 from restaurants.social_links import extract_social_links
 
+pd = lazy_import("pandas")
+
 # Aggregate store for fetched restaurant rows
 smb_restaurants_data: list[dict] = []
 
 
+def _social_links(row: dict) -> dict:
+    website = row.get("Website")
+    if not website or not isinstance(website, str):
+        return {}
+    return extract_social_links(website)
+
+
+async def _wa_state(frame, session, limit):
+    return await owner_enrich_wa.enrich_state(frame, session, limit)
+
+
+def _wa_state_local(frame, session, limit):
+    return owner_enrich_wa.enrich_state_local(frame)
+
+
+async def _wa_cities(frame, session, limit):
+    return await owner_enrich_wa.enrich_cities(frame, session, limit)
+
+
+def _owner_name(frame, session, limit):
+    frame["owner_name"] = frame["owner_name_state"].combine_first(
+        frame["owner_name_city"]
+    )
+    return frame
+
+
+def enrichment_nodes(
+    wa: bool = True, wa_offline: bool = False
+) -> list[EnrichmentNode]:
+    """Return the enrichment graph for one refresh run.
+
+    Register new enrichments here; the scheduler orders them by the columns
+    they read and write.
+    """
+    nodes = [
+        EnrichmentNode(
+            "social_links",
+            _social_links,
+            inputs=("Website",),
+            outputs=("facebook_url", "instagram_url"),
+            concurrency=8,
+            row_wise=True,
+        ),
+    ]
+    if wa and wa_offline:
+        nodes.append(
+            EnrichmentNode(
+                "wa_state_local",
+                _wa_state_local,
+                inputs=("Name",),
+                outputs=("ubi", "owner_name_state"),
+            )
+        )
+    elif wa:
+        nodes.append(
+            EnrichmentNode(
+                "wa_state",
+                _wa_state,
+                inputs=("Name",),
+                outputs=("ubi", "owner_name_state"),
+                concurrency=owner_enrich_wa.MAX_CONCURRENCY,
+            )
+        )
+        nodes.append(
+            EnrichmentNode(
+                "wa_cities",
+                _wa_cities,
+                inputs=("Name", "City"),
+                outputs=("owner_name_city",),
+                concurrency=owner_enrich_wa.MAX_CONCURRENCY,
+            )
+        )
+    if wa:
+        nodes.append(
+            EnrichmentNode(
+                "owner_name",
+                _owner_name,
+                inputs=("owner_name_state", "owner_name_city"),
+                outputs=("owner_name",),
+            )
+        )
+    return nodes
+
+
 def main(argv: list[str] | None = None) -> None:
     parser = argparse.ArgumentParser(description="Refresh restaurant data")
     parser.add_argument(
@@ -39,15 +125,31 @@ def main(argv: list[str] | None = None) -> None:
         action="store_true",
         help="Skip Yelp enrichment step",
     )
+    parser.add_argument(
+        "--yelp-sweep",
+        action="store_true",
+        help="Match Yelp data from one area sweep instead of per-place "
+        "searches",
+    )
+    parser.add_argument(
+        "--with-reviews",
+        action="store_true",
+        help="Also fetch Yelp reviews into the yelp_reviews table",
+    )
     parser.add_argument(
         "--no-wa",
         action="store_true",
         help="Skip Washington owner enrichment",
     )
+    parser.add_argument(
+        "--wa-offline",
+        action="store_true",
+        help="Resolve owners from the local WA registry mirror only",
+    )
     args = parser.parse_args(argv)
 
     setup_logging()
-    if not GOOGLE_API_KEY:
+    if not config.GOOGLE_API_KEY:
         logging.error("GOOGLE_API_KEY is required")
         raise SystemExit(1)
 
@@ -63,26 +165,23 @@ def main(argv: list[str] | None = None) -> None:
         fetcher = fetcher_cls()
         smb_restaurants_data.extend(fetcher.fetch(zip_list))
 
-    for row in smb_restaurants_data:
-        if row.get("Website"):
-            links = extract_social_links(row["Website"])
-            row.update(links)
-
     if not smb_restaurants_data:
         logging.info("No SMB restaurants found – nothing to write.")
         return
 
     df = pd.DataFrame(smb_restaurants_data)
-    for col in ["facebook_url", "instagram_url", "GPV Projection"]:
-        if col not in df.columns:
-            df[col] = None
-    if not args.no_wa:
-        df = asyncio.run(owner_enrich_wa.enrich_state(df))
-        df = asyncio.run(owner_enrich_wa.enrich_cities(df))
-        df["owner_name"] = df["owner_name_state"].combine_first(
-            df["owner_name_city"]
-        )
-        df.drop(columns=["owner_name_state", "owner_name_city"], inplace=True)
+    if "GPV Projection" not in df.columns:
+        df["GPV Projection"] = None
+    nodes = enrichment_nodes(wa=not args.no_wa, wa_offline=args.wa_offline)
+    df, _timings = asyncio.run(run_nodes(df, nodes))
+    df.drop(
+        columns=[
+            c
+            for c in ("owner_name_state", "owner_name_city")
+            if c in df.columns
+        ],
+        inplace=True,
+    )
     if args.strict_zips and "Zip Code" in df.columns:
         df = df[df["Zip Code"].astype(str).isin(zip_list)]
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -94,14 +193,22 @@ def main(argv: list[str] | None = None) -> None:
     loader.load(csv_path)
 
     if not args.no_yelp:
-        google_yelp_enrich.yelp_enrich_all()
+        if args.yelp_sweep:
+            google_yelp_enrich.yelp_sweep_enrich_all(
+                with_reviews=args.with_reviews
+            )
+        else:
+            google_yelp_enrich.yelp_enrich_all(with_reviews=args.with_reviews)
 
     conn = sqlite3.connect(loader.DB_PATH)
+    clusters, records = resolve.resolve_places(conn)
+    logging.info("Merged %s records into %s places", records, clusters)
     df_db = pd.read_sql_query("SELECT * FROM places", conn)
     final_csv = f"olympia_smb_google_restaurants_enriched_{timestamp}.csv"
     df_db.to_csv(final_csv, index=False)
     conn.close()
     logging.info("Saved enriched data to %s", final_csv)
+    http_client.STATS.log()
 
 
 if __name__ == "__main__":
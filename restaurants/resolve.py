@@ -0,0 +1,342 @@
+"""Resolve duplicate places across sources.
+
+Google Places, Yelp JSON imports and the other fetchers each insert their
+own row for the same restaurant. Resolution runs in three steps:
+
+1. Blocking: records sharing a small map cell, a phone number or a
+   distinctive name token become candidate pairs. Nothing else is
+   compared, so the work grows with the number of records rather than
+   with the number of pairs.
+2. Scoring: candidate names are compared with rapidfuzz in one batch and
+   combined with the distance between the records and phone agreement.
+3. Merging: matched pairs are grouped into clusters. The canonical record
+   of a cluster is the one from the highest-priority source, and its
+   missing fields are filled from the other records in priority order.
+
+Every record stores its cluster's canonical ``place_id`` in ``cluster_id``;
+prep only keeps canonical records.
+
+Usage:
+    python -m restaurants.resolve
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import math
+import re
+import sqlite3
+
+try:
+    from restaurants import loader
+    from restaurants.utils import (
+        EARTH_RADIUS_MILES,
+        haversine_miles_pairs,
+        lazy_import,
+        setup_logging,
+    )
+except ImportError:  # pragma: no cover - fallback for running as script
+    import loader  # type: ignore
+    from utils import (  # type: ignore
+        EARTH_RADIUS_MILES,
+        haversine_miles_pairs,
+        lazy_import,
+        setup_logging,
+    )
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+rapidfuzz = lazy_import("rapidfuzz")
+
+# Earlier sources win when fields are merged; unknown sources come last
+SOURCE_PRIORITY = ("google_places_smb", "yelp_fetch", "osm", "gov_csv")
+
+# Records with similar names at most this far apart are the same place
+MATCH_MILES = 0.1
+NAME_THRESHOLD = 85
+# A shared phone number only needs loosely similar names
+PHONE_NAME_THRESHOLD = 50
+# Phone and name-token blocks larger than this say little and are skipped
+MAX_BLOCK_SIZE = 100
+
+# Columns that always stay with their own record
+KEEP_COLUMNS = ("place_id", "source", "first_seen", "last_seen", "cluster_id")
+
+# Generic words that would otherwise block unrelated places together
+_STOPWORDS = frozenset(
+    {
+        "and",
+        "bar",
+        "cafe",
+        "co",
+        "grill",
+        "inc",
+        "kitchen",
+        "llc",
+        "of",
+        "restaurant",
+        "the",
+    }
+)
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Grid cell edge in degrees of latitude. Four grids shifted by half a cell
+# guarantee that points closer than half a cell share a cell in one of them.
+_CELL_DEG = math.degrees(2.5 * MATCH_MILES / EARTH_RADIUS_MILES)
+_SHIFTS = ((0.0, 0.0), (0.5, 0.0), (0.0, 0.5), (0.5, 0.5))
+_PHONE_BLOCK = len(_SHIFTS)
+_TOKEN_BLOCK = _PHONE_BLOCK + 1
+
+
+def _text(df: pd.DataFrame, name: str) -> pd.Series:
+    if name not in df.columns:
+        return pd.Series("", index=df.index, dtype=object)
+    return df[name].fillna("").astype(str)
+
+
+def _coords(df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    return (
+        pd.to_numeric(df["lat"], errors="coerce").to_numpy(dtype=float),
+        pd.to_numeric(df["lon"], errors="coerce").to_numpy(dtype=float),
+    )
+
+
+def source_rank(sources: pd.Series) -> np.ndarray:
+    """Return each source's position in ``SOURCE_PRIORITY``."""
+    ranks = {s: i for i, s in enumerate(SOURCE_PRIORITY)}
+    return sources.map(ranks).fillna(len(SOURCE_PRIORITY)).to_numpy(int)
+
+
+def phone_keys(df: pd.DataFrame) -> pd.Series:
+    """Return the last ten digits of each record's phone, or ``""``."""
+    phone = _text(df, "local_phone").where(
+        _text(df, "local_phone").ne(""), _text(df, "intl_phone")
+    )
+    digits = phone.str.replace(r"\D", "", regex=True).str[-10:]
+    return digits.where(digits.str.len().eq(10), "")
+
+
+def _token_keys(names: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """Return ``(row, token code)`` for every distinctive name token.
+
+    Each distinct name is tokenized once.
+    """
+    codes, uniques = pd.factorize(names.fillna("").astype(str))
+    tokens = [
+        [
+            t
+            for t in dict.fromkeys(_TOKEN_RE.findall(name.lower()))
+            if len(t) > 1 and t not in _STOPWORDS
+        ]
+        for name in np.asarray(uniques, dtype=object).tolist()
+    ]
+    lengths = np.fromiter(map(len, tokens), dtype=np.int64, count=len(tokens))
+    flat, _ = pd.factorize(
+        pd.Series([t for toks in tokens for t in toks], dtype=object)
+    )
+    # Expand each row to its name's slice of ``flat``
+    counts = lengths[codes]
+    starts = (np.cumsum(lengths) - lengths)[codes]
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    rows = np.repeat(np.arange(len(codes)), counts)
+    return rows, flat[offsets + np.arange(counts.sum())]
+
+
+def _block_keys(df: pd.DataFrame) -> pd.DataFrame:
+    """Return one ``(rec, kind, a, b)`` row per record and blocking key."""
+    frames = []
+    lat, lon = _coords(df)
+    rec = np.flatnonzero(~np.isnan(lat) & ~np.isnan(lon))
+    y = lat[rec] / _CELL_DEG
+    # Scale longitude so cells are roughly square on the ground
+    x = lon[rec] * np.cos(np.radians(lat[rec])) / _CELL_DEG
+    for kind, (dy, dx) in enumerate(_SHIFTS):
+        frames.append(
+            pd.DataFrame(
+                {
+                    "rec": rec,
+                    "kind": kind,
+                    "a": np.floor(y + dy).astype(np.int64),
+                    "b": np.floor(x + dx).astype(np.int64),
+                }
+            )
+        )
+
+    phones = phone_keys(df).to_numpy()
+    rec = np.flatnonzero(phones != "")
+    codes, _ = pd.factorize(phones[rec])
+    frames.append(
+        pd.DataFrame({"rec": rec, "kind": _PHONE_BLOCK, "a": codes, "b": 0})
+    )
+
+    rec, codes = _token_keys(_text(df, "name"))
+    frames.append(
+        pd.DataFrame({"rec": rec, "kind": _TOKEN_BLOCK, "a": codes, "b": 0})
+    )
+    return pd.concat(frames, ignore_index=True)
+
+
+def candidate_pairs(df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    """Return row positions ``(i, j)``, ``i < j``, of records sharing a
+    block. Oversized phone and token blocks are dropped."""
+    keys = _block_keys(df)
+    size = keys.groupby(["kind", "a", "b"])["rec"].transform("size")
+    oversized = (keys["kind"] >= _PHONE_BLOCK) & (size > MAX_BLOCK_SIZE)
+    keys = keys[(size > 1) & ~oversized]
+    pairs = keys.merge(keys, on=["kind", "a", "b"], suffixes=("_i", "_j"))
+    pairs = pairs.loc[pairs["rec_i"] < pairs["rec_j"], ["rec_i", "rec_j"]]
+    pairs = pairs.drop_duplicates()
+    return pairs["rec_i"].to_numpy(), pairs["rec_j"].to_numpy()
+
+
+def match_pairs(
+    df: pd.DataFrame, i: np.ndarray, j: np.ndarray
+) -> np.ndarray:
+    """Return which candidate pairs refer to the same place.
+
+    Names must score ``NAME_THRESHOLD`` within ``MATCH_MILES``, or
+    ``PHONE_NAME_THRESHOLD`` when the phone numbers agree. Records from the
+    same source are never merged, since each source is deduplicated
+    already.
+    """
+    sources = _text(df, "source").to_numpy()
+    phones = phone_keys(df).to_numpy()
+    lat, lon = _coords(df)
+    dist = haversine_miles_pairs(lat[i], lon[i], lat[j], lon[j])
+    same_phone = (phones[i] == phones[j]) & (phones[i] != "")
+    same_source = (sources[i] == sources[j]) & (sources[i] != "")
+    # NaN distances compare False, so records without coords need a phone
+    near = dist <= MATCH_MILES
+    # Only score names where a match is still possible
+    todo = np.flatnonzero(~same_source & (near | same_phone))
+    names = _text(df, "name").to_numpy()
+    score = np.zeros(len(i), dtype=np.uint8)
+    if len(todo):
+        score[todo] = rapidfuzz.process.cpdist(
+            names[i[todo]],
+            names[j[todo]],
+            scorer=rapidfuzz.fuzz.token_set_ratio,
+            processor=rapidfuzz.utils.default_process,
+            dtype=np.uint8,
+            workers=-1,
+        )
+    same = near & (score >= NAME_THRESHOLD)
+    same |= same_phone & (score >= PHONE_NAME_THRESHOLD)
+    same[same_source] = False
+    return same
+
+
+def _components(n: int, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+    """Label connected components by propagating the smallest row index."""
+    labels = np.arange(n)
+    while True:
+        prev = labels
+        low = np.minimum(labels[i], labels[j])
+        labels = labels.copy()
+        np.minimum.at(labels, i, low)
+        np.minimum.at(labels, j, low)
+        labels = labels[labels]
+        if np.array_equal(labels, prev):
+            return labels
+
+
+def cluster_ids(df: pd.DataFrame) -> pd.Series:
+    """Return the canonical ``place_id`` of every record's cluster."""
+    if df.empty:
+        return pd.Series(dtype=object, name="cluster_id")
+    i, j = candidate_pairs(df)
+    same = match_pairs(df, i, j)
+    labels = _components(len(df), i[same], j[same])
+    # Best source first; ties keep row order
+    order = np.lexsort((source_rank(_text(df, "source")), labels))
+    head = np.ones(len(order), dtype=bool)
+    head[1:] = labels[order][1:] != labels[order][:-1]
+    canonical = np.empty(len(df), dtype=np.int64)
+    canonical[labels[order[head]]] = order[head]
+    ids = df["place_id"].to_numpy()[canonical[labels]]
+    return pd.Series(ids, index=df.index, name="cluster_id")
+
+
+def merge_clusters(df: pd.DataFrame, clusters: pd.Series) -> pd.DataFrame:
+    """Return one row per cluster with fields taken by source priority.
+
+    Each column holds the first non-empty value from the cluster's records
+    ordered by source. ``records`` counts the records and ``sources`` lists
+    their sources.
+    """
+    data = df.drop(columns=["cluster_id"], errors="ignore")
+    data = data.replace("", np.nan).assign(
+        cluster_id=clusters.to_numpy(),
+        _rank=source_rank(_text(df, "source")),
+    )
+    data = data.sort_values(["cluster_id", "_rank"], kind="stable")
+    groups = data.groupby("cluster_id", sort=False)
+    merged = groups.first().drop(columns="_rank")
+    merged["records"] = groups.size()
+    merged["sources"] = merged["source"]
+    multi = merged.index[merged["records"] > 1]
+    if len(multi):
+        sources = data.loc[data["cluster_id"].isin(multi)]
+        sources = sources.drop_duplicates(["cluster_id", "source"])
+        joined = (
+            sources.dropna(subset=["source"])
+            .groupby("cluster_id")["source"]
+            .agg(",".join)
+        )
+        merged.loc[joined.index, "sources"] = joined
+    return merged.reset_index()
+
+
+def resolve_places(conn: sqlite3.Connection) -> tuple[int, int]:
+    """Cluster ``places`` and fill canonical records from their duplicates.
+
+    Only rows whose cluster or fields change are written, so the prep
+    change feed sees just those. Returns the number of multi-record
+    clusters and of records merged into them.
+    """
+    df = pd.read_sql_query("SELECT * FROM places", conn)
+    if df.empty:
+        return 0, 0
+    clusters = cluster_ids(df)
+    moved = df["cluster_id"].fillna("").ne(clusters)
+    conn.executemany(
+        "UPDATE places SET cluster_id=? WHERE place_id=?",
+        zip(clusters[moved].tolist(), df.loc[moved, "place_id"].tolist()),
+    )
+
+    merged = merge_clusters(df, clusters)
+    merged = merged[merged["records"] > 1].set_index("cluster_id")
+    canonical = df.set_index("place_id").loc[merged.index]
+    columns = [c for c in merged.columns if c in canonical.columns]
+    for col in columns:
+        if col in KEEP_COLUMNS:
+            continue
+        current = canonical[col].replace("", np.nan)
+        fill = current.isna() & merged[col].notna()
+        if fill.any():
+            conn.executemany(
+                f"UPDATE places SET {col}=? WHERE place_id=?",
+                zip(merged.loc[fill, col].tolist(), merged.index[fill]),
+            )
+    conn.commit()
+    return len(merged), int(merged["records"].sum())
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Merge duplicate places across sources"
+    )
+    parser.parse_args(argv)
+
+    setup_logging()
+    conn = loader.ensure_db()
+    try:
+        clusters, records = resolve_places(conn)
+    finally:
+        conn.close()
+    logging.info("Merged %s records into %s places", records, clusters)
+
+
+if __name__ == "__main__":  # pragma: no cover - manual execution
+    main()
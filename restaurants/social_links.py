@@ -1,15 +1,34 @@
-from typing import Optional
+from __future__ import annotations
 
-import requests
-from bs4 import BeautifulSoup
+import functools
+from typing import TYPE_CHECKING, Optional
+
+from restaurants import http_client
+
+if TYPE_CHECKING:
+    import requests
+
+# Matches the concurrency of the ``social_links`` enrichment node
+WORKERS = 8
+
+
+@functools.cache
+def _session() -> requests.Session:
+    # Shared by the enrichment worker threads; websites rarely repeat, but
+    # the pool still saves handshakes on redirects and shared hosts
+    return http_client.session(workers=WORKERS, retries=1)
 
 
 def extract_social_links(url: str) -> dict[str, Optional[str]]:
+    # Imported here, not lazily, because the first use is on a worker thread
+    import bs4
+    import requests
+
     try:
-        resp = requests.get(url, timeout=10)
+        resp = _session().get(url, timeout=10)
     except requests.RequestException:
         return {}
-    soup = BeautifulSoup(resp.text, "html.parser")
+    soup = bs4.BeautifulSoup(resp.text, "html.parser")
     links = {a["href"] for a in soup.find_all("a", href=True)}
     fb = next((h for h in links if "facebook.com" in h), None)
     ig = next((h for h in links if "instagram.com" in h), None)
@@ -1,52 +1,128 @@
 """Fetch restaurant leads from Google Places for the Toast POS team.
 
 ZIP codes are read from ``toast_zips.txt`` and new results are written to
-``olympia_toast_smb_<timestamp>.csv``.
+``olympia_toast_smb_<timestamp>.csv``. Several ZIP codes are searched at once
+and Details requests run on one long-lived pool while the next page token
+waits. Place IDs already turned into leads are kept in ``toast_leads.sqlite``
+with the ZIP they were found in. Leads and their IDs are flushed in small
+batches, so an interrupted run keeps what it found. Finally each lead's
+website is checked for its POS or ordering vendor (``pos_vendor`` column).
 """
 
+from __future__ import annotations
+
 import json
 import csv
+import heapq
+import itertools
 import time
 import logging
+import sqlite3
+from collections import deque
 from datetime import datetime, timezone
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
 from pathlib import Path
-
-import requests
-from tqdm.auto import tqdm
+from typing import TYPE_CHECKING, Any, Callable
 
 # ---------------------------------------------------------------------------
 # 0.  Setup
 # ---------------------------------------------------------------------------
 try:
-    from restaurants.config import GOOGLE_API_KEY
+    from restaurants import config
     from restaurants.chain_blocklist import CHAIN_BLOCKLIST  # names to skip
-    from restaurants.network_utils import check_network  # simple ping check
+    from restaurants import pos_vendor
+    from restaurants.http_client import session as http_session
+    from restaurants.network_utils import network_available
     from restaurants.utils import setup_logging, is_valid_zip
 except ImportError:  # pragma: no cover - fallback when running as script
-    from config import GOOGLE_API_KEY  # type: ignore
+    import config  # type: ignore
 
     try:
         from chain_blocklist import CHAIN_BLOCKLIST  # type: ignore
     except ImportError:
         CHAIN_BLOCKLIST = []
     try:
-        from network_utils import check_network  # type: ignore
+        from http_client import session as http_session  # type: ignore
+        from network_utils import network_available  # type: ignore
     except ImportError:
 
-        def check_network() -> bool:  # type: ignore[misc]
+        def network_available() -> bool:  # type: ignore[misc]
             return True
 
+        def http_session(  # type: ignore[misc]
+            workers: int = 10, trust_env: bool = True
+        ) -> requests.Session:
+            import requests
+
+            sess = requests.Session()
+            sess.trust_env = trust_env
+            return sess
+
+    try:
+        import pos_vendor  # type: ignore
+    except ImportError:
+        pos_vendor = None  # type: ignore
     from utils import setup_logging, is_valid_zip  # type: ignore
 
+if TYPE_CHECKING:
+    import requests
+
 SEARCH_URL = "https://maps.googleapis.com/maps/api/place/textsearch/json"
 DETAILS_URL = "https://maps.googleapis.com/maps/api/place/details/json"
+# Threads fetching place details
+DETAIL_WORKERS = 8
+# ZIP codes searched at once
+ZIP_WORKERS = 4
+# Google rejects a next_page_token used sooner than about 2 s
+PAGE_TOKEN_DELAY = 2.0
+# A token used too early gets INVALID_REQUEST; ask again this many times,
+# doubling the wait each time
+PAGE_TOKEN_RETRIES = 3
+
+SEEN_DB = "toast_leads.sqlite"
+# Pre-SQLite seen-ID list, imported once into an empty store
+SEEN_JSON = "seen_place_ids.json"
+# Leads written to the CSV (and IDs committed) at a time
+FLUSH_EVERY = 20
+
+FIELDNAMES = (
+    "Business Name",
+    "Formatted Address",
+    "Place ID",
+    "Formatted Phone Number",
+    "International Phone Number",
+    "Website",
+    "Rating",
+    "User Ratings Total",
+    "Business Status",
+    "Price Level",
+    "lat",
+    "lon",
+    "last_seen",
+    "pos_vendor",
+)
+
+SEEN_SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen_places (
+    place_id TEXT PRIMARY KEY,
+    zip_code TEXT,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_seen_places_zip ON seen_places(zip_code);
+"""
 
 
 # ---------------------------------------------------------------------------
 # 1.  Helpers
 # ---------------------------------------------------------------------------
-def load_seen_ids(path: str = "seen_place_ids.json") -> set[str]:
+def load_seen_ids(path: str = SEEN_JSON) -> set[str]:
+    """Return the IDs in a legacy ``seen_place_ids.json``."""
     try:
         with open(path, "r", encoding="utf-8") as f:
             return set(json.load(f))
@@ -54,16 +130,160 @@ def load_seen_ids(path: str = "seen_place_ids.json") -> set[str]:
         return set()
 
 
-def save_seen_ids(ids: set[str], path: str = "seen_place_ids.json") -> None:
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(sorted(ids), f, indent=2)
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class SeenStore:
+    """Place IDs already turned into leads, in an indexed SQLite table.
+
+    Each ID records the ZIP it was first found in and when it was first and
+    last seen. Lookups go to the table, so memory doesn't grow with the
+    history. New IDs are buffered until ``flush``.
+    """
+
+    def __init__(self, path: str = SEEN_DB, legacy: str = SEEN_JSON):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SEEN_SCHEMA)
+        self._pending: dict[str, str | None] = {}
+        self._touched: set[str] = set()
+        self._import_legacy(legacy)
+
+    def _import_legacy(self, path: str) -> None:
+        if self.conn.execute("SELECT 1 FROM seen_places LIMIT 1").fetchone():
+            return
+        ids = load_seen_ids(path)
+        if not ids:
+            return
+        now = _now()
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO seen_places VALUES (?, NULL, ?, ?)",
+            [(pid, now, now) for pid in ids],
+        )
+        self.conn.commit()
+        logging.info("Imported %s seen place IDs from %s", len(ids), path)
+
+    def __len__(self) -> int:
+        (count,) = self.conn.execute(
+            "SELECT COUNT(*) FROM seen_places"
+        ).fetchone()
+        return count + len(self._pending)
+
+    def unseen(self, place_ids: list[str]) -> list[str]:
+        """Return the IDs in ``place_ids`` not seen before, in order.
+
+        Known IDs get their ``last_seen`` refreshed on the next flush.
+        """
+        ids = [p for p in dict.fromkeys(place_ids) if p not in self._pending]
+        if not ids:
+            return []
+        marks = ", ".join("?" * len(ids))
+        rows = self.conn.execute(
+            f"SELECT place_id FROM seen_places WHERE place_id IN ({marks})",
+            ids,
+        )
+        known = {row[0] for row in rows}
+        self._touched |= known
+        return [p for p in ids if p not in known]
+
+    def add(self, place_id: str, zip_code: str | None = None) -> None:
+        self._pending[place_id] = zip_code
+
+    def flush(self) -> None:
+        now = _now()
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO seen_places VALUES (?, ?, ?, ?)",
+            [(pid, z, now, now) for pid, z in self._pending.items()],
+        )
+        self.conn.executemany(
+            "UPDATE seen_places SET last_seen=? WHERE place_id=?",
+            [(now, pid) for pid in self._touched],
+        )
+        self.conn.commit()
+        self._pending.clear()
+        self._touched.clear()
+
+    def close(self) -> None:
+        self.flush()
+        self.conn.close()
+
+    def __enter__(self) -> "SeenStore":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+class LeadWriter:
+    """Append leads to a CSV in batches, committing their IDs afterwards.
+
+    The file is created on the first flush. Rows reach the disk before
+    their IDs are committed, so a crash can repeat a lead but never lose
+    one.
+    """
+
+    def __init__(self, path: str, store: SeenStore) -> None:
+        self.path = path
+        self.store = store
+        self.count = 0
+        self._rows: list[dict] = []
+        self._file = None
+        self._writer = None
+
+    def add(self, row: dict, zip_code: str) -> None:
+        self._rows.append(row)
+        self.store.add(row["Place ID"], zip_code)
+        if len(self._rows) >= FLUSH_EVERY:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._rows:
+            if self._file is None:
+                self._file = open(
+                    self.path, "w", newline="", encoding="utf-8"
+                )
+                self._writer = csv.DictWriter(self._file, FIELDNAMES)
+                self._writer.writeheader()
+            self._writer.writerows(self._rows)
+            self._file.flush()
+            self.count += len(self._rows)
+            self._rows.clear()
+        self.store.flush()
+
+    def close(self) -> None:
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+
+
+def lead_row(place_id: str, details: dict) -> dict:
+    """Return the CSV row for ``details`` of ``place_id``."""
+    location = details.get("geometry", {}).get("location", {})
+    return {
+        "Business Name": details.get("name"),
+        "Formatted Address": details.get("formatted_address"),
+        "Place ID": place_id,
+        "Formatted Phone Number": details.get("formatted_phone_number"),
+        "International Phone Number": details.get(
+            "international_phone_number"
+        ),
+        "Website": details.get("website"),
+        "Rating": details.get("rating"),
+        "User Ratings Total": details.get("user_ratings_total"),
+        "Business Status": details.get("business_status"),
+        "Price Level": details.get("price_level"),
+        "lat": location.get("lat"),
+        "lon": location.get("lng"),
+        "last_seen": _now(),
+        "pos_vendor": None,
+    }
 
 
 def fetch_details(place_id: str, session: requests.Session) -> dict:
     # Concurrent workers share ``session`` and only issue GET requests,
     # so it is safe to reuse the same session across threads.
     params = {
-        "key": GOOGLE_API_KEY,
+        "key": config.GOOGLE_API_KEY,
         "place_id": place_id,
         "fields": (
             "name,formatted_address,formatted_phone_number,"
@@ -104,135 +324,273 @@ def load_zip_codes(path: str = ZIP_FILE) -> list[str]:
         return []
 
 
+def search_page(params: dict, session: requests.Session) -> dict:
+    """Return one Text Search results page."""
+    # (connect timeout, read timeout)
+    resp = session.get(SEARCH_URL, params=params, timeout=(5, 10))
+    resp.raise_for_status()
+    return resp.json()
+
+
+def _timed(func: Callable[..., Any], *args: Any) -> tuple[Any, float]:
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+class ZipRun:
+    """Progress and latency figures for one ZIP code."""
+
+    def __init__(self, zip_code: str) -> None:
+        self.zip_code = zip_code
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self.pages = 0
+        self.results = 0
+        self.leads = 0
+        self.searching = True
+        self.outstanding = 0  # Details requests in flight
+        self.token_retries = 0  # for the current next_page_token
+        self.search_seconds = 0.0
+        self.details = 0
+        self.detail_seconds = 0.0
+
+    @property
+    def done(self) -> bool:
+        return not self.searching and not self.outstanding
+
+    def summary(self) -> str:
+        rate = self.leads / self.elapsed if self.elapsed else 0.0
+        search_ms = 1000 * self.search_seconds / max(self.pages, 1)
+        detail_ms = 1000 * self.detail_seconds / max(self.details, 1)
+        return (
+            f"{self.zip_code}: {self.leads} new leads from {self.results}"
+            f" results on {self.pages} pages in {self.elapsed:.1f}s"
+            f" ({rate:.1f} leads/s; search {search_ms:.0f} ms,"
+            f" details {detail_ms:.0f} ms avg)"
+        )
+
+
+class LeadPipeline:
+    """Fetch new leads for many ZIP codes with overlapping requests.
+
+    Up to ``ZIP_WORKERS`` ZIP codes are searched at once. As soon as a page
+    arrives its unseen places are queued on a long-lived Details pool. The
+    next page is then requested after ``PAGE_TOKEN_DELAY`` without waiting
+    for those Details calls, and other ZIP codes keep going in the meantime.
+    A token that isn't valid yet is retried with a growing delay. Only the
+    calling thread touches ``store`` and ``writer``.
+    """
+
+    def __init__(
+        self,
+        session: requests.Session,
+        store: SeenStore,
+        writer: LeadWriter,
+        on_done: Callable[[ZipRun], None] | None = None,
+    ) -> None:
+        self.session = session
+        self.store = store
+        self.writer = writer
+        self.on_done = on_done
+        self._searches: dict[Future, tuple[ZipRun, dict]] = {}
+        self._details: dict[Future, tuple[ZipRun, str]] = {}
+        self._delayed: list[tuple[float, int, ZipRun, dict]] = []
+        self._order = itertools.count()
+        self._in_flight: set[str] = set()
+
+    def run(self, zip_codes: list[str]) -> list[ZipRun]:
+        queue = deque(zip_codes)
+        runs: list[ZipRun] = []
+        active = 0
+        with ThreadPoolExecutor(ZIP_WORKERS) as searches, ThreadPoolExecutor(
+            DETAIL_WORKERS
+        ) as details:
+            self._search_pool, self._detail_pool = searches, details
+            while queue or self._searches or self._details or self._delayed:
+                while queue and active < ZIP_WORKERS:
+                    run = ZipRun(queue.popleft())
+                    runs.append(run)
+                    active += 1
+                    self._search(
+                        run,
+                        {
+                            "key": config.GOOGLE_API_KEY,
+                            "query": f"restaurants in {run.zip_code} WA",
+                        },
+                    )
+                for run in self._step():
+                    run.elapsed = time.perf_counter() - run.started
+                    active -= 1
+                    if self.on_done:
+                        self.on_done(run)
+        return runs
+
+    def _search(self, run: ZipRun, params: dict) -> None:
+        fut = self._search_pool.submit(
+            _timed, search_page, params, self.session
+        )
+        self._searches[fut] = (run, params)
+
+    def _search_later(self, run: ZipRun, params: dict, delay: float) -> None:
+        ready = time.monotonic() + delay
+        heapq.heappush(self._delayed, (ready, next(self._order), run, params))
+
+    def _step(self) -> list[ZipRun]:
+        """Wait for the next event and return the ZIP runs it finished."""
+        now = time.monotonic()
+        while self._delayed and self._delayed[0][0] <= now:
+            _, _, run, params = heapq.heappop(self._delayed)
+            self._search(run, params)
+        timeout = self._delayed[0][0] - now if self._delayed else None
+        if not self._searches and not self._details:
+            time.sleep(timeout or 0)
+            return []
+        done, _ = wait(
+            [*self._searches, *self._details],
+            timeout=timeout,
+            return_when=FIRST_COMPLETED,
+        )
+        finished = []
+        for fut in done:
+            if fut in self._searches:
+                run, params = self._searches.pop(fut)
+                self._page_done(run, params, fut)
+            else:
+                run, pid = self._details.pop(fut)
+                self._detail_done(run, pid, fut)
+            if run.done:
+                finished.append(run)
+        return finished
+
+    def _page_done(self, run: ZipRun, params: dict, fut: Future) -> None:
+        import requests
+
+        try:
+            data, seconds = fut.result()
+        except (requests.Timeout, requests.ConnectionError) as exc:
+            logging.error("Search timeout for %s: %s", run.zip_code, exc)
+            run.searching = False
+            return
+        except Exception as exc:
+            logging.error("Search failed for %s: %s", run.zip_code, exc)
+            run.searching = False
+            return
+        if "pagetoken" in params and data.get("status") == "INVALID_REQUEST":
+            # Google answers this, with no results, while the token is
+            # still being activated
+            if run.token_retries < PAGE_TOKEN_RETRIES:
+                run.token_retries += 1
+                delay = PAGE_TOKEN_DELAY * 2**run.token_retries
+                self._search_later(run, params, delay)
+            else:
+                logging.error(
+                    "Page token for %s never became valid", run.zip_code
+                )
+                run.searching = False
+            return
+        run.token_retries = 0
+        run.pages += 1
+        run.search_seconds += seconds
+        results = data.get("results", [])
+        run.results += len(results)
+        logging.info(
+            "%s page %s -> %s results / %s",
+            run.zip_code,
+            run.pages,
+            len(results),
+            data.get("status"),
+        )
+
+        pids = []
+        for result in results:
+            name = result.get("name", "")
+            if any(block in name.lower() for block in CHAIN_BLOCKLIST):
+                continue
+            if result.get("place_id"):
+                pids.append(result["place_id"])
+        # Neighbouring ZIPs overlap, so skip IDs another ZIP is fetching
+        for pid in self.store.unseen(pids):
+            if pid in self._in_flight:
+                continue
+            self._in_flight.add(pid)
+            fut = self._detail_pool.submit(
+                _timed, fetch_details, pid, self.session
+            )
+            self._details[fut] = (run, pid)
+            run.outstanding += 1
+
+        next_tok = data.get("next_page_token")
+        if next_tok:
+            params = {"key": config.GOOGLE_API_KEY, "pagetoken": next_tok}
+            self._search_later(run, params, PAGE_TOKEN_DELAY)
+        else:
+            run.searching = False
+
+    def _detail_done(self, run: ZipRun, pid: str, fut: Future) -> None:
+        details, seconds = fut.result()
+        self._in_flight.discard(pid)
+        run.outstanding -= 1
+        run.details += 1
+        run.detail_seconds += seconds
+        if details:
+            self.writer.add(lead_row(pid, details), run.zip_code)
+            run.leads += 1
+
+
 def main() -> None:
+    from tqdm.auto import tqdm  # slow to import; only needed here
+
     setup_logging()
     zip_list = load_zip_codes()
     if not zip_list:
         print(f"No ZIP codes found in {ZIP_FILE}.")
         return
 
-    if not check_network():
+    if not network_available():
         print("[WARN] Skipping Toast leads fetch – network unreachable.")
         return
 
-    seen_ids = load_seen_ids()
-    new_rows: list[dict] = []
-
-    with requests.Session() as session:
-        session.trust_env = False  # ignore any HTTP(S)_PROXY env vars
-
-        for zip_code in tqdm(zip_list, desc="ZIP codes"):
-            zip_start_count = len(new_rows)
-            params = {
-                "key": GOOGLE_API_KEY,
-                "query": f"restaurants in {zip_code} WA",
-            }
-            page = 1
-            while True:
-                print(f"→ {zip_code} page {page} requesting", flush=True)
-                try:
-                    # (connect timeout, read timeout)
-                    resp = session.get(
-                        SEARCH_URL,
-                        params=params,
-                        timeout=(5, 10),
-                    )
-                    resp.raise_for_status()
-                    data = resp.json()
-                    print(
-                        f"{zip_code} page {page} -> {resp.status_code} / "
-                        f"{data.get('status')}",
-                        flush=True,
-                    )
-                except (requests.Timeout, requests.ConnectionError) as exc:
-                    logging.error("Search timeout for %s: %s", zip_code, exc)
-                    print(f"⚠️  {zip_code} timed out, skipping", flush=True)
-                    break
-                except Exception as exc:
-                    logging.error("Search failed for %s: %s", zip_code, exc)
-                    break
-
-                # ---------- process this page ----------
-                futures: dict = {}
-                with ThreadPoolExecutor(max_workers=8) as pool:
-                    for result in data.get("results", []):
-                        name = result.get("name", "")
-                        if any(
-                            block in name.lower() for block in CHAIN_BLOCKLIST
-                        ):
-                            continue
-                        pid = result.get("place_id")
-                        if not pid or pid in seen_ids:
-                            continue
-                        futures[pool.submit(fetch_details, pid, session)] = pid
-
-                    for fut in as_completed(futures):
-                        pid = futures[fut]
-                        details = fut.result()
-                        if not details:
-                            continue
-                        seen_ids.add(pid)
-                        new_rows.append(
-                            {
-                                "Business Name": details.get("name"),
-                                "Formatted Address": details.get(
-                                    "formatted_address"
-                                ),
-                                "Place ID": pid,
-                                "Formatted Phone Number": details.get(
-                                    "formatted_phone_number"
-                                ),
-                                "International Phone Number": details.get(
-                                    "international_phone_number"
-                                ),
-                                "Website": details.get("website"),
-                                "Rating": details.get("rating"),
-                                "User Ratings Total": details.get(
-                                    "user_ratings_total"
-                                ),
-                                "Business Status": details.get(
-                                    "business_status"
-                                ),
-                                "Price Level": details.get("price_level"),
-                                "lat": details.get("geometry", {})
-                                .get("location", {})
-                                .get("lat"),
-                                "lon": details.get("geometry", {})
-                                .get("location", {})
-                                .get("lng"),
-                                "last_seen": datetime.now(
-                                    timezone.utc
-                                ).isoformat(),
-                            }
-                        )
-
-                # ---------- pagination ----------
-                next_tok = data.get("next_page_token")
-                if not next_tok:
-                    break
-                time.sleep(2)  # Google recommends ~2 s wait
-                params = {"key": GOOGLE_API_KEY, "pagetoken": next_tok}
-                page += 1
-
-            zip_leads = len(new_rows) - zip_start_count
-            print(f"{zip_code}: {zip_leads} new leads", flush=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    out_csv = f"olympia_toast_smb_{timestamp}.csv"
+
+    progress = tqdm(total=len(zip_list), desc="ZIP codes")
+
+    def zip_done(run: ZipRun) -> None:
+        progress.update()
+        progress.write(run.summary())
+
+    start = time.perf_counter()
+    # Ignore any HTTP(S)_PROXY env vars
+    with SeenStore(SEEN_DB, SEEN_JSON) as store, http_session(
+        workers=DETAIL_WORKERS + ZIP_WORKERS, trust_env=False
+    ) as session:
+        writer = LeadWriter(out_csv, store)
+        try:
+            runs = LeadPipeline(session, store, writer, zip_done).run(zip_list)
+        finally:
+            writer.close()
+            progress.close()
+    elapsed = time.perf_counter() - start
+    logging.info(
+        "%s ZIP codes, %s pages, %s Details calls in %.1fs",
+        len(runs),
+        sum(r.pages for r in runs),
+        sum(r.details for r in runs),
+        elapsed,
+    )
 
     # -----------------------------------------------------------------------
-    # 3.  Write results
+    # 3.  Qualify and report
     # -----------------------------------------------------------------------
-    if not new_rows:
+    if not writer.count:
         print("No new leads found.")
         return
-
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    out_csv = f"olympia_toast_smb_{timestamp}.csv"
-    with open(out_csv, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=list(new_rows[0].keys()))
-        writer.writeheader()
-        writer.writerows(new_rows)
-
-    save_seen_ids(seen_ids)
-    print(f"✅ Saved {len(new_rows)} leads to {out_csv}")
+    if pos_vendor is not None:
+        vendors = pos_vendor.qualify_csv(out_csv)
+        found = ", ".join(f"{v} {n}" for v, n in vendors.most_common())
+        print(f"POS vendors: {found or 'none detected'}")
+    print(f"✅ Saved {writer.count} leads to {out_csv}")
 
 
 # ---------------------------------------------------------------------------
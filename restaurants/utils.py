@@ -1,18 +1,57 @@
+from __future__ import annotations
+
+import importlib.util
 import re
 import math
 import os
 import sys
 import logging
-import numpy as np
-import pandas as pd
+import types
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """Return module ``name`` but run its code only on first attribute use.
+
+    Heavy dependencies are bound this way so ``--help`` and the GUI start
+    without loading pandas, NumPy or the HTTP clients. The lazy module is
+    registered in ``sys.modules`` and ``LazyLoader`` isn't thread-safe
+    before Python 3.12, so only bind modules first used on the main thread.
+    Code that first touches a module from worker threads (``requests`` and
+    ``bs4`` in the fetchers) imports it inside the function instead.
+    """
+
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None or spec.loader is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
 
-THIN_SPACE_CHARS = (
-    "\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a"
-)
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# Hours helpers live in ``restaurants.hours``; re-exported for old callers
+try:
+    from restaurants.hours import THIN_SPACE_CHARS, normalize_hours  # noqa
+except ImportError:  # pragma: no cover - fallback for running as script
+    from hours import THIN_SPACE_CHARS, normalize_hours  # type: ignore  # noqa
 
 # Basic US ZIP or ZIP+4 format
 ZIP_RE = re.compile(r"^\d{5}(?:-\d{4})?$")
 
+# Rows per block when computing pairwise distance matrices
+MATRIX_CHUNK_ROWS = 65_536
+
+# Edge length of a GridIndex cell
+GRID_CELL_MILES = 1.0
+EARTH_RADIUS_MILES = 3958.8
+
 
 def is_valid_zip(zip_code: str) -> bool:
     """Return True if ``zip_code`` is a valid 5-digit or ZIP+4 code."""
@@ -72,33 +111,216 @@ def haversine_miles_series(
     return series
 
 
-def normalize_hours(hours_dict: dict) -> dict:
-    """Return a clean hours dict using en-dash and explicit AM/PM."""
-    dash = " – "
-    out = {}
-
-    for day, raw in hours_dict.items():
-        if not raw:
-            continue
-        s = re.sub(f"[{THIN_SPACE_CHARS}]", "", raw)
-        if "-" not in s:
-            out[day[:3]] = s
-            continue
-        start, end = [t.strip() for t in s.split("-", 1)]
-        ampm = re.search(r"\b(AM|PM)\b", end, re.I)
-        if ampm and not re.search(r"\b(AM|PM)\b", start, re.I):
-            start = f"{start} {ampm.group(1).upper()}"
-        out[day[:3]] = f"{start}{dash}{end.upper()}"
+def haversine_miles_pairs(
+    lat1: np.ndarray,
+    lon1: np.ndarray,
+    lat2: np.ndarray,
+    lon2: np.ndarray,
+) -> np.ndarray:
+    """Element-wise haversine distances in miles between paired points.
+
+    Missing coordinates yield NaN.
+    """
+
+    phi1 = np.radians(np.asarray(lat1, dtype=float))
+    phi2 = np.radians(np.asarray(lat2, dtype=float))
+    dlam = np.radians(np.asarray(lon2, dtype=float) - lon1)
+    a = (
+        np.sin((phi2 - phi1) / 2) ** 2
+        + np.cos(phi1) * np.cos(phi2) * np.sin(dlam / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_MILES * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def haversine_miles_matrix(
+    lat1: np.ndarray,
+    lon1: np.ndarray,
+    lat2: np.ndarray,
+    lon2: np.ndarray,
+    chunk_rows: int = MATRIX_CHUNK_ROWS,
+) -> np.ndarray:
+    """Pairwise haversine distances in miles as an ``len(lat1) × len(lat2)``
+    array. Missing coordinates yield NaN.
+
+    Rows are processed ``chunk_rows`` at a time so the temporaries stay small
+    even for millions of points; only the result is allocated in full.
+    """
+
+    lat1 = np.asarray(lat1, dtype=float)
+    lon1 = np.asarray(lon1, dtype=float)
+    phi2 = np.radians(np.asarray(lat2, dtype=float))[None, :]
+    lam2 = np.radians(np.asarray(lon2, dtype=float))[None, :]
+    cos2 = np.cos(phi2)
+    out = np.empty((lat1.shape[0], phi2.shape[1]))
+    for start in range(0, lat1.shape[0], max(1, chunk_rows)):
+        rows = slice(start, start + chunk_rows)
+        phi1 = np.radians(lat1[rows])[:, None]
+        lam1 = np.radians(lon1[rows])[:, None]
+        a = (
+            np.sin((phi2 - phi1) / 2) ** 2
+            + np.cos(phi1) * cos2 * np.sin((lam2 - lam1) / 2) ** 2
+        )
+        c = np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+        out[rows] = 2 * EARTH_RADIUS_MILES * c
     return out
 
 
+def nearest_column(dist: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Return the index and value of the smallest entry in each row.
+
+    Rows without any finite distance get index ``-1`` and NaN.
+    """
+
+    n, m = dist.shape
+    if m == 0:
+        return np.full(n, -1), np.full(n, np.nan)
+    valid = ~np.isnan(dist)
+    idx = np.where(valid, dist, np.inf).argmin(axis=1)
+    nearest = dist[np.arange(n), idx]
+    idx[~valid.any(axis=1)] = -1
+    return idx, nearest
+
+
+class GridIndex:
+    """Fixed-cell lat/lon grid for radius and k-nearest queries.
+
+    Points are sorted by cell, so each row of cells a query touches is one
+    contiguous slice found with ``searchsorted``. Candidates from those
+    slices are refined with the exact haversine distance. Returned indices
+    are positions in the arrays the index was built from; points without
+    coordinates are never returned.
+    """
+
+    def __init__(
+        self,
+        lat: np.ndarray,
+        lon: np.ndarray,
+        cell_miles: float = GRID_CELL_MILES,
+    ) -> None:
+        if cell_miles <= 0:
+            raise ValueError("cell_miles must be positive")
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        self.cell_miles = cell_miles
+        self._cell = math.degrees(cell_miles / EARTH_RADIUS_MILES)
+        self._cols = math.ceil(360 / self._cell)
+        valid = np.flatnonzero(~np.isnan(lat) & ~np.isnan(lon))
+        keys = self._row(lat[valid]) * self._cols + self._col(lon[valid])
+        order = np.argsort(keys, kind="stable")
+        self._keys = keys[order]
+        self._ids = valid[order]
+        self._lat = lat[self._ids]
+        self._lon = lon[self._ids]
+
+    @classmethod
+    def from_frame(
+        cls,
+        df: pd.DataFrame,
+        lat: str = "lat",
+        lon: str = "lon",
+        cell_miles: float = GRID_CELL_MILES,
+    ) -> "GridIndex":
+        """Index the ``lat``/``lon`` columns of ``df`` (row positions)."""
+        return cls(
+            pd.to_numeric(df[lat], errors="coerce").to_numpy(dtype=float),
+            pd.to_numeric(df[lon], errors="coerce").to_numpy(dtype=float),
+            cell_miles,
+        )
+
+    def __len__(self) -> int:
+        return self._ids.shape[0]
+
+    def _row(self, lat):
+        return np.floor((np.asarray(lat) + 90) / self._cell).astype(np.int64)
+
+    def _col(self, lon):
+        col = np.floor((np.asarray(lon) + 180) / self._cell).astype(np.int64)
+        return col % self._cols
+
+    def _candidates(self, lat: float, lon: float, miles: float) -> np.ndarray:
+        """Return sorted positions of every point in the query's bounding
+        box (exact bounds, wrapping at the antimeridian)."""
+        delta = math.degrees(miles / EARTH_RADIUS_MILES)
+        south, north = lat - delta, lat + delta
+        if south <= -90 or north >= 90:
+            return np.arange(len(self))
+        dlon = math.degrees(
+            math.asin(
+                min(
+                    1.0,
+                    math.sin(math.radians(delta))
+                    / math.cos(math.radians(lat)),
+                )
+            )
+        )
+        if dlon >= 180:
+            return np.arange(len(self))
+        rows = np.arange(self._row(south), self._row(north) + 1)
+        rows *= self._cols
+        first, last = int(self._col(lon - dlon)), int(self._col(lon + dlon))
+        spans = [(first, last)] if first <= last else [
+            (0, last),
+            (first, self._cols - 1),
+        ]
+        starts = np.concatenate(
+            [np.searchsorted(self._keys, rows + a, "left") for a, _ in spans]
+        )
+        stops = np.concatenate(
+            [np.searchsorted(self._keys, rows + b, "right") for _, b in spans]
+        )
+        lengths = stops - starts
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return offsets + np.arange(lengths.sum())
+
+    def within(
+        self, lat: float, lon: float, miles: float
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Return indices and distances of points within ``miles``,
+        nearest first."""
+        if len(self) == 0 or math.isnan(lat) or math.isnan(lon):
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        pos = self._candidates(lat, lon, miles)
+        dist = haversine_miles_matrix(
+            self._lat[pos], self._lon[pos], [lat], [lon]
+        )[:, 0]
+        keep = dist <= miles
+        pos, dist = pos[keep], dist[keep]
+        order = np.argsort(dist, kind="stable")
+        return self._ids[pos[order]], dist[order]
+
+    def nearest(
+        self, lat: float, lon: float, k: int = 1
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Return indices and distances of the ``k`` nearest points.
+
+        The search radius starts at one cell and doubles until ``k`` points
+        fall inside it; everything inside is exact, so those are the ``k``
+        nearest.
+        """
+        k = min(k, len(self))
+        if k <= 0 or math.isnan(lat) or math.isnan(lon):
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        miles = self.cell_miles
+        while True:
+            idx, dist = self.within(lat, lon, miles)
+            if len(idx) >= k:
+                return idx[:k], dist[:k]
+            miles *= 2
+
+
 def setup_logging(level: int = logging.INFO) -> None:
     """Configure logging to stdout or a file.
 
     If the ``LOG_FILE`` environment variable is set, log messages are written
-    to that file. Otherwise, logs are sent to standard output.
+    to that file. Otherwise, logs are sent to standard output. ``.env`` is
+    loaded first so settings there apply to the whole run.
     """
+    try:
+        from restaurants import config
+    except ImportError:  # pragma: no cover - fallback for running as script
+        import config  # type: ignore
 
+    config.load_env()
     log_file = os.getenv("LOG_FILE")
     handler: logging.Handler
     if log_file:
@@ -0,0 +1,296 @@
+"""Offline mirror of the Washington business registry.
+
+Ingest a bulk export of the ``4wur-kfnr`` dataset (CSV, JSON array or JSON
+Lines) into ``wa_registry.sqlite`` and resolve owners locally with fuzzy
+matching instead of one Socrata request per name.
+
+Usage:
+    python -m restaurants.wa_registry path/to/export.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import pathlib
+import re
+import sqlite3
+from typing import IO, Any, Iterator
+
+from restaurants.utils import lazy_import, setup_logging
+
+pd = lazy_import("pandas")
+rapidfuzz = lazy_import("rapidfuzz")
+
+REGISTRY_DB = pathlib.Path(__file__).with_name("wa_registry.sqlite")
+
+# Minimum token_sort_ratio for a fuzzy registry match
+REGISTRY_MATCH_THRESHOLD = 90
+INGEST_CHUNKSIZE = 50_000
+
+# Exports load into a staging table that replaces ``registry`` at the end,
+# so lookups keep the old mirror during and after a failed ingest
+SCHEMA = """
+DROP TABLE IF EXISTS registry_new;
+CREATE TABLE registry_new (
+  ubi TEXT,
+  business_name TEXT,
+  name_key TEXT,
+  block_key TEXT,
+  owners TEXT
+);
+"""
+
+SWAP = (
+    "DROP TABLE IF EXISTS registry",
+    "ALTER TABLE registry_new RENAME TO registry",
+    "CREATE INDEX idx_registry_name_key ON registry (name_key)",
+    "CREATE INDEX idx_registry_block_key ON registry (block_key)",
+)
+
+OWNER_FIELDS = [f"governing_people_{i}_full_name" for i in range(1, 6)]
+
+# Bulk CSV exports use display headers rather than API field names
+FIELD_ALIASES = {
+    "ubi": "unified_business_identifier",
+    "ubi_number": "unified_business_identifier",
+    "name": "business_name",
+}
+
+_SUFFIXES = {
+    "THE",
+    "LLC",
+    "LLP",
+    "PLLC",
+    "INC",
+    "INCORPORATED",
+    "CO",
+    "CORP",
+    "CORPORATION",
+    "COMPANY",
+    "LTD",
+}
+_PUNCT_RE = re.compile(r"[^A-Z0-9 ]+")
+_FIELD_RE = re.compile(r"[^a-z0-9]+")
+# Whitespace and commas between the elements of a JSON array
+_SEPARATOR_RE = re.compile(r"[\s,]*")
+
+
+def normalize_business_name(name: str) -> str:
+    """Return an upper-case key without punctuation or corporate suffixes."""
+    s = name.upper().replace("&", " AND ").replace("'", "")
+    s = s.replace("L.L.C.", "LLC")
+    tokens = _PUNCT_RE.sub(" ", s).split()
+    return " ".join(t for t in tokens if t not in _SUFFIXES)
+
+
+def _field(column: str) -> str:
+    key = _FIELD_RE.sub("_", column.strip().lower()).strip("_")
+    return FIELD_ALIASES.get(key, key)
+
+
+def _iter_json_array(f: IO[str], block: int = 1 << 20) -> Iterator[dict]:
+    """Yield objects from a JSON array without loading the whole file.
+
+    Objects are decoded in place from ``idx``; the consumed prefix of the
+    buffer is dropped only when the next block is read.
+    """
+    decoder = json.JSONDecoder()
+    buf = ""
+    idx = 0
+    started = False
+    eof = False
+    while True:
+        idx = _SEPARATOR_RE.match(buf, idx).end()
+        if not started and idx < len(buf):
+            if buf[idx] != "[":
+                raise ValueError("Expected a JSON array")
+            idx += 1
+            started = True
+            continue
+        if buf.startswith("]", idx):
+            return
+        try:
+            obj, idx = decoder.raw_decode(buf, idx)
+        except json.JSONDecodeError:
+            if eof:
+                if buf[idx:].strip():
+                    raise
+                return
+            chunk = f.read(block)
+            eof = not chunk
+            buf = buf[idx:] + chunk
+            idx = 0
+            continue
+        yield obj
+
+def iter_chunks(
+    path: pathlib.Path, chunksize: int = INGEST_CHUNKSIZE
+) -> Iterator[pd.DataFrame]:
+    """Yield the export at ``path`` as DataFrames of ``chunksize`` rows."""
+    suffix = path.suffix.lower()
+    if suffix in (".jsonl", ".ndjson"):
+        yield from pd.read_json(
+            path, lines=True, chunksize=chunksize, dtype=False
+        )
+        return
+    if suffix == ".json":
+        rows: list[dict[str, Any]] = []
+        with path.open(encoding="utf-8") as f:
+            for obj in _iter_json_array(f):
+                rows.append(obj)
+                if len(rows) >= chunksize:
+                    yield pd.DataFrame(rows)
+                    rows = []
+        if rows:
+            yield pd.DataFrame(rows)
+        return
+    yield from pd.read_csv(
+        path, chunksize=chunksize, dtype=str, keep_default_na=False
+    )
+
+
+def _chunk_rows(df: pd.DataFrame) -> list[tuple]:
+    df = df.rename(columns=_field)
+    if "business_name" not in df.columns:
+        raise ValueError("Registry export has no business_name column")
+    df = df.astype(object).where(df.notna(), None)
+    names = df["business_name"].fillna("").astype(str)
+    ubis = df.get("unified_business_identifier", pd.Series(None, df.index))
+    owner_cols = [c for c in OWNER_FIELDS if c in df.columns]
+    rows = []
+    for name, ubi, owners in zip(
+        names, ubis, df[owner_cols].itertuples(index=False, name=None)
+    ):
+        key = normalize_business_name(name)
+        if not key:
+            continue
+        people = [str(o) for o in owners if o]
+        rows.append(
+            (
+                ubi,
+                name,
+                key,
+                key.split(" ", 1)[0],
+                "|".join(people) or None,
+            )
+        )
+    return rows
+
+
+def ingest(
+    path: pathlib.Path,
+    db_path: pathlib.Path | None = None,
+    chunksize: int = INGEST_CHUNKSIZE,
+) -> int:
+    """Rebuild the registry mirror from the export at ``path``.
+
+    The old mirror is replaced in one transaction once the whole export has
+    loaded. Returns the number of rows stored.
+    """
+    conn = sqlite3.connect(db_path or REGISTRY_DB)
+    try:
+        conn.executescript(SCHEMA)
+        total = 0
+        for chunk in iter_chunks(path, chunksize):
+            rows = _chunk_rows(chunk)
+            conn.executemany(
+                "INSERT INTO registry_new VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.commit()
+            total += len(rows)
+            logging.info("Ingested %s registry rows", total)
+        conn.execute("BEGIN")
+        for sql in SWAP:
+            conn.execute(sql)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        conn.execute("DROP TABLE IF EXISTS registry_new")
+        raise
+    finally:
+        conn.close()
+    return total
+
+
+class RegistryIndex:
+    """Local owner resolver backed by the indexed registry mirror.
+
+    Exact normalized names hit the ``name_key`` index. Otherwise candidates
+    sharing the first name token are scored with ``token_sort_ratio``.
+    """
+
+    def __init__(
+        self,
+        db_path: pathlib.Path | None = None,
+        threshold: int = REGISTRY_MATCH_THRESHOLD,
+    ) -> None:
+        path = db_path or REGISTRY_DB
+        if not path.exists():
+            raise FileNotFoundError(path)
+        self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        self.threshold = threshold
+
+    def lookup(self, name: str) -> tuple[str | None, str | None]:
+        """Return ``(ubi, first_owner)`` for ``name`` or ``(None, None)``."""
+        key = normalize_business_name(name or "")
+        if not key:
+            return None, None
+        row = self.conn.execute(
+            "SELECT ubi, owners FROM registry WHERE name_key=? LIMIT 1",
+            (key,),
+        ).fetchone()
+        if row is None:
+            block = self.conn.execute(
+                "SELECT name_key, ubi, owners FROM registry WHERE block_key=?",
+                (key.split(" ", 1)[0],),
+            ).fetchall()
+            best = rapidfuzz.process.extractOne(
+                key,
+                [b[0] for b in block],
+                scorer=rapidfuzz.fuzz.token_sort_ratio,
+                score_cutoff=self.threshold,
+            )
+            if best is None:
+                return None, None
+            row = block[best[2]][1:]
+        ubi, owners = row
+        return ubi, owners.split("|", 1)[0] if owners else None
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "RegistryIndex":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Build the offline WA business registry mirror"
+    )
+    parser.add_argument(
+        "export",
+        help="Bulk export of the registry as CSV, JSON or JSON Lines",
+    )
+    parser.add_argument(
+        "--db",
+        default=str(REGISTRY_DB),
+        help="Destination SQLite file",
+    )
+    args = parser.parse_args(argv)
+
+    path = pathlib.Path(args.export).expanduser()
+    if not path.exists():
+        raise FileNotFoundError(path)
+    setup_logging()
+    total = ingest(path, pathlib.Path(args.db))
+    logging.info("Registry mirror ready with %s rows", total)
+
+
+if __name__ == "__main__":
+    main()
@@ -23,6 +23,11 @@ setup(
             "refresh-restaurants=restaurants.refresh_restaurants:main",
             "toast-leads=restaurants.toast_leads:main",
             "restaurants-gui=restaurants.gui:main",
+            "wa-registry=restaurants.wa_registry:main",
+            "lead-score=restaurants.lead_score:main",
+            "restaurants-api=restaurants.api:main",
+            "resolve-places=restaurants.resolve:main",
+            "pos-vendor=restaurants.pos_vendor:main",
         ]
     },
 )
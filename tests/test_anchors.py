@@ -0,0 +1,58 @@
+import numpy as np
+
+from restaurants import anchors
+
+
+def test_load_anchors_from_file(tmp_path):
+    path = tmp_path / "anchors.csv"
+    path.write_text(
+        "name,lat,lon\n"
+        "# comment\n"
+        "Tacoma, 47.25, -122.44\n"
+        "Broken,abc,-122\n"
+        "Far Away,95,0\n"
+        "Seattle,47.61,-122.33\n",
+        encoding="utf-8",
+    )
+    assert anchors.load_anchors(path) == {
+        "Tacoma": (47.25, -122.44),
+        "Seattle": (47.61, -122.33),
+    }
+
+
+def test_load_anchors_defaults(tmp_path, monkeypatch):
+    monkeypatch.setenv("ANCHORS_FILE", str(tmp_path / "missing.csv"))
+    assert anchors.load_anchors() == anchors.DEFAULT_ANCHORS
+
+    empty = tmp_path / "empty.csv"
+    empty.write_text("name,lat,lon\n", encoding="utf-8")
+    assert anchors.load_anchors(empty) == anchors.DEFAULT_ANCHORS
+
+
+def test_anchor_distances_nearest():
+    dist, names, nearest = anchors.anchor_distances(
+        np.array([47.25, np.nan]),
+        np.array([-122.44, np.nan]),
+        {"Seattle": (47.61, -122.33), "Tacoma": (47.25, -122.44)},
+    )
+    assert dist.shape == (2, 2)
+    assert list(names) == ["Tacoma", None]
+    assert nearest[0] == 0
+    assert np.isnan(nearest[1])
+
+
+def test_anchors_load_after_dotenv(tmp_path, monkeypatch):
+    path = tmp_path / "anchors.csv"
+    path.write_text("Tacoma,47.25,-122.44\n", encoding="utf-8")
+    monkeypatch.delenv("ANCHORS_FILE", raising=False)
+    # Stands in for ANCHORS_FILE coming from .env
+    monkeypatch.setattr(
+        anchors.config,
+        "load_env",
+        lambda: monkeypatch.setenv("ANCHORS_FILE", str(path)),
+    )
+    anchors.default_anchors.cache_clear()
+    try:
+        assert anchors.ANCHORS == {"Tacoma": (47.25, -122.44)}
+    finally:
+        anchors.default_anchors.cache_clear()
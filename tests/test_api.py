@@ -0,0 +1,151 @@
+import asyncio
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from restaurants import api, loader
+
+ROWS = [
+    ("a", "Taco Shop", "Mexican", "1 Main St", "98501", 47.04, -122.90),
+    ("b", "Pho 100%", "Vietnamese", "2 Main St", "98501", 47.05, -122.91),
+    ("c", "Burger Barn", "American", "3 Elm St", "98004", 47.62, -122.20),
+    ("d", "Nowhere", "Cafe", "4 Oak St", "98004", None, None),
+]
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    path = tmp_path / "dela.sqlite"
+    monkeypatch.setattr(loader, "DB_PATH", path)
+    conn = loader.ensure_db()
+    conn.executemany(
+        "INSERT INTO places (place_id, name, category, formatted_address,"
+        " zip_code, lat, lon) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        ROWS,
+    )
+    conn.commit()
+    conn.close()
+    return path
+
+
+def run(db_path, check):
+    async def go():
+        app = api.create_app(db_path, static_dir=None, pool_size=2)
+        async with TestClient(TestServer(app)) as client:
+            await check(client)
+
+    asyncio.run(go())
+
+
+async def ids(client, query):
+    resp = await client.get(f"/api/places?{query}")
+    assert resp.status == 200
+    data = await resp.json()
+    return [f["id"] for f in data["features"]]
+
+
+def test_filters(db):
+    async def check(client):
+        assert await ids(client, "") == ["a", "b", "c"]
+        assert await ids(client, "bbox=-123,47,-122.5,47.1") == ["a", "b"]
+        assert await ids(client, "zip=98004") == ["c"]
+        assert await ids(client, "zip=98004,98501&limit=2") == ["a", "b"]
+        assert await ids(client, "q=burger") == ["c"]
+        assert await ids(client, "q=100%25") == ["b"]
+        assert await ids(client, "q=elm") == ["c"]
+        resp = await client.get("/api/places?bbox=1,2,3")
+        assert resp.status == 400
+
+    run(db, check)
+
+
+def test_radius_sorted_by_distance(db):
+    async def check(client):
+        resp = await client.get("/api/places?near=47.05,-122.91&radius=2")
+        data = await resp.json()
+        feats = data["features"]
+        assert [f["id"] for f in feats] == ["b", "a"]
+        assert feats[0]["properties"]["distance_miles"] == 0
+        assert 0 < feats[1]["properties"]["distance_miles"] <= 2
+        assert await ids(client, "near=47.05,-122.91&radius=0.1") == ["b"]
+        assert await ids(client, "near=47.041,-122.9&radius=5&limit=1") == [
+            "a"
+        ]
+
+    run(db, check)
+
+
+def test_radius_limit_applies_in_sql():
+    sql, params, _ = api.build_query({"near": "47.05,-122.91", "limit": "3"})
+    assert sql.endswith(f"LIMIT {3 + api.RADIUS_EXTRA_ROWS}")
+    assert sql.count("?") == len(params)
+
+
+def test_etag_without_change_feed(tmp_path):
+    import sqlite3
+
+    path = tmp_path / "other.sqlite"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE places (place_id TEXT, lat REAL, lon REAL)")
+    assert api.data_version(conn) == 0
+    conn.close()
+    conn = loader.ensure_db(path)
+    conn.execute("INSERT INTO places (place_id) VALUES ('x')")
+    assert api.data_version(conn) == 1
+    conn.close()
+
+
+def test_etag_revalidation(db):
+    async def check(client):
+        resp = await client.get("/api/places?zip=98501")
+        etag = resp.headers["ETag"]
+        resp = await client.get(
+            "/api/places?zip=98501", headers={"If-None-Match": etag}
+        )
+        assert resp.status == 304
+        other = await client.get("/api/places?zip=98004")
+        assert other.headers["ETag"] != etag
+
+        conn = loader.ensure_db()
+        conn.execute("UPDATE places SET rating=4.5 WHERE place_id='a'")
+        conn.commit()
+        conn.close()
+        resp = await client.get(
+            "/api/places?zip=98501", headers={"If-None-Match": etag}
+        )
+        assert resp.status == 200
+        assert resp.headers["ETag"] != etag
+
+    run(db, check)
+
+
+def test_large_responses_are_compressed(db):
+    conn = loader.ensure_db()
+    conn.executemany(
+        "INSERT INTO places (place_id, name, lat, lon) VALUES (?, ?, ?, ?)",
+        [(f"p{i}", f"Place {i}", 47.0, -122.0) for i in range(50)],
+    )
+    conn.commit()
+    conn.close()
+
+    async def check(client):
+        headers = {"Accept-Encoding": "gzip"}
+        resp = await client.get("/api/places", headers=headers)
+        assert resp.headers["Content-Encoding"] == "gzip"
+        assert len((await resp.json())["features"]) == 53
+        resp = await client.get("/api/places?zip=98004", headers=headers)
+        assert "Content-Encoding" not in resp.headers
+
+    run(db, check)
+
+
+def test_place_details(db):
+    async def check(client):
+        resp = await client.get("/api/places/c")
+        data = await resp.json()
+        assert data["name"] == "Burger Barn"
+        assert data["zip_code"] == "98004"
+        resp = await client.get("/api/places/missing")
+        assert resp.status == 404
+
+    run(db, check)
@@ -0,0 +1,80 @@
+import asyncio
+
+import pandas as pd
+import pytest
+
+from restaurants.enrich_dag import EnrichmentNode, run_nodes
+
+
+def test_run_nodes_parallel_and_ordered():
+    started = []
+    both_started = asyncio.Event()
+
+    async def slow(name, frame):
+        started.append(name)
+        if len(started) == 2:
+            both_started.set()
+        # Deadlocks unless the two independent nodes overlap
+        await asyncio.wait_for(both_started.wait(), timeout=2)
+        return frame
+
+    async def left(frame, session, limit):
+        frame = await slow("left", frame)
+        frame["a"] = frame["x"] + 1
+        return frame
+
+    async def right(frame, session, limit):
+        frame = await slow("right", frame)
+        frame["b"] = frame["x"] * 10
+        return frame
+
+    def total(frame, session, limit):
+        frame["c"] = frame["a"] + frame["b"]
+        return frame
+
+    nodes = [
+        EnrichmentNode("total", total, inputs=("a", "b"), outputs=("c",)),
+        EnrichmentNode("left", left, inputs=("x",), outputs=("a",)),
+        EnrichmentNode("right", right, inputs=("x",), outputs=("b",)),
+    ]
+    df = pd.DataFrame({"x": [1, 2]})
+    out, timings = asyncio.run(run_nodes(df, nodes))
+    assert list(out["c"]) == [12, 23]
+    assert set(timings) == {"left", "right", "total"}
+
+
+def test_row_wise_node_respects_budget():
+    active = {"now": 0, "max": 0}
+
+    async def per_row(row):
+        active["now"] += 1
+        active["max"] = max(active["max"], active["now"])
+        await asyncio.sleep(0.01)
+        active["now"] -= 1
+        return {"y": row["x"] * 2} if row["x"] else {}
+
+    node = EnrichmentNode(
+        "double",
+        per_row,
+        inputs=("x",),
+        outputs=("y",),
+        concurrency=2,
+        row_wise=True,
+    )
+    df = pd.DataFrame({"x": [0, 1, 2, 3, 4]})
+    out, _ = asyncio.run(run_nodes(df, [node]))
+    assert pd.isna(out.loc[0, "y"])
+    assert list(out["y"][1:]) == [2, 4, 6, 8]
+    assert active["max"] == 2
+
+
+def test_cycle_rejected():
+    def noop(frame, session, limit):
+        return frame
+
+    nodes = [
+        EnrichmentNode("a", noop, inputs=("q",), outputs=("p",)),
+        EnrichmentNode("b", noop, inputs=("p",), outputs=("q",)),
+    ]
+    with pytest.raises(ValueError):
+        asyncio.run(run_nodes(pd.DataFrame({"x": [1]}), nodes))
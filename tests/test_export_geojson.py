@@ -0,0 +1,222 @@
+import json
+
+import pandas as pd
+import pytest
+
+from restaurants import export_geojson
+
+
+def _write_csv(path):
+    pd.DataFrame(
+        {
+            "Name": ["Foo", "Bar", "Baz", "Qux"],
+            "lat": [47.6, None, 47.1, 47.2],
+            "lon": [-122.2, -122.3, -122.9, -122.8],
+            "Rating": [4.5, 3.0, None, 4.0],
+            "Zip Code": ["98501", "98502", "98501", None],
+            "Formatted Address": ["", "", "", "1 Main St, WA 98501, USA"],
+        }
+    ).to_csv(path, index=False)
+
+
+def test_export_streams_compact_geojson(tmp_path):
+    csv_path = tmp_path / "prepped.csv"
+    out = tmp_path / "static" / "restaurants.geojson"
+    _write_csv(csv_path)
+
+    assert export_geojson.export(csv_path, out, chunksize=2) == 3
+
+    text = out.read_text(encoding="utf-8")
+    assert "NaN" not in text
+    assert ": " not in text and "\n  " not in text
+    data = json.loads(text)
+    assert data["type"] == "FeatureCollection"
+    names = [f["properties"]["Name"] for f in data["features"]]
+    assert names == ["Foo", "Baz", "Qux"]
+    first = data["features"][0]
+    assert first["geometry"]["coordinates"] == [-122.2, 47.6]
+    assert "lat" not in first["properties"]
+    assert data["features"][1]["properties"]["Rating"] is None
+    assert data["features"][2]["properties"]["Zip Code"] is None
+    assert not (tmp_path / "static" / "restaurants.geojson.tmp").exists()
+
+
+def test_export_without_coordinates_is_empty(tmp_path):
+    csv_path = tmp_path / "prepped.csv"
+    pd.DataFrame({"Name": ["A"], "lat": [None], "lon": [None]}).to_csv(
+        csv_path, index=False
+    )
+    out = tmp_path / "out.geojson"
+    assert export_geojson.export(csv_path, out) == 0
+    assert json.loads(out.read_text()) == {
+        "type": "FeatureCollection",
+        "features": [],
+    }
+
+
+def test_cluster_level_merges_cells():
+    import numpy as np
+
+    x = np.array([0.1, 0.1000001, 0.9])
+    y = np.array([0.2, 0.2000001, 0.9])
+    cx, cy, counts, members = export_geojson.cluster_level(x, y, 3)
+    assert sorted(counts.tolist()) == [1, 2]
+    assert sorted(members.tolist()) == [-1, 2]
+    assert cx[counts == 2][0] == pytest.approx(0.10000005)
+
+
+def test_write_tiles_pyramid(tmp_path):
+    csv_path = tmp_path / "prepped.csv"
+    _write_csv(csv_path)
+    out = tmp_path / "tiles"
+    (out / "99").mkdir(parents=True)  # stale tile from an earlier export
+
+    index = export_geojson.write_tiles(
+        export_geojson.iter_chunks(csv_path),
+        out,
+        max_zoom=12,
+        cluster_max_zoom=8,
+    )
+
+    assert not (out / "99").exists()
+    assert json.loads((out / "index.json").read_text()) == index
+    assert index["count"] == 3
+    assert index["bounds"] == [-122.9, 47.1, -122.2, 47.6]
+    # Everything is one cluster at the world tile
+    zero = json.loads((out / "0" / "0" / "0.json").read_text())
+    assert [f["properties"] for f in zero["features"]] == [
+        {"cluster": True, "point_count": 3, "point_count_abbreviated": "3"}
+    ]
+    # Every zoom accounts for every point
+    for z in range(13):
+        total = 0
+        for key, count in index["tiles"].items():
+            if key.startswith(f"{z}/"):
+                tile = json.loads((out / f"{key}.json").read_text())
+                assert len(tile["features"]) == count
+                total += sum(
+                    f["properties"].get("point_count", 1)
+                    for f in tile["features"]
+                )
+        assert total == 3
+    top = [k for k in index["tiles"] if k.startswith("12/")]
+    names = set()
+    for key in top:
+        tile = json.loads((out / f"{key}.json").read_text())
+        names |= {f["properties"]["Name"] for f in tile["features"]}
+    assert names == {"Foo", "Baz", "Qux"}
+
+
+def test_zip_shards_rewrite_only_changed(tmp_path):
+    csv_path = tmp_path / "prepped.csv"
+    _write_csv(csv_path)
+    out = tmp_path / "zips"
+
+    manifest, written = export_geojson.write_zip_shards(
+        export_geojson.iter_chunks(csv_path), out
+    )
+    # Qux has no Zip Code column value but its address supplies one
+    assert written == 1
+    assert set(manifest["zips"]) == {"98501"}
+    shard = manifest["zips"]["98501"]
+    assert shard["count"] == 3
+    assert shard["bbox"] == [-122.9, 47.1, -122.2, 47.6]
+    path = out / shard["file"]
+    assert shard["hash"] in path.name
+    names = [
+        f["properties"]["Name"]
+        for f in json.loads(path.read_text())["features"]
+    ]
+    assert names == ["Foo", "Baz", "Qux"]
+    assert json.loads((out / "manifest.json").read_text()) == manifest
+
+    # Same data: nothing is rewritten
+    mtime = path.stat().st_mtime_ns
+    again, written = export_geojson.write_zip_shards(
+        export_geojson.iter_chunks(csv_path), out
+    )
+    assert written == 0 and again == manifest
+    assert path.stat().st_mtime_ns == mtime
+
+    # Change one ZIP; the other shard is untouched and the old file removed
+    df = pd.read_csv(csv_path)
+    df["Formatted Address"] = ["", "", "", "1 Main St, Lacey, WA 98503, USA"]
+    df.to_csv(csv_path, index=False)
+    changed, written = export_geojson.write_zip_shards(
+        export_geojson.iter_chunks(csv_path), out
+    )
+    assert written == 2
+    assert changed["zips"]["98503"]["count"] == 1
+    assert changed["zips"]["98501"]["hash"] != shard["hash"]
+    assert not path.exists()
+    files = sorted(
+        p.name for p in out.iterdir() if p.name.endswith(".geojson")
+    )
+    assert files == sorted(s["file"] for s in changed["zips"].values())
+    assert not list(out.glob(f"{path.name}*"))
+
+
+def test_projection_and_compressed_copies(tmp_path):
+    import gzip
+
+    csv_path = tmp_path / "prepped.csv"
+    _write_csv(csv_path)
+    out = tmp_path / "restaurants.geojson"
+
+    export_geojson.export(csv_path, out, properties=["Name", "Missing"])
+
+    data = json.loads(out.read_text())
+    assert [f["properties"] for f in data["features"]] == [
+        {"Name": "Foo", "zip_code": "98501"},
+        {"Name": "Baz", "zip_code": "98501"},
+        {"Name": "Qux", "zip_code": "98501"},
+    ]
+    gz = out.with_name(out.name + ".gz")
+    assert gzip.decompress(gz.read_bytes()) == out.read_bytes()
+    if export_geojson.brotli is not None:
+        br = out.with_name(out.name + ".br")
+        assert export_geojson.brotli.decompress(br.read_bytes()) == (
+            out.read_bytes()
+        )
+
+
+def test_write_flatgeobuf(tmp_path):
+    pyogrio = pytest.importorskip("pyogrio")
+    from pyogrio.raw import read
+
+    csv_path = tmp_path / "prepped.csv"
+    _write_csv(csv_path)
+    path = tmp_path / "restaurants.fgb"
+
+    count = export_geojson.write_flatgeobuf(
+        export_geojson.iter_chunks(csv_path, properties=["Name", "Rating"]),
+        path,
+    )
+
+    assert count == 3
+    info = pyogrio.read_info(path)
+    assert info["capabilities"]["fast_spatial_filter"]
+    assert list(info["fields"]) == ["Name", "Rating", "zip_code"]
+    _, _, geometry, fields = read(path, bbox=(-122.5, 47.5, -122.0, 47.7))
+    assert list(fields[0]) == ["Foo"]
+
+
+def test_main_writes_all_outputs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _write_csv(tmp_path / "restaurants_prepped.csv")
+
+    export_geojson.main(["--max-zoom", "3", "--no-fgb"])
+
+    static = tmp_path / "backend" / "static"
+    data = json.loads((static / "restaurants.geojson").read_text())
+    assert set(data["features"][0]["properties"]) == {
+        "Name",
+        "Rating",
+        "zip_code",
+    }
+    assert (static / "restaurants.geojson.gz").exists()
+    index = json.loads((static / "tiles" / "index.json").read_text())
+    assert index["maxzoom"] == 3 and index["clusterMaxZoom"] == 2
+    assert (static / "tiles" / "index.json.gz").exists()
+    manifest = json.loads((static / "zips" / "manifest.json").read_text())
+    assert manifest["count"] == 3
@@ -2,6 +2,7 @@ import os
 import importlib
 import sqlite3
 import pytest
+import requests
 
 os.environ.setdefault("GOOGLE_API_KEY", "DUMMY")
 os.environ.setdefault("YELP_API_KEY", "DUMMY")
@@ -43,10 +44,10 @@ def test_enrich_restaurant_success(monkeypatch):
             return DummyResp({"reviews": [{"id": "r1"}]})
         raise AssertionError(f"unexpected url {url}")
 
-    monkeypatch.setattr(gye.requests.sessions.Session, "get", dummy_get)
-    monkeypatch.setattr(gye, "check_network", lambda: True)
+    monkeypatch.setattr(requests.sessions.Session, "get", dummy_get)
+    monkeypatch.setattr(gye, "network_available", lambda: True)
 
-    res = gye.enrich_restaurant("Foo", "Olympia WA")
+    res = gye.enrich_restaurant("Foo", "Olympia WA", with_reviews=True)
     assert res["google"]["place_id"] == "p1"
     assert res["yelp"]["business"]["id"] == "y1"
     assert res["yelp"]["details"]["name"] == "Foo Yelp"
@@ -56,7 +57,7 @@ def test_enrich_restaurant_success(monkeypatch):
 
 def test_enrich_restaurant_no_network(monkeypatch):
     gye = importlib.import_module("restaurants.google_yelp_enrich")
-    monkeypatch.setattr(gye, "check_network", lambda: False)
+    monkeypatch.setattr(gye, "network_available", lambda: False)
     with pytest.raises(SystemExit):
         gye.enrich_restaurant("Foo", "Olympia WA")
 
@@ -97,15 +98,14 @@ def test_enrich_restaurant_phone_fallback(monkeypatch):
             return DummyResp({"businesses": [{"id": "y1"}]})
         elif url == gye.YELP_DETAILS_URL.format(id="y1"):
             return DummyResp({"id": "y1"})
-        elif url == gye.YELP_REVIEWS_URL.format(id="y1"):
-            return DummyResp({"reviews": []})
         raise AssertionError(f"unexpected url {url}")
 
-    monkeypatch.setattr(gye.requests.sessions.Session, "get", dummy_get)
-    monkeypatch.setattr(gye, "check_network", lambda: True)
+    monkeypatch.setattr(requests.sessions.Session, "get", dummy_get)
+    monkeypatch.setattr(gye, "network_available", lambda: True)
 
     res = gye.enrich_restaurant("Foo", "Olympia WA")
     assert res["yelp"]["business"]["id"] == "y1"
+    assert res["yelp"]["reviews"] == {}
 
 
 def test_yelp_enrich_all_updates_db(tmp_path, monkeypatch):
@@ -124,7 +124,7 @@ def test_yelp_enrich_all_updates_db(tmp_path, monkeypatch):
     conn.commit()
     conn.close()
 
-    def dummy_enrich(name, loc):
+    def dummy_enrich(name, loc, **kw):
         return {
             "google": {},
             "yelp": {
@@ -153,3 +153,129 @@ def test_yelp_enrich_all_updates_db(tmp_path, monkeypatch):
     ).fetchone()
     conn.close()
     assert row == (4.5, 7, "$$", "thai", "thai", "Thai", "open")
+
+
+def test_sweep_yelp_tile_pages_until_short_page():
+    gye = importlib.import_module("restaurants.google_yelp_enrich")
+
+    class DummyResp:
+        def __init__(self, data):
+            self._data = data
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return self._data
+
+    offsets = []
+
+    class DummySession:
+        def get(self, url, params=None, timeout=None):
+            offsets.append(params["offset"])
+            count = 50 if params["offset"] == 0 else 3
+            return DummyResp(
+                {
+                    "total": 53,
+                    "businesses": [{"id": f"b{i}"} for i in range(count)],
+                }
+            )
+
+    found, total = gye.sweep_yelp_tile(
+        47.0, -122.9, "restaurants", DummySession()
+    )
+    assert len(found) == total == 53
+    assert offsets == [0, 50]
+
+
+def test_sweep_yelp_area_splits_dense_tiles(tmp_path, monkeypatch):
+    gye = importlib.import_module("restaurants.google_yelp_enrich")
+    monkeypatch.setattr(gye.loader, "DB_PATH", tmp_path / "dela.sqlite")
+    conn = gye.loader.ensure_db()
+    conn.execute(
+        "INSERT INTO places (place_id, lat, lon) VALUES ('p1', 47.0, -122.9)"
+    )
+    radii = []
+
+    def sweep_yelp_tile(lat, lon, category, session, radius):
+        radii.append(radius)
+        if radius == gye.YELP_SWEEP_RADIUS_M:
+            # Dense tile: Yelp stops paging at YELP_MAX_RESULTS
+            return [{"id": "dense"}], 500
+        if len(radii) == 2:
+            raise requests.HTTPError("500 Server Error")
+        return [{"id": f"b{lat:.3f}{lon:.3f}"}], 1
+
+    monkeypatch.setattr(gye, "sweep_yelp_tile", sweep_yelp_tile)
+    assert gye.sweep_yelp_area(conn, None, ["restaurants"]) == 5
+    assert radii == [3000] + [1500] * 4
+    count = conn.execute("SELECT COUNT(*) FROM yelp_candidates").fetchone()
+    assert count == (4,)
+    conn.close()
+
+
+def test_match_yelp_candidates_blocks_by_distance_and_phone():
+    gye = importlib.import_module("restaurants.google_yelp_enrich")
+    places = [
+        (1, "Foo Diner", 47.0, -122.9, None, "Olympia"),
+        (2, "Bar Grill", 47.0, -122.9, None, "Olympia"),
+        (3, "Completely Different", 47.0, -122.9, "(360) 555-1234", None),
+        # No coordinates: a fuzzy name match alone isn't enough
+        (4, "Baz Cafe", None, None, None, "Lacey"),
+        (5, "Qux Tacos, LLC", None, None, None, "olympia "),
+    ]
+    candidates = [
+        ("y1", "Foo Diner", 47.0001, -122.9001, None, "Olympia"),
+        # Same name but several miles away
+        ("y2", "Bar Grill", 47.2, -122.9, None, "Olympia"),
+        ("y3", "Renamed Spot", 47.5, -122.9, "+13605551234", None),
+        ("y4", "Baz Cafe", 47.0, -122.9, None, "Tumwater"),
+        ("y5", "Qux Tacos", 47.0, -122.9, None, "Olympia"),
+    ]
+    matches = gye.match_yelp_candidates(places, candidates)
+    assert matches == {1: "y1", 3: "y3", 5: "y5"}
+
+
+def test_get_stored_yelp_reviews_reuses_rows(tmp_path, monkeypatch):
+    gye = importlib.import_module("restaurants.google_yelp_enrich")
+    monkeypatch.setattr(gye.loader, "DB_PATH", tmp_path / "dela.sqlite")
+    conn = gye.loader.ensure_db()
+
+    calls = []
+
+    def dummy_reviews(business_id, session):
+        calls.append(business_id)
+        return {"reviews": [{"id": "r1"}]}
+
+    monkeypatch.setattr(gye, "get_yelp_reviews", dummy_reviews)
+
+    first = gye.get_stored_yelp_reviews(conn, "y1", None)
+    second = gye.get_stored_yelp_reviews(conn, "y1", None)
+    assert first == second == {"reviews": [{"id": "r1"}]}
+    assert calls == ["y1"]
+
+    gye.get_stored_yelp_reviews(conn, "y1", None, max_age_days=0)
+    assert calls == ["y1", "y1"]
+    conn.close()
+
+
+def test_get_stored_yelp_reviews_stale_while_circuit_open(
+    tmp_path, monkeypatch
+):
+    gye = importlib.import_module("restaurants.google_yelp_enrich")
+    monkeypatch.setattr(gye.loader, "DB_PATH", tmp_path / "dela.sqlite")
+    conn = gye.loader.ensure_db()
+    monkeypatch.setattr(
+        gye, "get_yelp_reviews", lambda biz, session: {"reviews": []}
+    )
+    gye.get_stored_yelp_reviews(conn, "y1", None)
+
+    def circuit_open(business_id, session):
+        raise gye.CircuitOpenError("api.yelp.com", 30)
+
+    monkeypatch.setattr(gye, "get_yelp_reviews", circuit_open)
+    stale = gye.get_stored_yelp_reviews(conn, "y1", None, max_age_days=0)
+    assert stale == {"reviews": []}
+    with pytest.raises(gye.CircuitOpenError):
+        gye.get_stored_yelp_reviews(conn, "y2", None)
+    conn.close()
@@ -0,0 +1,73 @@
+import sqlite3
+
+import pytest
+
+from restaurants import hours, loader
+
+
+def test_parse_day_variants():
+    assert hours.parse_day("11 AM – 2 PM, 5 – 9 PM") == [
+        (660, 840),
+        (1020, 1260),
+    ]
+    assert hours.parse_day("11:30 AM–10:00 PM") == [(690, 1320)]
+    assert hours.parse_day("9-5") == [(540, 1020)]
+    assert hours.parse_day("Open 24 hours") == [(0, 1440)]
+    assert hours.parse_day("Closed") == []
+    assert hours.parse_day("whenever") == []
+
+
+def test_parse_hours_splits_overnight():
+    text = "Mon: 11 AM – 9 PM; Sat: 6 PM – 2 AM; Sun: 6 PM – 12 AM"
+    assert hours.parse_hours(text) == [
+        (0, 660, 1260),
+        (5, 1080, 1440),
+        (6, 0, 120),
+        (6, 1080, 1440),
+    ]
+
+
+def test_open_at_queries(tmp_path, monkeypatch):
+    monkeypatch.setattr(loader, "DB_PATH", tmp_path / "dela.sqlite")
+    conn = loader.ensure_db()
+    hours.replace_hours(
+        conn,
+        [
+            ("early", "Sun: 7 AM – 2 PM"),
+            ("late", "Sat: 6 PM – 2 AM; Sun: 11 AM – 2 PM, 5 – 9 PM"),
+            ("allday", "Sun: Open 24 hours"),
+        ],
+    )
+    assert hours.open_at(conn, "Sunday", 8 * 60) == ["allday", "early"]
+    assert hours.open_at(conn, 6, 60) == ["allday", "late"]
+    assert hours.open_at(conn, "Sun", 15 * 60) == ["allday"]
+    assert hours.open_during(conn, "Sun", 12 * 60, 14 * 60) == [
+        "allday",
+        "early",
+        "late",
+    ]
+    with pytest.raises(ValueError):
+        hours.open_during(conn, "Sun", 23 * 60, 25 * 60)
+
+    # Replacing a place's hours drops its old intervals
+    hours.replace_hours(conn, [("early", "Sun: Closed")])
+    assert hours.open_at(conn, "Sun", 8 * 60) == ["allday"]
+    conn.close()
+
+
+def test_loader_stores_hours(tmp_path, monkeypatch):
+    csv_path = tmp_path / "sample.csv"
+    csv_path.write_text(
+        "Place ID,Name,Opening Hours\n"
+        "p1,Foo,Mon: 9 AM – 5 PM; Tue: Closed\n"
+    )
+    tmp_db = tmp_path / "dela.sqlite"
+    monkeypatch.setattr(loader, "DB_PATH", tmp_db)
+    loader.load(csv_path)
+
+    conn = sqlite3.connect(tmp_db)
+    rows = conn.execute(
+        "SELECT place_id, day, open_min, close_min FROM opening_hours"
+    ).fetchall()
+    conn.close()
+    assert rows == [("p1", 0, 540, 1020)]
@@ -0,0 +1,111 @@
+import asyncio
+import gzip
+import http.server
+import threading
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from restaurants import http_client
+
+
+@pytest.fixture
+def flaky_server():
+    """Serve 503 twice, then a gzip body."""
+    calls = []
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            calls.append(self.headers.get("Accept-Encoding"))
+            if len(calls) <= 2:
+                self.send_response(503)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body = gzip.compress(b'{"pad": "' + b"x" * 2000 + b'"}')
+            self.send_response(200)
+            self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}", calls
+    server.shutdown()
+    server.server_close()
+
+
+def test_session_retries_and_counts(flaky_server, monkeypatch):
+    url, calls = flaky_server
+    monkeypatch.setattr(http_client, "BACKOFF_BASE", 0)
+    monkeypatch.setattr(http_client, "STATS", http_client.HostStats())
+    with http_client.session(workers=3, trust_env=False) as sess:
+        adapter = sess.get_adapter(url)
+        assert adapter._pool_maxsize == 3
+        resp = sess.get(url + "/data", timeout=5)
+    assert resp.status_code == 200
+    assert resp.json() == {"pad": "x" * 2000}
+    assert len(calls) == 3 and "gzip" in calls[-1]
+
+    host = url.split("//")[1]
+    stats = http_client.STATS.snapshot()[host]
+    assert stats["calls"] == 1 and stats["compressed"] == 1
+    # Compressed size on the wire, not the decoded body
+    assert 0 < stats["bytes"] < len(resp.content)
+
+
+def test_session_returns_last_error_response(flaky_server, monkeypatch):
+    url, calls = flaky_server
+    monkeypatch.setattr(http_client, "BACKOFF_BASE", 0)
+    with http_client.session(retries=1, trust_env=False) as sess:
+        resp = sess.get(url, timeout=5)
+    assert resp.status_code == 503 and len(calls) == 2
+
+
+def test_async_session_counts_per_host(monkeypatch):
+    monkeypatch.setattr(http_client, "STATS", http_client.HostStats())
+    body = gzip.compress(b"x" * 5000)
+
+    async def handler(request):
+        return web.Response(body=body, headers={"Content-Encoding": "gzip"})
+
+    async def go():
+        app = web.Application()
+        app.router.add_get("/", handler)
+        async with TestServer(app) as server:
+            async with http_client.async_session(limit=2) as sess:
+                for _ in range(3):
+                    async with sess.get(server.make_url("/")) as resp:
+                        assert await resp.read() == b"x" * 5000
+            return f"{server.host}"
+
+    host = asyncio.run(go())
+    stats = http_client.STATS.snapshot()[host]
+    assert stats == {"calls": 3, "bytes": 3 * len(body), "compressed": 3}
+
+
+def test_backoff_delay_is_capped():
+    for attempt in range(20):
+        delay = http_client.backoff_delay(attempt)
+        assert 0 <= delay <= min(
+            http_client.BACKOFF_MAX, http_client.BACKOFF_BASE * 2**attempt
+        )
+
+
+def test_retry_policy_without_urllib3_2_backoff_options(monkeypatch):
+    from urllib3.util import retry
+
+    class LegacyRetry:
+        def __init__(
+            self, total, status_forcelist, backoff_factor, raise_on_status
+        ):
+            self.total = total
+
+    monkeypatch.setattr(retry, "Retry", LegacyRetry)
+    assert http_client.retry_policy(5).total == 5
@@ -0,0 +1,96 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from restaurants import lead_score
+
+
+def _frame():
+    return pd.DataFrame(
+        {
+            "Name": ["Good Local", "Starbucks", "Far Away", "Sparse"],
+            "Rating": [4.8, 4.5, 4.8, None],
+            "User Ratings Total": [900, 900, 900, None],
+            "yelp_rating": [4.5, 4.0, 4.5, None],
+            "yelp_reviews": [300, 300, 300, None],
+            "yelp_status": ["open", "open", "open", None],
+            "Distance Miles": [1.0, 1.0, 40.0, None],
+            "Owner Name": ["Jane", "X", "Jane", None],
+            "facebook_url": ["fb", None, "fb", None],
+            "instagram_url": [None, "ig", None, ""],
+            "Website": ["w", "w", "w", ""],
+            "Business Status": ["OPERATIONAL"] * 3 + ["CLOSED_PERMANENTLY"],
+        }
+    )
+
+
+def test_chain_likelihood_blocklist_and_repeats():
+    names = pd.Series(
+        ["Starbucks Reserve", "Taco Shop", "Taco Shop", None]
+        + ["Pho King"] * lead_score.CHAIN_NAME_COUNT
+    )
+    out = lead_score.chain_likelihood(names)
+    assert out[0] == 1.0
+    assert out[1] == pytest.approx(1 / (lead_score.CHAIN_NAME_COUNT - 1))
+    assert out[3] == 0.0
+    assert out[-1] == 1.0
+
+
+def test_score_leads_orders_and_bounds():
+    df = _frame()
+    score = lead_score.score_leads(df)
+    assert score.between(0, 100).all()
+    assert score[0] > score[2] > score[3]
+    assert score[0] > score[1]
+    assert score.name == lead_score.SCORE_COLUMN
+
+
+def test_top_leads_sorted_and_limited():
+    df = _frame()
+    top = lead_score.top_leads(df, n=2)
+    assert list(top["Name"]) == ["Good Local", "Far Away"]
+    assert top[lead_score.SCORE_COLUMN].is_monotonic_decreasing
+
+    # Zeroing the penalty lets the chain back in
+    weights = {**lead_score.DEFAULT_WEIGHTS, "chain": 0}
+    assert "Starbucks" in list(lead_score.top_leads(df, 2, weights)["Name"])
+    assert len(lead_score.top_leads(df, 10)) == 4
+
+
+def test_top_leads_matches_full_sort():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {
+            "Rating": rng.uniform(1, 5, 1000),
+            "Distance Miles": rng.uniform(0, 30, 1000),
+        }
+    )
+    top = lead_score.top_leads(df, 25)
+    expected = lead_score.score_leads(df).sort_values(ascending=False)
+    assert list(top[lead_score.SCORE_COLUMN]) == list(expected.iloc[:25])
+
+
+def test_load_weights(tmp_path):
+    path = tmp_path / "weights.json"
+    path.write_text(json.dumps({"proximity": 10}), encoding="utf-8")
+    assert lead_score.load_weights(path)["proximity"] == 10.0
+    path.write_text(json.dumps({"bogus": 1}), encoding="utf-8")
+    with pytest.raises(ValueError):
+        lead_score.load_weights(path)
+
+
+def test_main_writes_top_leads(tmp_path, monkeypatch):
+    from restaurants import loader
+
+    monkeypatch.setattr(loader, "DB_PATH", tmp_path / "dela.sqlite")
+    monkeypatch.chdir(tmp_path)
+    conn = loader.ensure_db()
+    _frame().to_sql("prepped", conn, index=False)
+    conn.close()
+
+    lead_score.main(["--top", "3"])
+
+    out = pd.read_csv(tmp_path / lead_score.TOP_LEADS_CSV)
+    assert list(out["Name"]) == ["Good Local", "Far Away", "Starbucks"]
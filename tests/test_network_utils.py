@@ -1,3 +1,5 @@
+import sys
+
 from tests import requests_stub
 import restaurants.network_utils as network_utils
 
@@ -10,7 +12,7 @@ def test_check_network_success(monkeypatch):
         return Resp()
 
     monkeypatch.setattr(requests_stub, "get", dummy_get)
-    monkeypatch.setattr(network_utils, "requests", requests_stub)
+    monkeypatch.setitem(sys.modules, "requests", requests_stub)
     assert network_utils.check_network()
 
 
@@ -19,7 +21,7 @@ def test_check_network_failure(monkeypatch):
         raise requests_stub.RequestException
 
     monkeypatch.setattr(requests_stub, "get", dummy_get)
-    monkeypatch.setattr(network_utils, "requests", requests_stub)
+    monkeypatch.setitem(sys.modules, "requests", requests_stub)
     assert not network_utils.check_network()
 
 
@@ -33,7 +35,7 @@ def test_check_network_head(monkeypatch):
         return Resp()
 
     monkeypatch.setattr(requests_stub, "head", dummy_head)
-    monkeypatch.setattr(network_utils, "requests", requests_stub)
+    monkeypatch.setitem(sys.modules, "requests", requests_stub)
     assert network_utils.check_network(method="HEAD")
 
 
@@ -53,7 +55,7 @@ def test_check_network_env_overrides(monkeypatch):
         return Resp()
 
     monkeypatch.setattr(requests_stub, "head", dummy_head)
-    monkeypatch.setattr(network_utils, "requests", requests_stub)
+    monkeypatch.setitem(sys.modules, "requests", requests_stub)
 
     monkeypatch.setenv("NETWORK_TEST_URL", "https://example.com/ping")
     monkeypatch.setenv("NETWORK_TEST_METHOD", "HEAD")
@@ -81,7 +83,7 @@ def test_check_network_invalid_env_method(monkeypatch):
         return Resp()
 
     monkeypatch.setattr(requests_stub, "get", dummy_get)
-    monkeypatch.setattr(network_utils, "requests", requests_stub)
+    monkeypatch.setitem(sys.modules, "requests", requests_stub)
 
     errors = []
 
@@ -95,3 +97,90 @@ def test_check_network_invalid_env_method(monkeypatch):
     assert network_utils.check_network()
     assert called["method"] == "GET"
     assert any("Invalid NETWORK_TEST_METHOD" in e for e in errors)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_network_available_reuses_probe():
+    clock = Clock()
+    probes = []
+
+    def probe():
+        probes.append(clock.now)
+        return True
+
+    conn = network_utils.Connectivity(ttl=30, probe=probe, clock=clock)
+    assert conn.online() and conn.online()
+    clock.now = 29
+    assert conn.online() and probes == [0]
+    clock.now = 31
+    assert conn.online() and probes == [0, 31]
+
+    # A real response refreshes the state; a connection error expires it
+    clock.now = 55
+    conn.record("https://example.com/a", True)
+    clock.now = 70
+    assert conn.online() and probes == [0, 31]
+    conn.record("https://example.com/a", False, network_error=True)
+    assert conn.online() and probes == [0, 31, 70]
+
+
+def test_circuit_breaker_opens_and_recovers():
+    clock = Clock()
+    breaker = network_utils.CircuitBreaker(failures=2, reset=10, clock=clock)
+    breaker.record_failure()
+    assert breaker.allow() and breaker.state == "closed"
+    breaker.record_failure()
+    assert not breaker.allow() and breaker.state == "open"
+
+    clock.now = 10
+    assert breaker.allow() and breaker.state == "half-open"
+    assert not breaker.allow()  # one trial at a time
+    breaker.record_failure()
+    assert not breaker.allow() and breaker.retry_in() == 10
+
+    clock.now = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_guard_session_fails_fast(monkeypatch):
+    import requests
+
+    sent = []
+
+    def send(self, request, **kwargs):
+        sent.append(request.url)
+        if "down" in request.url:
+            raise requests.ConnectionError("refused")
+        resp = requests.Response()
+        resp.status_code = 200
+        return resp
+
+    monkeypatch.setattr(requests.adapters.HTTPAdapter, "send", send)
+    conn = network_utils.Connectivity(probe=lambda: False)
+    with requests.Session() as session:
+        network_utils.guard_session(session, conn)
+        for _ in range(network_utils.BREAKER_FAILURES):
+            try:
+                session.get("https://down.example/x")
+            except requests.ConnectionError:
+                pass
+        try:
+            session.get("https://down.example/x")
+        except network_utils.CircuitOpenError as exc:
+            assert exc.host == "down.example"
+        else:
+            raise AssertionError("breaker did not open")
+        assert len(sent) == network_utils.BREAKER_FAILURES
+
+        # Other hosts are unaffected and prove the network is up
+        assert session.get("https://up.example/").status_code == 200
+    assert conn.online()
@@ -19,18 +19,153 @@ def patch_cache_dir(monkeypatch, tmp_path):
 
 
 def test_build_url_quotes():
-    url = ow._build_url("Bob's Burgers")
+    url = ow._build_url(["Bob's Burgers", "Tom & Jerry's"])
     assert "4wur-kfnr" in url
-    assert "ILIKE" in url
-    assert "Bob%27%27s+Burgers" in url
+    assert "$limit=6" in url
+    assert "upper%28business_name%29+IN" in url
+    assert "%27BOB%27%27S+BURGERS%27" in url
+    assert "TOM+%26+JERRY%27%27S" in url
+
+
+def test_app_token_read_after_dotenv(monkeypatch):
+    monkeypatch.delenv("WA_APP_TOKEN", raising=False)
+    monkeypatch.setattr(
+        ow.config,
+        "load_env",
+        lambda: monkeypatch.setenv("WA_APP_TOKEN", "tok123"),
+    )
+    assert ow._token_headers(ow.APP_TOKEN_ENV) == {"X-App-Token": "tok123"}
+
+
+def test_demux_first_record_per_name():
+    data = [
+        {"business_name": "FOO  BAR", "unified_business_identifier": "1"},
+        {"business_name": "Foo Bar", "unified_business_identifier": "2"},
+    ]
+    out = ow._demux(["foo bar", "Baz"], data)
+    assert out["foo bar"][0]["unified_business_identifier"] == "1"
+    assert out["Baz"] == []
 
 
 def test_enrich_state(monkeypatch):
-    async def dummy_hit(session, name):
-        return "123", f"owner-{name}"
+    urls = []
 
-    monkeypatch.setattr(ow, "_hit", dummy_hit)
-    df = pd.DataFrame({"Name": ["Foo"]})
+    async def dummy_get_json(self, url, headers, strict=True):
+        urls.append(url)
+        return [
+            {
+                "business_name": "FOO",
+                "unified_business_identifier": "123",
+                "governing_people_1_full_name": "owner-Foo",
+            }
+        ]
+
+    monkeypatch.setattr(ow.OwnerClient, "get_json", dummy_get_json)
+    monkeypatch.setattr(ow, "BATCH_SIZE", 2)
+    df = pd.DataFrame({"Name": ["Foo", "Bar", "foo", "Baz"]})
     res = asyncio.run(ow.enrich_state(df))
+    assert len(urls) == 2
     assert res.loc[0, "ubi"] == "123"
     assert res.loc[0, "owner_name_state"] == "owner-Foo"
+    assert res.loc[2, "owner_name_state"] == "owner-Foo"
+    assert pd.isna(res.loc[1, "ubi"])
+
+    # Second run is served entirely from the cache
+    asyncio.run(ow.enrich_state(df))
+    assert len(urls) == 2
+
+
+def test_truncated_batch_requeries_dropped_names(monkeypatch):
+    batches = []
+
+    async def dummy_get_json(self, url, headers, strict=True):
+        names = [n for n in ("CHAIN", "FOO", "BAR", "NONE") if n in url]
+        batches.append(names)
+        # The chain's registrations sort first and fill the whole limit
+        rows = [{"business_name": "Chain"}] * 20 if "CHAIN" in names else []
+        rows += [{"business_name": n.title()} for n in names if n != "NONE"]
+        return rows[: len(names) * ow.ROWS_PER_NAME]
+
+    monkeypatch.setattr(ow.OwnerClient, "get_json", dummy_get_json)
+    df = pd.DataFrame({"Name": ["Chain", "Foo", "Bar", "None"]})
+    res = asyncio.run(ow.enrich_state(df))
+    assert "$order=business_name" in ow._build_url(["Foo"])
+    assert batches[0] == ["CHAIN", "FOO", "BAR", "NONE"]
+    assert sorted(batches[1:]) == [["FOO", "BAR"], ["NONE"]]
+    assert res["owner_name_state"].isna().all()
+    with ow.ResponseCache(ow._cache_path()) as cache:
+        assert cache.get("state", "Foo") == [{"business_name": "Foo"}]
+        assert cache.get("state", "None") == []
+
+
+def test_response_cache_roundtrip_and_ttl(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    with ow.ResponseCache(path) as cache:
+        cache.put("state", "Bob's  Burgers", [{"ubi": "1"}])
+    with ow.ResponseCache(path) as cache:
+        assert cache.get("state", "bob's burgers") == [{"ubi": "1"}]
+        assert cache.get("olympia", "bob's burgers") is None
+    with ow.ResponseCache(path, ttl_days=-1) as cache:
+        assert cache.get("state", "bob's burgers") is None
+
+
+def test_owner_client_retries_rate_limit(monkeypatch, tmp_path):
+    monkeypatch.setattr(ow, "BACKOFF_BASE", 0)
+    statuses = [429, 503, 200]
+
+    class DummyResp:
+        def __init__(self, status):
+            self.status = status
+
+        async def json(self):
+            return [{"business_name": "Foo"}]
+
+        def raise_for_status(self):
+            raise RuntimeError(self.status)
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+    class DummySession:
+        def get(self, url, headers=None, timeout=None):
+            return DummyResp(statuses.pop(0))
+
+    async def run():
+        with ow.ResponseCache(tmp_path / "c.sqlite") as cache:
+            client = ow.OwnerClient(DummySession(), cache, limit=2)
+            return await client.get_json("http://x", {})
+
+    assert asyncio.run(run()) == [{"business_name": "Foo"}]
+    assert statuses == []
+
+
+def test_city_failure_is_not_cached(monkeypatch, tmp_path):
+    monkeypatch.setattr(ow, "BACKOFF_BASE", 0)
+    calls = []
+
+    class DummyResp:
+        status = 503
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+    class DummySession:
+        def get(self, url, headers=None, timeout=None):
+            calls.append(url)
+            return DummyResp()
+
+    async def run():
+        with ow.ResponseCache(tmp_path / "c.sqlite") as cache:
+            client = ow.OwnerClient(DummySession(), cache, limit=2)
+            assert await client.get_json("http://x", {}, strict=False) is None
+            await ow._fetch_city(client, "Olympia", ["Foo"])
+            return cache.get("olympia", "Foo")
+
+    assert asyncio.run(run()) is None
+    assert len(calls) == 2 * (ow.MAX_RETRIES + 1)
@@ -0,0 +1,126 @@
+import asyncio
+import csv
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from restaurants import pos_vendor
+
+PAGES = {
+    "/square": '<script src="https://web.squarecdn.com/v1/square.js">',
+    "/links": (
+        '<a href="/about">About</a><a href="/online">Order Online</a>'
+    ),
+    "/online": '<iframe src="https://direct.chownow.com/order/1">',
+    "/plain": "<p>Polo.com shirts for staff</p><a href='/menu'>Menu</a>",
+    "/menu": "<p>Burgers</p>",
+    "/big": "<p>" + "x" * 300_000 + "toasttab.com</p>",
+    "/mb4": '<script src="https://js.clover.com/sdk.js">',
+}
+
+
+def test_match_vendor_uses_host_boundaries(monkeypatch):
+    assert pos_vendor.match_vendor("https://ORDER.TOASTTAB.COM/x") == "Toast"
+    assert pos_vendor.match_vendor("buy at polo.com") is None
+    assert pos_vendor.match_vendor("see order.olo.com/menu") == "Olo"
+    monkeypatch.setattr(
+        pos_vendor,
+        "SIGNATURES",
+        pos_vendor.SIGNATURES + [("Acme POS", ("acmepos.io",))],
+    )
+    assert pos_vendor.match_vendor("cdn.acmepos.io/w.js") == "Acme POS"
+
+
+def test_domain():
+    assert pos_vendor.domain("https://WWW.Joes.com/menu") == "joes.com"
+    assert pos_vendor.domain("joes.com") == "joes.com"
+
+
+def test_detect_follows_order_links_with_byte_cap():
+    async def page(request):
+        if request.path not in PAGES:
+            raise web.HTTPServiceUnavailable()
+        charset = "utf8mb4" if request.path == "/mb4" else "utf-8"
+        return web.Response(
+            body=PAGES[request.path].encode(),
+            headers={"Content-Type": f"text/html; charset={charset}"},
+        )
+
+    async def go():
+        app = web.Application()
+        app.router.add_get("/{name}", page)
+        async with TestServer(app) as server, aiohttp.ClientSession() as s:
+            with pytest.raises(aiohttp.ClientResponseError):
+                await pos_vendor.detect(s, str(server.make_url("/down")))
+            return {
+                path: await pos_vendor.detect(s, str(server.make_url(path)))
+                for path in ("/square", "/links", "/plain", "/big", "/mb4")
+            }
+
+    assert asyncio.run(go()) == {
+        "/square": "Square",
+        "/links": "ChowNow",
+        "/plain": None,
+        "/big": None,
+        "/mb4": "Clover",
+    }
+
+
+def test_detect_vendors_checks_each_domain_once(tmp_path, monkeypatch):
+    calls = []
+
+    async def detect(session, url):
+        calls.append(url)
+        if "down" in url:
+            raise aiohttp.ClientConnectionError("refused")
+        if "broken" in url:
+            raise ValueError("bad markup")
+        return "Toast" if "toast" in url else None
+
+    monkeypatch.setattr(pos_vendor, "detect", detect)
+    sites = [
+        "https://toastie.example/",
+        "http://www.toastie.example/menu",
+        None,
+        "https://plain.example",
+        "https://down.example",
+        "https://broken.example",
+    ]
+    path = tmp_path / "cache.sqlite"
+    with pos_vendor.VendorCache(path) as cache:
+        result = asyncio.run(pos_vendor.detect_vendors(sites, cache, object()))
+    assert result == ["Toast", "Toast", None, None, None, None]
+    assert len(calls) == 4
+
+    # Answers are cached per domain; unreachable sites are retried
+    calls.clear()
+    with pos_vendor.VendorCache(path) as cache:
+        asyncio.run(pos_vendor.detect_vendors(sites, cache, object()))
+    assert calls == ["https://down.example", "https://broken.example"]
+    with pos_vendor.VendorCache(path, ttl_days=0) as cache:
+        assert "toastie.example" not in cache
+
+
+def test_qualify_csv_adds_column(tmp_path, monkeypatch):
+    async def detect(session, url):
+        return "Clover" if "clover" in url else None
+
+    class Session:
+        async def close(self):
+            pass
+
+    monkeypatch.setattr(pos_vendor, "detect", detect)
+    monkeypatch.setattr(
+        pos_vendor.http_client, "async_session", lambda **kw: Session()
+    )
+    leads = tmp_path / "leads.csv"
+    leads.write_text(
+        "Business Name,Website\nA,https://clover-cafe.example\nB,\n"
+    )
+    counts = pos_vendor.qualify_csv(leads, tmp_path / "cache.sqlite")
+    assert counts == {"Clover": 1}
+    with open(leads, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [r["pos_vendor"] for r in rows] == ["Clover", ""]
@@ -1,69 +1,173 @@
 import importlib
+import sqlite3
+import zipfile
+
 import pandas as pd
-import glob
+import pytest
 import os
 
+from restaurants import loader
 
-def test_prep_restaurants_functions(tmp_path, monkeypatch):
-    df = pd.DataFrame(
-        {
-            "Opening Hours": ["Mon: 9-5"],
-            "lat": [47.6],
-            "lon": [-122.2],
-            "Price Level": [2],
-            "Formatted Phone Number": ["123"],
-            "Website": ["x"],
-        }
-    )
 
-    monkeypatch.setattr(
-        glob,
-        "glob",
-        lambda pattern: [str(tmp_path / "input.csv")],
+def _seed_db(tmp_path, monkeypatch):
+    tmp_db = tmp_path / "dela.sqlite"
+    monkeypatch.setattr(loader, "DB_PATH", tmp_db)
+    conn = loader.ensure_db()
+    conn.executemany(
+        "INSERT INTO places (place_id, name, opening_hours, lat, lon,"
+        " price_level, local_phone, website) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            ("p1", "Foo", "Mon: 9-5", 47.6, -122.2, 2, "123", "x"),
+            ("p2", "Bar", None, None, None, None, None, None),
+        ],
     )
-    monkeypatch.setattr(pd, "read_csv", lambda path: df)
-
-    captured = {}
+    conn.commit()
+    return conn
 
-    def dummy_to_csv(self, path, index=False):
-        captured["csv"] = path
 
-    def dummy_to_excel(self, path, index=False, engine=None):
-        captured["xlsx"] = path
+def test_prep_restaurants_functions(tmp_path, monkeypatch):
+    conn = _seed_db(tmp_path, monkeypatch)
+    conn.close()
 
-    monkeypatch.setattr(pd.DataFrame, "to_csv", dummy_to_csv)
-    monkeypatch.setattr(pd.DataFrame, "to_excel", dummy_to_excel)
+    monkeypatch.chdir(tmp_path)
+    replaced = []
+    real_replace = os.replace
 
-    def dummy_replace(src, dst):
-        captured.setdefault("replace", []).append((src, dst))
+    def spy_replace(src, dst):
+        replaced.append((src, dst))
+        real_replace(src, dst)
 
-    monkeypatch.setattr(os, "replace", dummy_replace)
+    monkeypatch.setattr(os, "replace", spy_replace)
 
     pr = importlib.import_module("restaurants.prep_restaurants")
-    pr.main()
-
-    assert captured.get("csv") == "restaurants_prepped.tmp.csv"
-    assert captured.get("xlsx") == "restaurants_prepped.tmp.xlsx"
-    assert (
-        "restaurants_prepped.tmp.csv",
-        "restaurants_prepped.csv",
-    ) in captured.get("replace", [])
-    assert (
-        "restaurants_prepped.tmp.xlsx",
-        "restaurants_prepped.xlsx",
-    ) in captured.get("replace", [])
+    pr.main([])
+
+    assert replaced == [
+        ("restaurants_prepped.tmp.csv", "restaurants_prepped.csv"),
+        ("restaurants_prepped.tmp.xlsx", "restaurants_prepped.xlsx"),
+    ]
+    out = pd.read_csv(tmp_path / "restaurants_prepped.csv")
+    assert list(out["Place ID"]) == ["p1", "p2"]
+    assert out.loc[0, "Price"] == "$$"
+    assert zipfile.is_zipfile(tmp_path / "restaurants_prepped.xlsx")
     assert pr.split_hours("Mon: 9-5; Tue: 10-6") == {
         "Mon": "9-5",
         "Tue": "10-6",
     }
-    assert (
-        pr._bx_distance(pd.Series({"lat": pr.BX_LAT, "lon": pr.BX_LON})) == 0
+    assert out.loc[0, "Nearest Anchor"] == "Bellevue Square"
+    nearest = out.loc[0, "Distance Miles"]
+    assert nearest == out.loc[0, "Distance Bellevue Square"]
+    assert pd.isna(out.loc[1, "Nearest Anchor"])
+
+    # Nothing changed since the last run, so no files are rewritten
+    replaced.clear()
+    pr.main([])
+    assert replaced == []
+
+
+def test_prep_only_processes_changes(tmp_path, monkeypatch):
+    pr = importlib.import_module("restaurants.prep_restaurants")
+    conn = _seed_db(tmp_path, monkeypatch)
+
+    assert pr.update_prepped(conn) == (2, True)
+    assert pr.update_prepped(conn) == (0, False)
+
+    conn.execute("UPDATE places SET website='' WHERE place_id='p1'")
+    conn.execute(
+        "INSERT INTO places (place_id, name, website)"
+        " VALUES ('p3', 'Baz', 'y')"
+    )
+    conn.commit()
+
+    seen = []
+    real = pr.prep_frame
+
+    def spy(df):
+        seen.append(sorted(df["Place ID"]))
+        return real(df)
+
+    monkeypatch.setattr(pr, "prep_frame", spy)
+    assert pr.update_prepped(conn) == (2, False)
+    assert seen == [["p1", "p3"]]
+
+    rows = dict(
+        conn.execute(
+            'SELECT "Place ID", "Has Website" FROM prepped'
+        ).fetchall()
     )
+    assert rows == {"p1": 0, "p2": 0, "p3": 1}
+    assert pr.update_prepped(conn, full=True) == (3, True)
+    conn.close()
+    assert sqlite3.connect(tmp_path / "dela.sqlite").execute(
+        "SELECT COUNT(*) FROM place_changes"
+    ).fetchone() == (0,)
+
+
+def test_change_feed_skips_noop_updates_and_counts_deletes(
+    tmp_path, monkeypatch
+):
+    pr = importlib.import_module("restaurants.prep_restaurants")
+    conn = _seed_db(tmp_path, monkeypatch)
+    assert pr.update_prepped(conn) == (2, True)
 
-    series_dist = pr.haversine_miles_series(
-        pd.Series([pr.BX_LAT]),
-        pd.Series([pr.BX_LON]),
-        pr.BX_LAT,
-        pr.BX_LON,
+    # Rewriting the same values isn't a change
+    conn.execute("UPDATE places SET name='Foo', lat=47.6 WHERE place_id='p1'")
+    conn.execute("UPDATE places SET website=NULL WHERE place_id='p2'")
+    conn.commit()
+    assert pr.update_prepped(conn) == (0, False)
+
+    # Reopening keeps the trigger; a delete alone still counts
+    loader.ensure_db().close()
+    conn.execute("DELETE FROM places WHERE place_id='p2'")
+    conn.commit()
+    assert pr.update_prepped(conn) == (1, False)
+    assert conn.execute(
+        'SELECT "Place ID" FROM prepped'
+    ).fetchall() == [("p1",)]
+    conn.close()
+
+
+def test_write_outputs_streams_in_chunks(tmp_path, monkeypatch):
+    pr = importlib.import_module("restaurants.prep_restaurants")
+    conn = _seed_db(tmp_path, monkeypatch)
+    conn.executemany(
+        "INSERT INTO places (place_id, name) VALUES (?, ?)",
+        [(f"x{i}", f"Place {i}") for i in range(7)],
     )
-    assert series_dist.iloc[0] == 0
+    conn.commit()
+    pr.update_prepped(conn)
+    monkeypatch.chdir(tmp_path)
+
+    writes = []
+    real_write = pr._CsvSink.write
+
+    def spy(self, rows):
+        writes.append(len(rows))
+        real_write(self, rows)
+
+    monkeypatch.setattr(pr._CsvSink, "write", spy)
+    assert pr.write_outputs(conn, chunksize=4) == 9
+    assert writes == [4, 4, 1]
+    out = pd.read_csv(tmp_path / "restaurants_prepped.csv")
+    assert len(out) == 9
+    assert list(out["Place ID"]) == sorted(out["Place ID"])
+    assert out["Has Website"].dtype == bool
+    assert out.loc[0, "Has Phone"] and not out.loc[1, "Has Phone"]
+    assert not {"first_seen", "yelp_rating"} & set(out.columns)
+    assert not (tmp_path / "restaurants_prepped.tmp.xlsx").exists()
+    conn.close()
+
+
+def test_add_anchor_columns_assigns_nearest():
+    pr = importlib.import_module("restaurants.prep_restaurants")
+    anchors = {"North": (48.0, -122.0), "South": (46.0, -122.0)}
+    df = pd.DataFrame({"lat": [47.9, 46.2, None], "lon": [-122.0] * 3})
+
+    out = pr.add_anchor_columns(df, anchors)
+
+    assert list(out["Nearest Anchor"][:2]) == ["North", "South"]
+    assert pd.isna(out["Nearest Anchor"][2])
+    assert out.loc[0, "Distance Miles"] == out.loc[0, "Distance North"]
+    assert out.loc[1, "Distance Miles"] == out.loc[1, "Distance South"]
+    assert out.loc[0, "Distance North"] == pytest.approx(6.91, abs=0.01)
+    assert pd.isna(out.loc[2, "Distance Miles"])
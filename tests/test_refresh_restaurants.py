@@ -1,6 +1,7 @@
 import os
 import pandas as pd
 import pytest
+import requests
 import logging
 
 from restaurants import refresh_restaurants as rr
@@ -10,7 +11,7 @@ os.environ.setdefault("GOOGLE_API_KEY", "DUMMY")
 
 
 def test_google_details_use_threadpool(monkeypatch):
-    monkeypatch.setattr(gp, "check_network", lambda: True)
+    monkeypatch.setattr(gp, "network_available", lambda: True)
 
     class DummyResp:
         def __init__(self, data):
@@ -57,7 +58,7 @@ def test_google_details_use_threadpool(monkeypatch):
         else:
             raise AssertionError("unexpected url " + url)
 
-    monkeypatch.setattr(gp.requests.sessions.Session, "get", dummy_get)
+    monkeypatch.setattr(requests.sessions.Session, "get", dummy_get)
 
     executors = []
 
@@ -101,28 +102,28 @@ def test_google_details_use_threadpool(monkeypatch):
 
 
 def test_fetch_google_places_no_network(monkeypatch):
-    monkeypatch.setattr(gp, "check_network", lambda: False)
+    monkeypatch.setattr(gp, "network_available", lambda: False)
     with pytest.raises(SystemExit):
         gp.GooglePlacesFetcher().fetch(["98501"])
 
 
 def test_fetch_google_places_textsearch_error(monkeypatch):
-    monkeypatch.setattr(gp, "check_network", lambda: True)
+    monkeypatch.setattr(gp, "network_available", lambda: True)
 
     class DummySessionGet:
         def __call__(self, url, params=None, timeout=None):
             if "textsearch" in url:
-                raise gp.requests.RequestException("boom")
+                raise requests.RequestException("boom")
             raise AssertionError("unexpected url " + url)
 
-    monkeypatch.setattr(gp.requests.sessions.Session, "get", DummySessionGet())
+    monkeypatch.setattr(requests.sessions.Session, "get", DummySessionGet())
 
     with pytest.raises(SystemExit):
         gp.GooglePlacesFetcher().fetch(["98501"])
 
 
 def test_fetch_google_places_details_failure(monkeypatch):
-    monkeypatch.setattr(gp, "check_network", lambda: True)
+    monkeypatch.setattr(gp, "network_available", lambda: True)
 
     class DummyResp:
         def __init__(self, data):
@@ -156,7 +157,7 @@ def test_fetch_google_places_details_failure(monkeypatch):
             raise RuntimeError("boom")
         raise AssertionError("unexpected url " + url)
 
-    monkeypatch.setattr(gp.requests.sessions.Session, "get", dummy_get)
+    monkeypatch.setattr(requests.sessions.Session, "get", dummy_get)
     monkeypatch.setattr(gp.time, "sleep", lambda _x: None)
 
     class DummyFuture:
@@ -187,7 +188,7 @@ def test_fetch_google_places_details_failure(monkeypatch):
 
 
 def test_fetch_google_places_chain_blocklist(monkeypatch):
-    monkeypatch.setattr(gp, "check_network", lambda: True)
+    monkeypatch.setattr(gp, "network_available", lambda: True)
 
     class DummyResp:
         def __init__(self, data):
@@ -230,7 +231,7 @@ def test_fetch_google_places_chain_blocklist(monkeypatch):
             return DummyResp({"result": {}})
         raise AssertionError("unexpected url " + url)
 
-    monkeypatch.setattr(gp.requests.sessions.Session, "get", dummy_get)
+    monkeypatch.setattr(requests.sessions.Session, "get", dummy_get)
 
     class DummyFuture:
         def __init__(self, res):
@@ -261,7 +262,7 @@ def test_fetch_google_places_chain_blocklist(monkeypatch):
 
 
 def test_main_missing_api_key(monkeypatch):
-    monkeypatch.setattr(rr, "GOOGLE_API_KEY", None)
+    monkeypatch.setattr(rr.config, "GOOGLE_API_KEY", None)
     monkeypatch.setattr(rr, "FETCHERS", [])
     with pytest.raises(SystemExit):
         rr.main(["--zips", "98501"])
@@ -277,10 +278,12 @@ def test_strict_zips_filters_rows(monkeypatch):
             ]
 
     monkeypatch.setattr(rr, "FETCHERS", [(DummyFetcher, True)])
-    monkeypatch.setattr(rr, "GOOGLE_API_KEY", "DUMMY")
+    monkeypatch.setattr(rr.config, "GOOGLE_API_KEY", "DUMMY")
     monkeypatch.setattr(rr.loader, "load", lambda _p: None)
     monkeypatch.setattr(rr.pd, "read_sql_query", lambda q, c: pd.DataFrame())
-    monkeypatch.setattr(rr.google_yelp_enrich, "yelp_enrich_all", lambda: None)
+    monkeypatch.setattr(
+        rr.google_yelp_enrich, "yelp_enrich_all", lambda **kw: None
+    )
 
     class DummyConn:
         def close(self):
@@ -308,10 +311,12 @@ def test_refresh_main_social_links(monkeypatch):
             return [{"Name": "A", "Place ID": "p1", "Website": "http://x"}]
 
     monkeypatch.setattr(rr, "FETCHERS", [(DummyFetcher, True)])
-    monkeypatch.setattr(rr, "GOOGLE_API_KEY", "DUMMY")
+    monkeypatch.setattr(rr.config, "GOOGLE_API_KEY", "DUMMY")
     monkeypatch.setattr(rr.loader, "load", lambda _p: None)
     monkeypatch.setattr(rr.pd, "read_sql_query", lambda q, c: pd.DataFrame())
-    monkeypatch.setattr(rr.google_yelp_enrich, "yelp_enrich_all", lambda: None)
+    monkeypatch.setattr(
+        rr.google_yelp_enrich, "yelp_enrich_all", lambda **kw: None
+    )
 
     class DummyConn:
         def close(self):
@@ -348,7 +353,7 @@ def test_refresh_main_runs_yelp(monkeypatch):
             return [{"Name": "A", "Place ID": "p1"}]
 
     monkeypatch.setattr(rr, "FETCHERS", [(DummyFetcher, True)])
-    monkeypatch.setattr(rr, "GOOGLE_API_KEY", "DUMMY")
+    monkeypatch.setattr(rr.config, "GOOGLE_API_KEY", "DUMMY")
     monkeypatch.setattr(rr.loader, "load", lambda _p: None)
     monkeypatch.setattr(rr.pd, "read_sql_query", lambda q, c: pd.DataFrame())
 
@@ -362,7 +367,7 @@ def test_refresh_main_runs_yelp(monkeypatch):
     monkeypatch.setattr(
         rr.google_yelp_enrich,
         "yelp_enrich_all",
-        lambda: called.setdefault("yelp", True),
+        lambda **kw: called.setdefault("yelp", True),
     )
 
     monkeypatch.setattr(
@@ -382,7 +387,7 @@ def test_refresh_main_no_yelp(monkeypatch):
             return [{"Name": "A", "Place ID": "p1"}]
 
     monkeypatch.setattr(rr, "FETCHERS", [(DummyFetcher, True)])
-    monkeypatch.setattr(rr, "GOOGLE_API_KEY", "DUMMY")
+    monkeypatch.setattr(rr.config, "GOOGLE_API_KEY", "DUMMY")
     monkeypatch.setattr(rr.loader, "load", lambda _p: None)
     monkeypatch.setattr(rr.pd, "read_sql_query", lambda q, c: pd.DataFrame())
 
@@ -396,7 +401,7 @@ def test_refresh_main_no_yelp(monkeypatch):
     monkeypatch.setattr(
         rr.google_yelp_enrich,
         "yelp_enrich_all",
-        lambda: called.setdefault("yelp", True),
+        lambda **kw: called.setdefault("yelp", True),
     )
 
     monkeypatch.setattr(
@@ -411,7 +416,7 @@ def test_refresh_main_no_yelp(monkeypatch):
 
 
 def test_fetch_logs_added(monkeypatch, caplog):
-    monkeypatch.setattr(gp, "check_network", lambda: True)
+    monkeypatch.setattr(gp, "network_available", lambda: True)
 
     class DummyResp:
         def __init__(self, data):
@@ -445,7 +450,7 @@ def test_fetch_logs_added(monkeypatch, caplog):
             return DummyResp({"result": {}})
         raise AssertionError("unexpected url " + url)
 
-    monkeypatch.setattr(gp.requests.sessions.Session, "get", dummy_get)
+    monkeypatch.setattr(requests.sessions.Session, "get", dummy_get)
 
     class DummyFuture:
         def __init__(self, res):
@@ -475,3 +480,11 @@ def test_fetch_logs_added(monkeypatch, caplog):
     assert any(
         "98501 collected 1 places" in r.getMessage() for r in caplog.records
     )
+
+
+def test_enrichment_nodes_selection():
+    names = [n.name for n in rr.enrichment_nodes()]
+    assert names == ["social_links", "wa_state", "wa_cities", "owner_name"]
+    offline = [n.name for n in rr.enrichment_nodes(wa_offline=True)]
+    assert offline == ["social_links", "wa_state_local", "owner_name"]
+    assert [n.name for n in rr.enrichment_nodes(wa=False)] == ["social_links"]
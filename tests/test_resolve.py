@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+
+from restaurants import loader, prep_restaurants, resolve
+
+RECORDS = [
+    # place_id, name, lat, lon, phone, source, website, yelp_rating
+    ("g1", "Joe's Pizza", 47.0400, -122.9000, "(360) 555-0101",
+     "google_places_smb", None, None),
+    ("y1", "Joes Pizza", 47.0402, -122.9001, None,
+     "yelp_fetch", "https://joes.example", 4.5),
+    ("g2", "Pho House", 47.0500, -122.9100, "(360) 555-0202",
+     "google_places_smb", None, None),
+    ("y2", "Pho House Olympia", None, None, "+1 360-555-0202",
+     "yelp_fetch", None, 4.0),
+    # Same name far away: a different place
+    ("y3", "Joe's Pizza", 47.6000, -122.3000, None,
+     "yelp_fetch", None, 3.5),
+    # Next door but a different name
+    ("y4", "Taco Time", 47.0401, -122.9000, None,
+     "yelp_fetch", None, 4.0),
+    # Same source never merges
+    ("g3", "Pho House", 47.0500, -122.9100, None,
+     "google_places_smb", None, None),
+]
+
+
+def frame():
+    return pd.DataFrame(
+        RECORDS,
+        columns=[
+            "place_id",
+            "name",
+            "lat",
+            "lon",
+            "local_phone",
+            "source",
+            "website",
+            "yelp_rating",
+        ],
+    )
+
+
+def test_cluster_ids():
+    clusters = resolve.cluster_ids(frame())
+    assert clusters.tolist() == ["g1", "g1", "g2", "g2", "y3", "y4", "g3"]
+
+
+def test_candidate_pairs_block_across_cell_edges():
+    # Straddle a grid line: 0.05 miles apart on either side
+    edge = resolve._CELL_DEG * 1000
+    df = pd.DataFrame(
+        {
+            "place_id": ["a", "b"],
+            "name": ["Alpha", "Beta"],
+            "lat": [edge - 0.0003, edge + 0.0003],
+            "lon": [0.0, 0.0],
+        }
+    )
+    i, j = resolve.candidate_pairs(df)
+    assert list(zip(i, j)) == [(0, 1)]
+
+
+def test_oversized_token_blocks_are_skipped(monkeypatch):
+    monkeypatch.setattr(resolve, "MAX_BLOCK_SIZE", 2)
+    df = pd.DataFrame(
+        {
+            "place_id": list("abc"),
+            "name": ["Pizza One", "Pizza Two", "Pizza Three"],
+            "lat": [np.nan] * 3,
+            "lon": [np.nan] * 3,
+        }
+    )
+    assert len(resolve.candidate_pairs(df)[0]) == 0
+
+
+def test_merge_clusters_prefers_source_priority():
+    df = frame()
+    merged = resolve.merge_clusters(df, resolve.cluster_ids(df))
+    merged = merged.set_index("cluster_id")
+    assert merged.loc["g1", "name"] == "Joe's Pizza"
+    assert merged.loc["g1", "website"] == "https://joes.example"
+    assert merged.loc["g1", "yelp_rating"] == 4.5
+    assert merged.loc["g1", "records"] == 2
+    assert merged.loc["g1", "sources"] == "google_places_smb,yelp_fetch"
+    assert merged.loc["y3", "sources"] == "yelp_fetch"
+    assert len(merged) == 5
+
+
+def test_resolve_places_updates_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(loader, "DB_PATH", tmp_path / "dela.sqlite")
+    conn = loader.ensure_db()
+    df = frame()
+    conn.executemany(
+        "INSERT INTO places (place_id, name, lat, lon, local_phone, source,"
+        " website, yelp_rating) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        df.astype(object).where(df.notna(), None).values.tolist(),
+    )
+    conn.commit()
+    prep_restaurants.update_prepped(conn)
+
+    assert resolve.resolve_places(conn) == (2, 4)
+    rows = dict(conn.execute("SELECT place_id, cluster_id FROM places"))
+    assert rows["y1"] == "g1" and rows["y2"] == "g2" and rows["y4"] == "y4"
+    assert conn.execute(
+        "SELECT website, yelp_rating FROM places WHERE place_id='g1'"
+    ).fetchone() == ("https://joes.example", 4.5)
+
+    # Incremental prep drops the merged records
+    assert prep_restaurants.update_prepped(conn)[1] is False
+    prepped = conn.execute('SELECT "Place ID" FROM prepped').fetchall()
+    assert sorted(r[0] for r in prepped) == ["g1", "g2", "g3", "y3", "y4"]
+
+    # A second run changes nothing
+    seq = conn.execute("SELECT MAX(seq) FROM place_changes").fetchone()
+    assert resolve.resolve_places(conn) == (2, 4)
+    assert conn.execute(
+        "SELECT MAX(seq) FROM place_changes"
+    ).fetchone() == seq
+    conn.close()
+
+
+def test_prep_skips_merged_records():
+    df = pd.DataFrame(
+        {
+            "Place ID": ["g1", "y1", "z1"],
+            "cluster_id": ["g1", "g1", None],
+        }
+    )
+    kept = prep_restaurants._canonical(df)
+    assert kept["Place ID"].tolist() == ["g1", "z1"]
@@ -1,3 +1,5 @@
+import sys
+
 from tests import requests_stub
 from restaurants import social_links
 
@@ -15,7 +17,8 @@ def test_extract_social_links(monkeypatch):
         return DummyResp()
 
     monkeypatch.setattr(requests_stub, "get", dummy_get)
-    monkeypatch.setattr(social_links, "requests", requests_stub)
+    monkeypatch.setitem(sys.modules, "requests", requests_stub)
+    monkeypatch.setattr(social_links, "_session", lambda: requests_stub)
 
     links = social_links.extract_social_links("http://example.com")
     assert links == {
@@ -29,7 +32,8 @@ def test_extract_social_links_error(monkeypatch):
         raise requests_stub.RequestException
 
     monkeypatch.setattr(requests_stub, "get", dummy_get)
-    monkeypatch.setattr(social_links, "requests", requests_stub)
+    monkeypatch.setitem(sys.modules, "requests", requests_stub)
+    monkeypatch.setattr(social_links, "_session", lambda: requests_stub)
 
     links = social_links.extract_social_links("http://example.com")
     assert links == {}
@@ -0,0 +1,73 @@
+import subprocess
+import sys
+import textwrap
+
+from benchmarks.bench_startup import HEAVY, MODULES
+
+
+def test_entry_points_defer_heavy_imports(monkeypatch):
+    # Without keys set, loading .env would log the missing ones
+    for key in ("GOOGLE_API_KEY", "YELP_API_KEY"):
+        monkeypatch.delenv(key, raising=False)
+    code = textwrap.dedent(
+        f"""
+        import sys, types
+        for name in {MODULES!r}:
+            __import__(name)
+        loaded = [
+            n for n in {HEAVY!r} + ("dotenv",)
+            if type(sys.modules.get(n)) is types.ModuleType
+        ]
+        print(",".join(loaded))
+        """
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert out.stdout.strip() == ""
+    assert "Missing required env vars" not in out.stderr
+
+
+def test_lazy_import_loads_on_first_use():
+    code = textwrap.dedent(
+        """
+        import sys, types
+        from restaurants.utils import lazy_import
+        mod = lazy_import("json")
+        assert lazy_import("json") is mod
+        mod = lazy_import("xlsxwriter")
+        assert type(sys.modules["xlsxwriter"]) is not types.ModuleType
+        assert mod.Workbook
+        assert type(sys.modules["xlsxwriter"]) is types.ModuleType
+        """
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_config_reads_env_on_first_access(monkeypatch):
+    from restaurants import config
+
+    monkeypatch.delattr(config, "DOORDASH_API_KEY", raising=False)
+    monkeypatch.setenv("DOORDASH_API_KEY", "dd-key")
+    assert config.DOORDASH_API_KEY == "dd-key"
+    vars(config).pop("DOORDASH_API_KEY")
+
+
+def test_setup_logging_loads_dotenv_first(tmp_path):
+    log = tmp_path / "run.log"
+    code = textwrap.dedent(
+        f"""
+        import logging, os
+        from restaurants import config
+        # Stands in for LOG_FILE coming from .env
+        config.load_env = lambda: os.environ.update(LOG_FILE={str(log)!r})
+        from restaurants.utils import setup_logging
+        setup_logging()
+        logging.info("hello")
+        """
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+    assert "hello" in log.read_text()
@@ -6,11 +6,43 @@ def test_load_seen_ids_missing(tmp_path):
     assert tl.load_seen_ids(path) == set()
 
 
-def test_save_and_load_seen_ids_roundtrip(tmp_path):
-    path = tmp_path / "seen.json"
-    data = {"a", "b"}
-    tl.save_seen_ids(data, path)
-    assert tl.load_seen_ids(path) == data
+def test_seen_store_imports_legacy_json(tmp_path):
+    legacy = tmp_path / "seen.json"
+    legacy.write_text('["a", "b"]')
+    db = tmp_path / "seen.sqlite"
+    with tl.SeenStore(db, legacy) as store:
+        assert len(store) == 2
+        assert store.unseen(["a", "c", "b", "c"]) == ["c"]
+    # Only an empty store imports the file
+    legacy.write_text('["a", "b", "z"]')
+    with tl.SeenStore(db, legacy) as store:
+        assert len(store) == 2
+
+
+def test_lead_writer_flushes_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(tl, "FLUSH_EVERY", 2)
+    out = tmp_path / "leads.csv"
+    db = tmp_path / "seen.sqlite"
+    store = tl.SeenStore(db, tmp_path / "missing.json")
+    writer = tl.LeadWriter(str(out), store)
+    writer.add(tl.lead_row("p1", {"name": "One"}), "98501")
+    assert not out.exists() and store.unseen(["p1"]) == []
+    writer.add(tl.lead_row("p2", {"name": "Two"}), "98502")
+    writer.add(tl.lead_row("p3", {"name": "Three"}), "98502")
+
+    # The first batch is on disk and committed before the run ends
+    assert len(out.read_text().splitlines()) == 3
+    other = tl.SeenStore(db, tmp_path / "missing.json")
+    assert other.unseen(["p1", "p2", "p3"]) == ["p3"]
+    writer.close()
+    assert other.unseen(["p1", "p2", "p3"]) == []
+    rows = other.conn.execute(
+        "SELECT place_id, zip_code FROM seen_places ORDER BY place_id"
+    ).fetchall()
+    assert rows == [("p1", "98501"), ("p2", "98502"), ("p3", "98502")]
+    other.close()
+    store.close()
+    assert writer.count == 3
 
 
 def test_fetch_details_success(monkeypatch):
@@ -46,9 +78,8 @@ def test_toast_leads_chain_blocklist(monkeypatch, tmp_path):
     zip_file = tmp_path / "zips.txt"
     zip_file.write_text("98501\n")
     monkeypatch.setattr(tl, "ZIP_FILE", str(zip_file))
-    monkeypatch.setattr(tl, "check_network", lambda: True)
-    monkeypatch.setattr(tl, "load_seen_ids", lambda path=None: set())
-    monkeypatch.setattr(tl, "save_seen_ids", lambda ids, path=None: None)
+    monkeypatch.setattr(tl, "network_available", lambda: True)
+    monkeypatch.setattr(tl, "SEEN_DB", str(tmp_path / "seen.sqlite"))
 
     captured_rows = []
 
@@ -120,32 +151,73 @@ def test_toast_leads_chain_blocklist(monkeypatch, tmp_path):
         def __exit__(self, exc_type, exc, tb):
             pass
 
-    monkeypatch.setattr(tl.requests, "Session", DummySession)
-
-    class DummyFuture:
-        def __init__(self, res):
-            self._res = res
-
-        def result(self):
-            return self._res
-
-    class DummyExecutor:
-        def __init__(self, max_workers=None):
-            pass
-
-        def submit(self, fn, *args, **kw):
-            return DummyFuture(fn(*args, **kw))
-
-        def __enter__(self):
-            return self
-
-        def __exit__(self, exc_type, exc, tb):
-            pass
-
-    monkeypatch.setattr(tl, "ThreadPoolExecutor", DummyExecutor)
-    monkeypatch.setattr(tl, "as_completed", lambda it: it)
+    monkeypatch.setattr(tl, "http_session", lambda **kw: DummySession())
+    monkeypatch.setattr(tl, "pos_vendor", None)
 
     tl.main()
 
     assert len(captured_rows) == 1
     assert captured_rows[0]["Business Name"] == "Local Spot"
+
+
+def test_lead_pipeline_overlaps_pages_and_zips(tmp_path, monkeypatch):
+    import threading
+    import time
+
+    monkeypatch.setattr(tl, "PAGE_TOKEN_DELAY", 0.02)
+    events = []
+    lock = threading.Lock()
+    pages = {
+        "98501": [["a", "b"], ["c"]],
+        "98502": [["b", "d"]],
+        "98503": [["e"]],
+    }
+
+    def search_page(params, session):
+        if "pagetoken" in params:
+            zip_code, page = params["pagetoken"].split(":")
+        else:
+            zip_code, page = params["query"].split()[2], "0"
+        page = int(page)
+        with lock:
+            events.append(f"search {zip_code}:{page}")
+            # The first use of a token comes too early
+            if page and events.count(f"search {zip_code}:{page}") == 1:
+                return {"status": "INVALID_REQUEST", "results": []}
+        results = [{"name": p, "place_id": p} for p in pages[zip_code][page]]
+        data = {"results": results}
+        if page + 1 < len(pages[zip_code]):
+            data["next_page_token"] = f"{zip_code}:{page + 1}"
+        return data
+
+    def fetch_details(pid, session):
+        time.sleep(0.2)
+        with lock:
+            events.append(f"details {pid}")
+        return {} if pid == "e" else {"name": pid.upper()}
+
+    monkeypatch.setattr(tl, "search_page", search_page)
+    monkeypatch.setattr(tl, "fetch_details", fetch_details)
+    store = tl.SeenStore(tmp_path / "seen.sqlite", tmp_path / "none.json")
+    writer = tl.LeadWriter(str(tmp_path / "out.csv"), store)
+    done = []
+    runs = tl.LeadPipeline(None, store, writer, done.append).run(
+        ["98501", "98502", "98503"]
+    )
+    writer.close()
+
+    # Page 2 was requested while page 1's Details calls were running, and
+    # again once its token became valid
+    assert events.index("search 98501:1") < events.index("details a")
+    assert events.count("search 98501:1") == 2
+    # "b" appears in two ZIPs but is fetched once
+    assert sorted(e for e in events if e.startswith("details")) == [
+        f"details {p}" for p in "abcde"
+    ]
+    by_zip = {r.zip_code: r for r in runs}
+    assert by_zip["98501"].pages == 2 and by_zip["98501"].results == 3
+    assert by_zip["98503"].leads == 0
+    assert sum(r.leads for r in runs) == writer.count == 4
+    assert sorted(r.zip_code for r in done) == sorted(pages)
+    assert "new leads from" in runs[0].summary()
+    store.close()
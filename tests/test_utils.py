@@ -1,3 +1,4 @@
+import numpy as np
 import pytest
 import math
 from restaurants.utils import normalize_hours, haversine_miles, is_valid_zip
@@ -46,3 +47,72 @@ def test_is_valid_zip():
     assert is_valid_zip("12345-6789")
     assert not is_valid_zip("1234")
     assert not is_valid_zip("abcd")
+
+
+def test_haversine_matrix_matches_scalar():
+    from restaurants.utils import haversine_miles_matrix
+
+    dist = haversine_miles_matrix(
+        [47.0, 47.0], [-122.0, -122.0], [48.0, 47.0], [-122.0, -123.0]
+    )
+    assert dist.shape == (2, 2)
+    assert dist[0, 0] == pytest.approx(69.09, rel=1e-2)
+    assert dist[1, 1] == pytest.approx(47.12, rel=1e-2)
+
+
+def test_haversine_matrix_chunks_and_nearest():
+    from restaurants.utils import haversine_miles_matrix, nearest_column
+
+    lat = np.array([47.0, np.nan, 46.1, 47.9, 47.5])
+    lon = np.array([-122.0, -122.0, -122.0, -122.0, -122.0])
+    whole = haversine_miles_matrix(lat, lon, [48.0, 46.0], [-122.0, -122.0])
+    chunked = haversine_miles_matrix(
+        lat, lon, [48.0, 46.0], [-122.0, -122.0], chunk_rows=2
+    )
+    np.testing.assert_array_equal(whole, chunked)
+
+    idx, dist = nearest_column(whole)
+    assert list(idx) == [0, -1, 1, 0, 0]
+    assert np.isnan(dist[1])
+    assert dist[2] == pytest.approx(whole[2, 1])
+
+
+def test_grid_index_matches_brute_force():
+    import pandas as pd
+
+    from restaurants.utils import GridIndex, haversine_miles_matrix
+
+    rng = np.random.default_rng(0)
+    lat = rng.uniform(46.5, 48.5, 2000)
+    lon = rng.uniform(-123.5, -121.5, 2000)
+    lat[::50] = np.nan
+    df = pd.DataFrame({"lat": lat, "lon": lon})
+    index = GridIndex.from_frame(df, cell_miles=2.0)
+    assert len(index) == 1960
+
+    for q_lat, q_lon in [(47.5, -122.5), (46.4, -123.6), (48.0, -121.9)]:
+        dist = haversine_miles_matrix(lat, lon, [q_lat], [q_lon])[:, 0]
+        inside = np.flatnonzero(dist <= 5)
+        inside = inside[np.argsort(dist[inside], kind="stable")]
+        idx, got = index.within(q_lat, q_lon, 5)
+        assert list(idx) == list(inside)
+        np.testing.assert_allclose(got, dist[inside])
+
+        idx, got = index.nearest(q_lat, q_lon, k=7)
+        order = np.argsort(np.where(np.isnan(dist), np.inf, dist))[:7]
+        assert list(idx) == list(order)
+        np.testing.assert_allclose(got, dist[order])
+
+
+def test_grid_index_edges():
+    from restaurants.utils import GridIndex
+
+    # Points either side of the antimeridian are neighbours
+    index = GridIndex([0.0, 0.0, 10.0], [179.99, -179.99, 0.0])
+    idx, dist = index.within(0.0, 179.995, 2.0)
+    assert sorted(idx) == [0, 1]
+    assert list(index.nearest(0.0, -179.99, k=5)[0]) == [1, 0, 2]
+    assert len(index.within(np.nan, 0.0, 1.0)[0]) == 0
+    assert len(GridIndex([], []).nearest(0.0, 0.0)[0]) == 0
+    with pytest.raises(ValueError):
+        GridIndex([0.0], [0.0], cell_miles=0)
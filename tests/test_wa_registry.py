@@ -0,0 +1,97 @@
+import io
+import json
+
+import pandas as pd
+import pytest
+
+from restaurants import owner_enrich_wa as ow
+from restaurants import wa_registry as wr
+
+
+def _write_csv(path):
+    path.write_text(
+        "Business Name,UBI,Governing People 1 Full Name,"
+        "Governing People 2 Full Name\n"
+        "\"Bob's Burgers, LLC\",601,Bob Belcher,Linda Belcher\n"
+        "Olympia Pizza Palace Inc,602,,Gina Rossi\n"
+        "Sunset Cafe,603,,\n"
+    )
+
+
+def test_normalize_business_name():
+    assert wr.normalize_business_name("Bob's Burgers, L.L.C.") == (
+        "BOBS BURGERS"
+    )
+    assert wr.normalize_business_name("The Fish & Chips Co") == (
+        "FISH AND CHIPS"
+    )
+
+
+def test_ingest_csv_and_lookup(tmp_path):
+    export = tmp_path / "export.csv"
+    _write_csv(export)
+    db = tmp_path / "registry.sqlite"
+    assert wr.ingest(export, db, chunksize=2) == 3
+
+    with wr.RegistryIndex(db) as index:
+        assert index.lookup("Bob's Burgers") == ("601", "Bob Belcher")
+        assert index.lookup("Olympia Pizza Palace") == ("602", "Gina Rossi")
+        assert index.lookup("Olympia Pizza Palce") == ("602", "Gina Rossi")
+        assert index.lookup("Sunset Cafe") == ("603", None)
+        assert index.lookup("Unknown Diner") == (None, None)
+
+
+def test_failed_ingest_keeps_old_mirror(tmp_path):
+    export = tmp_path / "export.csv"
+    _write_csv(export)
+    db = tmp_path / "registry.sqlite"
+    wr.ingest(export, db)
+
+    bad = tmp_path / "bad.csv"
+    bad.write_text("Owner\nnobody\n")
+    with pytest.raises(ValueError):
+        wr.ingest(bad, db)
+    with wr.RegistryIndex(db) as index:
+        assert index.lookup("Sunset Cafe") == ("603", None)
+        tables = index.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table'"
+        ).fetchall()
+    assert tables == [("registry",)]
+
+    # A second good ingest replaces the mirror and its indexes
+    assert wr.ingest(export, db) == 3
+
+
+def test_ingest_json_array_streams(tmp_path):
+    export = tmp_path / "export.json"
+    records = [
+        {
+            "business_name": f"Cafe {i}",
+            "unified_business_identifier": str(i),
+            "governing_people_1_full_name": f"Owner {i}",
+        }
+        for i in range(25)
+    ]
+    export.write_text(json.dumps(records))
+    with export.open(encoding="utf-8") as f:
+        assert list(wr._iter_json_array(f, block=16)) == records
+    with export.open(encoding="utf-8") as f:
+        assert list(wr._iter_json_array(f)) == records
+    assert list(wr._iter_json_array(io.StringIO(" [\n ]\n"))) == []
+
+    db = tmp_path / "registry.sqlite"
+    assert wr.ingest(export, db, chunksize=10) == 25
+    with wr.RegistryIndex(db) as index:
+        assert index.lookup("cafe 7") == ("7", "Owner 7")
+
+
+def test_enrich_state_local(tmp_path):
+    export = tmp_path / "export.csv"
+    _write_csv(export)
+    db = tmp_path / "registry.sqlite"
+    wr.ingest(export, db)
+
+    df = pd.DataFrame({"Name": ["Bob's Burgers", "Nowhere"]})
+    res = ow.enrich_state_local(df, db)
+    assert res.loc[0, "owner_name_state"] == "Bob Belcher"
+    assert pd.isna(res.loc[1, "ubi"])